@@ -0,0 +1,308 @@
+"""
+Async HTTP API for the matching engine
+
+Blocking database and scoring work runs in a bounded thread pool, so the
+event loop keeps serving other clients. Responses are gzip-compressed (except
+server-sent events) and carry an ETag; clients sending If-None-Match get 304
+Not Modified.
+
+Usage:
+    uvicorn api.main:app --host 0.0.0.0 --port 8000 --workers 4
+
+With several workers, publish a data snapshot (scraper/scheduler.py --job
+snapshot) so all workers share the memory-mapped feature and embedding files.
+"""
+import sys
+import os
+import asyncio
+import contextvars
+import hashlib
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.datastructures import Headers
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.schemas import (
+    ProfileModel, MatchRequest, serialize_apprenticeship, serialize_apprenticeship_detail,
+    serialize_match_score, serialize_ranked, serialize_recommendation, serialize_search_hit
+)
+from matcher.matching_engine import get_shared_engine
+from matcher.result_cache import MatchResultCache
+from matcher.outbound import deadline
+from data.database import Apprenticeship, get_session
+
+# Upper bound for concurrently running blocking jobs (DB queries, scoring, AI calls)
+API_MAX_WORKERS = int(os.getenv("API_MAX_WORKERS", "8"))
+
+# Time budget per request; outbound API calls get what is left as their timeout
+API_REQUEST_DEADLINE_SECONDS = float(os.getenv("API_REQUEST_DEADLINE_SECONDS", "30"))
+
+executor = ThreadPoolExecutor(max_workers=API_MAX_WORKERS, thread_name_prefix="matcher-api")
+
+# Results whose AI summary is still being generated, polled via /summaries/{summary_id}
+pending_summaries = MatchResultCache(max_entries=1024, ttl_seconds=600)
+
+async def run_blocking(func, *args, **kwargs):
+    """Run blocking work in the bounded pool (with the request's deadline)"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, func, *args, **kwargs))
+
+class DeadlineMiddleware:
+    """Request deadline for outbound calls; clients may shorten it via X-Request-Timeout (seconds)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = API_REQUEST_DEADLINE_SECONDS
+        header = dict(scope["headers"]).get(b"x-request-timeout")
+        if header:
+            try:
+                seconds = min(seconds, max(float(header), 0.0))
+            except ValueError:
+                pass
+
+        with deadline(seconds):
+            await self.app(scope, receive, send)
+
+class EventStreamGZipMiddleware:
+    """GZipMiddleware that passes server-sent events through uncompressed (gzip would hold events back)"""
+
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        event_stream = False
+
+        async def app_choosing_encoding(scope, receive, gzip_send):
+            async def route(message):
+                nonlocal event_stream
+                if message["type"] == "http.response.start":
+                    content_type = Headers(raw=message["headers"]).get("content-type", "")
+                    event_stream = content_type.startswith("text/event-stream")
+                await (send if event_stream else gzip_send)(message)
+
+            await self.app(scope, receive, route)
+
+        await GZipMiddleware(app_choosing_encoding, self.minimum_size)(scope, receive, send)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the shared engine (embedding cache, commute matrix, snapshot maps) before serving
+    await run_blocking(lambda: get_shared_engine().warm_up())
+    yield
+    executor.shutdown(wait=False)
+
+app = FastAPI(title="Smart Apprentice Finder API", version="1.0", lifespan=lifespan)
+app.add_middleware(EventStreamGZipMiddleware, minimum_size=1000)
+app.add_middleware(DeadlineMiddleware)
+
+def json_response(request: Request, payload: Dict) -> Response:
+    """JSON response with ETag, 304 if the client already has this version"""
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def sse_event(event: str, data: Dict) -> str:
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def _match_page(match_request: MatchRequest) -> Dict:
+    engine = get_shared_engine()
+    user_profile = match_request.profile.to_user_profile()
+
+    # Default limit keeps one cached result per profile for all pages and filters
+    result = engine.find_matches(
+        user_profile, min_score=match_request.min_score,
+        apply_distance_filter=match_request.apply_distance_filter
+    )
+
+    start = (match_request.page - 1) * match_request.page_size
+    total_matches, ranked_page = engine.get_result_page(
+        result, start, match_request.page_size,
+        min_score=match_request.min_score,
+        sort_by=match_request.sort_by,
+        max_commute=match_request.max_commute,
+        search=match_request.search
+    )
+
+    summary_id = None
+    if result.summary_pending():
+        summary_id = uuid.uuid4().hex
+        pending_summaries.put(summary_id, result)
+
+    return {
+        "total_found": result.total_found,
+        "total_matches": total_matches,
+        "page": match_request.page,
+        "page_size": match_request.page_size,
+        "pages": (total_matches + match_request.page_size - 1) // match_request.page_size,
+        "processing_time": result.processing_time,
+        "ai_summary": result.resolve_summary(),
+        "ai_summary_pending": summary_id is not None,
+        "summary_id": summary_id,
+        "results": [serialize_ranked(ranked) for ranked in ranked_page]
+    }
+
+def _load_apprenticeship(apprenticeship_id: int) -> Optional[Apprenticeship]:
+    session = get_session()
+    try:
+        return session.get(Apprenticeship, apprenticeship_id)
+    finally:
+        session.close()
+
+def _explanation(apprenticeship_id: int, profile: ProfileModel) -> Optional[Dict]:
+    apprenticeship = _load_apprenticeship(apprenticeship_id)
+    if apprenticeship is None:
+        return None
+
+    match_score, recommendation = get_shared_engine().get_detailed_recommendation(
+        profile.to_user_profile(), apprenticeship
+    )
+
+    return {
+        "apprenticeship_id": apprenticeship_id,
+        "score": serialize_match_score(match_score),
+        "recommendation": serialize_recommendation(recommendation)
+    }
+
+def _explanation_stream(apprenticeship_id: int, profile: ProfileModel):
+    apprenticeship = _load_apprenticeship(apprenticeship_id)
+    if apprenticeship is None:
+        return None
+
+    return get_shared_engine().stream_detailed_recommendation(profile.to_user_profile(), apprenticeship)
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.post("/match")
+async def match(match_request: MatchRequest, request: Request):
+    """Ranked matches for a profile, paginated"""
+    return json_response(request, await run_blocking(_match_page, match_request))
+
+@app.get("/summaries/{summary_id}")
+async def summary(summary_id: str, request: Request, wait: float = Query(0.0, ge=0.0, le=30.0)):
+    """AI summary of a /match response; wait > 0 long-polls until it is ready"""
+    result = pending_summaries.get(summary_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Zusammenfassung nicht gefunden")
+
+    future = result.ai_summary_future
+    if wait and future is not None and not future.done():
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=wait)
+        except Exception:
+            # Timeouts and failures leave the fallback summary in place
+            pass
+
+    return json_response(request, {
+        "summary_id": summary_id,
+        "ready": not result.summary_pending(),
+        "ai_summary": result.resolve_summary()
+    })
+
+@app.get("/search")
+async def search(request: Request, q: str = Query(..., min_length=1, max_length=200),
+                 limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
+    """Free-text search over active listings, most relevant first"""
+    hits = await run_blocking(get_shared_engine().search_apprenticeships, q, limit, offset)
+
+    return json_response(request, {
+        "query": q,
+        "results": [serialize_search_hit(hit) for hit in hits]
+    })
+
+@app.get("/apprenticeships/{apprenticeship_id}")
+async def apprenticeship_detail(apprenticeship_id: int, request: Request):
+    """Full listing details"""
+    apprenticeship = await run_blocking(_load_apprenticeship, apprenticeship_id)
+    if apprenticeship is None:
+        raise HTTPException(status_code=404, detail="Lehrstelle nicht gefunden")
+
+    return json_response(request, serialize_apprenticeship_detail(apprenticeship))
+
+@app.get("/apprenticeships/{apprenticeship_id}/similar")
+async def similar_apprenticeships(apprenticeship_id: int, request: Request,
+                                  limit: int = Query(5, ge=1, le=50)):
+    """Most similar active listings (precomputed neighbours, same profession nearby as fallback)"""
+    similar = await run_blocking(get_shared_engine().find_similar_apprenticeships, apprenticeship_id, limit)
+
+    return json_response(request, {
+        "apprenticeship_id": apprenticeship_id,
+        "results": [serialize_apprenticeship(candidate) for candidate in similar]
+    })
+
+@app.post("/apprenticeships/{apprenticeship_id}/explanation")
+async def explanation(apprenticeship_id: int, profile: ProfileModel, request: Request):
+    """Score breakdown and AI recommendation of one listing for a profile"""
+    payload = await run_blocking(_explanation, apprenticeship_id, profile)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Lehrstelle nicht gefunden")
+
+    return json_response(request, payload)
+
+@app.post("/apprenticeships/{apprenticeship_id}/explanation/stream")
+async def explanation_stream(apprenticeship_id: int, profile: ProfileModel):
+    """
+    Server-sent events: 'score' first, then 'partial' recommendations while the
+    AI text streams in, and the complete recommendation as 'final'
+    """
+    started = await run_blocking(_explanation_stream, apprenticeship_id, profile)
+    if started is None:
+        raise HTTPException(status_code=404, detail="Lehrstelle nicht gefunden")
+    match_score, recommendations = started
+
+    async def events():
+        yield sse_event("score", serialize_match_score(match_score))
+
+        # One item look-ahead so the last recommendation can be marked final
+        previous = None
+        while True:
+            recommendation = await run_blocking(next, recommendations, None)
+            if recommendation is None:
+                break
+            if previous is not None:
+                yield sse_event("partial", serialize_recommendation(previous))
+            previous = recommendation
+
+        if previous is not None:
+            yield sse_event("final", serialize_recommendation(previous))
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/stats")
+async def stats(request: Request):
+    """Engine and database statistics"""
+    return json_response(request, await run_blocking(get_shared_engine().get_statistics))
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("API_PORT", "8000")))
@@ -0,0 +1,122 @@
+"""
+Request models and response serialization for the matching API
+"""
+import sys
+import os
+from dataclasses import asdict
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher.questionnaire import UserProfile, InterestCategory, SkillLevel
+from matcher.scoring_engine import MatchScore, RankedApprenticeship
+from matcher.search import SearchHit
+
+class ProfileModel(BaseModel):
+    """User profile as sent by clients (mirrors UserProfile)"""
+    age: int = Field(16, ge=10, le=99)
+    location: str = ""
+    postal_code: str = Field("", pattern=r"^(\d{4})?$")  # Swiss PLZ, empty if unknown
+    max_commute_minutes: int = Field(45, ge=0, le=240)
+    preferred_transport: Literal["public", "car", "bike", "walk", "mixed"] = "public"
+    interests: Dict[InterestCategory, int] = Field(default_factory=dict)
+    technical_skills: Dict[str, SkillLevel] = Field(default_factory=dict)
+    soft_skills: Dict[str, int] = Field(default_factory=dict)
+    company_size_preference: str = "any"
+    work_environment: str = "any"
+    team_vs_individual: int = Field(3, ge=1, le=5)
+    career_goals: List[str] = Field(default_factory=list)
+    salary_importance: int = Field(3, ge=1, le=5)
+    growth_importance: int = Field(3, ge=1, le=5)
+    avoid_sectors: List[str] = Field(default_factory=list)
+    required_benefits: List[str] = Field(default_factory=list)
+
+    def to_user_profile(self) -> UserProfile:
+        return UserProfile(
+            age=self.age,
+            location=self.location,
+            postal_code=self.postal_code,
+            max_commute_minutes=self.max_commute_minutes,
+            preferred_transport=self.preferred_transport,
+            interests=dict(self.interests),
+            technical_skills=dict(self.technical_skills),
+            soft_skills=dict(self.soft_skills),
+            company_size_preference=self.company_size_preference,
+            work_environment=self.work_environment,
+            team_vs_individual=self.team_vs_individual,
+            career_goals=list(self.career_goals),
+            salary_importance=self.salary_importance,
+            growth_importance=self.growth_importance,
+            avoid_sectors=list(self.avoid_sectors),
+            required_benefits=list(self.required_benefits)
+        )
+
+class MatchRequest(BaseModel):
+    """Matching request with result pagination and re-filtering"""
+    profile: ProfileModel
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=100)
+    min_score: float = Field(0.3, ge=0.0, le=1.0)
+    sort_by: str = Field("total_score", pattern="^(total|interest|location|skill|preference)_score$")
+    max_commute: Optional[float] = Field(None, ge=0)
+    search: Optional[str] = Field(None, max_length=200)
+    apply_distance_filter: bool = True
+
+def serialize_apprenticeship(apprenticeship) -> Dict:
+    """Listing fields shared by ORM objects and candidate rows"""
+    return {
+        "id": apprenticeship.id,
+        "title": apprenticeship.title,
+        "profession": apprenticeship.profession,
+        "company": apprenticeship.company_name,
+        "location": apprenticeship.location,
+        "postal_code": apprenticeship.postal_code,
+        "description": apprenticeship.description,
+        "requirements": apprenticeship.requirements,
+        "source_url": apprenticeship.source_url
+    }
+
+def serialize_apprenticeship_detail(apprenticeship) -> Dict:
+    """All listing fields of an ORM object"""
+    detail = serialize_apprenticeship(apprenticeship)
+    detail.update({
+        "benefits": apprenticeship.benefits,
+        "start_date": apprenticeship.start_date,
+        "duration_years": apprenticeship.duration_years,
+        "salary_min": apprenticeship.salary_min,
+        "salary_max": apprenticeship.salary_max,
+        "application_deadline": apprenticeship.application_deadline,
+        "application_url": apprenticeship.application_url,
+        "is_active": apprenticeship.is_active,
+        "updated_at": apprenticeship.updated_at
+    })
+    return detail
+
+def serialize_match_score(match_score: MatchScore) -> Dict:
+    return {
+        "total_score": match_score.total_score,
+        "interest_score": match_score.interest_score,
+        "location_score": match_score.location_score,
+        "skill_score": match_score.skill_score,
+        "preference_score": match_score.preference_score,
+        "explanation": match_score.explanation
+    }
+
+def serialize_ranked(ranked: RankedApprenticeship) -> Dict:
+    return {
+        "rank": ranked.rank,
+        "apprenticeship": serialize_apprenticeship(ranked.apprenticeship),
+        "score": serialize_match_score(ranked.match_score)
+    }
+
+def serialize_search_hit(hit: SearchHit) -> Dict:
+    return {
+        "apprenticeship": serialize_apprenticeship(hit.apprenticeship),
+        "score": hit.score
+    }
+
+def serialize_recommendation(recommendation) -> Dict:
+    return asdict(recommendation)
@@ -1,9 +1,11 @@
 import sqlite3
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy import create_engine, event, text, Column, Integer, String, DateTime, Text, Float, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
+import threading
+from contextlib import contextmanager
 
 Base = declarative_base()
 
@@ -57,23 +59,176 @@ class ScrapingLog(Base):
     finished_at = Column(DateTime)
     duration_seconds = Column(Float)
 
-def create_database(db_path="data/apprenticeships.db"):
+class DataGeneration(Base):
+    __tablename__ = 'data_generation'
+    
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)  # Bumped whenever listings change
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ApprenticeshipNeighbours(Base):
+    __tablename__ = 'apprenticeship_neighbours'
+    
+    apprenticeship_id = Column(Integer, primary_key=True)
+    neighbour_ids = Column(Text, nullable=False)  # JSON list, most similar first
+    similarities = Column(Text, nullable=False)  # JSON list of cosine similarities
+    generation = Column(Integer)  # Data generation the lists were computed from
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+DEFAULT_DB_PATH = "data/apprenticeships.db"
+
+# Full-text index of active listings (SQLite FTS5, external content = apprenticeships)
+SEARCH_TABLE = "apprenticeships_fts"
+SEARCH_COLUMNS = ["title", "profession", "company_name", "description", "requirements"]
+
+def _search_values(prefix):
+    return ", ".join(f"{prefix}.{column}" for column in SEARCH_COLUMNS)
+
+# Triggers keep the index in sync with every insert, update and delete (ORM upserts
+# and bulk loads alike); only active listings are indexed
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        {", ".join(SEARCH_COLUMNS)},
+        content='apprenticeships', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON apprenticeships WHEN new.is_active BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, {", ".join(SEARCH_COLUMNS)}) VALUES (new.id, {_search_values("new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON apprenticeships WHEN old.is_active BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {_search_values("old")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au
+    AFTER UPDATE OF is_active, {", ".join(SEARCH_COLUMNS)} ON apprenticeships BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {", ".join(SEARCH_COLUMNS)})
+        SELECT 'delete', old.id, {_search_values("old")} WHERE old.is_active;
+        INSERT INTO {SEARCH_TABLE}(rowid, {", ".join(SEARCH_COLUMNS)})
+        SELECT new.id, {_search_values("new")} WHERE new.is_active;
+    END"""
+]
+
+# Engines and session factories are created once per process and database
+_engines = {}
+_session_factories = {}
+_engine_lock = threading.Lock()
+
+def resolve_db_path(db_path=None):
+    """Database path: explicit argument, DATABASE_PATH environment variable or the default"""
+    return db_path or os.getenv("DATABASE_PATH") or DEFAULT_DB_PATH
+
+# SQL function lowering like str.lower(); SQLite's lower() only folds ASCII
+UNICODE_LOWER_FUNCTION = "unicode_lower"
+
+def _unicode_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+def _register_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function(UNICODE_LOWER_FUNCTION, 1, _unicode_lower, deterministic=True)
+
+def create_database(db_path=None):
     """Create database and tables if they don't exist"""
+    db_path = resolve_db_path(db_path)
     
     # Create data directory if it doesn't exist
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
     
     # Create engine and tables
     engine = create_engine(f'sqlite:///{db_path}')
+    event.listen(engine, "connect", _register_functions)
     Base.metadata.create_all(engine)
+    ensure_search_index(engine)
     
     return engine
 
-def get_session(db_path="data/apprenticeships.db"):
+def ensure_search_index(engine):
+    """Create the full-text index and its triggers, indexing existing listings once"""
+    with engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+        ).first()
+        
+        if not exists:
+            connection.execute(text(SEARCH_INDEX_DDL[0]))
+            _fill_search_index(connection)
+        for statement in SEARCH_INDEX_DDL[1:]:
+            connection.execute(text(statement))
+
+def _fill_search_index(connection):
+    # Not FTS5 'rebuild': that would index inactive listings as well
+    connection.execute(text(
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)}) "
+        f"SELECT id, {', '.join(SEARCH_COLUMNS)} FROM apprenticeships WHERE is_active"
+    ))
+
+@contextmanager
+def search_index_suspended(session):
+    """
+    Bulk writes without the per-row index triggers
+    
+    The index is rebuilt in one pass at the end of the block, in the same
+    transaction; the caller commits.
+    """
+    connection = session.connection()
+    for trigger in ("ai", "ad", "au"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{trigger}"))
+    
+    try:
+        yield
+    except Exception:
+        # Data changes are rolled back; the triggers must come back either way
+        session.rollback()
+        ensure_search_index(session.get_bind())
+        raise
+    
+    connection = session.connection()
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')"))
+    _fill_search_index(connection)
+    for statement in SEARCH_INDEX_DDL[1:]:
+        connection.execute(text(statement))
+
+def rebuild_search_index(session):
+    """Re-index all active listings and merge the index segments"""
+    connection = session.connection()
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')"))
+    _fill_search_index(connection)
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"))
+    session.commit()
+
+def get_engine(db_path=None):
+    """Get the shared engine for a database, creating tables on first use"""
+    db_path = resolve_db_path(db_path)
+    engine = _engines.get(db_path)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(db_path)
+            if engine is None:
+                engine = create_database(db_path)
+                _session_factories[db_path] = sessionmaker(bind=engine)
+                _engines[db_path] = engine
+    return engine
+
+def get_session(db_path=None):
     """Get database session"""
-    engine = create_database(db_path)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    db_path = resolve_db_path(db_path)
+    get_engine(db_path)
+    return _session_factories[db_path]()
+
+def get_data_generation(session):
+    """Get the current data generation (0 if listings were never published)"""
+    row = session.query(DataGeneration).filter_by(id=1).first()
+    return row.generation if row else 0
+
+def bump_data_generation(session):
+    """Mark listings as changed so caches built on older data are invalidated"""
+    row = session.query(DataGeneration).filter_by(id=1).first()
+    if row is None:
+        row = DataGeneration(id=1, generation=0)
+        session.add(row)
+    row.generation = (row.generation or 0) + 1
+    row.updated_at = datetime.utcnow()
+    session.commit()
+    return row.generation
 
 if __name__ == "__main__":
     # Test database creation
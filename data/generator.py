@@ -0,0 +1,327 @@
+"""
+Synthetic apprenticeship corpus for load and scale testing
+
+Generates realistic Company and Apprenticeship rows offline and bulk-loads
+them. The same seed (and reference date) always produces the same corpus.
+
+Usage:
+    python data/generator.py --listings 10000 --seed 42 --db data/synthetic.db --clear
+"""
+import sys
+import os
+import itertools
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import Company, Apprenticeship, get_session, bump_data_generation, search_index_suspended
+from matcher.questionnaire import ApprenticeshipQuestionnaire, InterestCategory
+
+SYNTHETIC_PLATFORM = "synthetic"
+
+# Cities with their PLZ range and a weight roughly following the number of listings
+CITIES = [
+    ("Zürich", 8001, 60, 22),
+    ("Winterthur", 8400, 10, 5),
+    ("Bern", 3001, 30, 11),
+    ("Basel", 4001, 60, 9),
+    ("Genf", 1201, 20, 8),
+    ("Lausanne", 1003, 15, 7),
+    ("Luzern", 6003, 15, 6),
+    ("St. Gallen", 9000, 15, 5),
+    ("Aarau", 5000, 35, 5),
+    ("Lugano", 6900, 10, 4),
+    ("Zug", 6300, 10, 3),
+    ("Thun", 3600, 10, 3),
+    ("Biel", 2502, 8, 3),
+    ("Fribourg", 1700, 8, 3),
+    ("Chur", 7000, 8, 2),
+    ("Schaffhausen", 8200, 8, 2),
+    ("Neuchâtel", 2000, 8, 2)
+]
+
+# Relative number of openings per profession (unlisted professions weigh 1)
+PROFESSION_WEIGHTS = {
+    "Kaufmann/-frau EFZ": 12,
+    "Detailhandelsfachmann/-frau EFZ": 9,
+    "Fachmann/-frau Gesundheit EFZ": 8,
+    "Informatiker/in EFZ": 5,
+    "Logistiker/in EFZ": 4,
+    "Koch/Köchin EFZ": 4,
+    "Elektroniker/in EFZ": 3,
+    "Polymechaniker/in EFZ": 3,
+    "Medizinische/r Praxisassistent/in EFZ": 3,
+    "Detailhandelsassistent/in EBA": 3,
+    "Kaufmann/-frau EFZ Bank": 2,
+    "Maurer/in EFZ": 2,
+    "Gärtner/in EFZ": 2
+}
+
+# Description phrases per interest, containing the keywords the scoring engine looks for
+INTEREST_PHRASES = {
+    InterestCategory.TECHNICAL: [
+        "Du arbeitest mit moderner Technik und Software.",
+        "Montage und Reparatur von Anlagen in unserer Werkstatt.",
+        "Mathematik und technisches Verständnis sind gefragt.",
+        "Du lernst Computer und digitale Systeme kennen."
+    ],
+    InterestCategory.CREATIVE: [
+        "Du gestaltest eigene Ideen und Projekte.",
+        "Kreatives Arbeiten in Küche oder Atelier.",
+        "Handwerk mit Liebe zum Detail."
+    ],
+    InterestCategory.SOCIAL: [
+        "Du berätst unsere Kunden kompetent.",
+        "Kommunikation und Service stehen im Mittelpunkt.",
+        "Zusammenarbeit im Team ist uns wichtig."
+    ],
+    InterestCategory.BUSINESS: [
+        "Du unterstützt die Verwaltung im Büro.",
+        "Verkauf und Kalkulation gehören zu deinen Aufgaben.",
+        "Du lernst alle Abteilungen eines Betriebs kennen."
+    ],
+    InterestCategory.NATURE: [
+        "Du arbeitest viel draussen an der frischen Luft.",
+        "Garten, Pflanzen und Tiere gehören zu deinem Alltag.",
+        "Arbeit im Freien auf Baustelle und Strasse."
+    ],
+    InterestCategory.HEALTH: [
+        "Du betreust Patientinnen und Patienten in der Pflege.",
+        "Medizinische Abläufe und Hygiene im Labor.",
+        "Gesundheit und Wohlbefinden unserer Kunden liegen dir am Herzen."
+    ],
+    InterestCategory.SPORTS: [
+        "Bewegung und körperliche Arbeit gehören dazu.",
+        "Du organisierst Kurse und Trainings."
+    ],
+    InterestCategory.LANGUAGES: [
+        "Du kommunizierst in mehreren Sprachen.",
+        "Korrespondenz mit internationalen Kunden."
+    ]
+}
+
+WORK_STYLE_PHRASES = [
+    "Du arbeitest in einem motivierten Team.",
+    "Selbständig und mit Eigenverantwortung arbeiten.",
+    "Abwechslungsreiche Projekte in kleinen Gruppen.",
+    ""
+]
+
+REQUIREMENTS = [
+    "Abgeschlossene Sekundarschule A",
+    "Abgeschlossene Sekundarschule B",
+    "Sekundarschule A oder B, Schnupperlehre erwünscht",
+    "Gute Noten in Mathematik und Deutsch",
+    "Freude am Kundenkontakt",
+    "Handwerkliches Geschick"
+]
+
+BENEFITS = [
+    "5 Wochen Ferien", "Lehrlingslager", "Vergünstigtes Mittagessen", "ÖV-Beitrag",
+    "Laptop für die Berufsschule", "Flexible Arbeitszeiten"
+]
+
+# Company name parts; legal forms and words drive the estimated company size
+COMPANY_NAMES = [
+    "Müller", "Meier", "Schmid", "Keller", "Weber", "Huber", "Schneider", "Steiner",
+    "Fischer", "Brunner", "Baumann", "Gerber", "Frei", "Moser", "Zimmermann", "Widmer"
+]
+COMPANY_TRADES = [
+    "Technik", "Informatik", "Bau", "Garten", "Gastro", "Handel", "Logistik", "Treuhand",
+    "Elektro", "Metallbau", "Apotheke", "Praxis", "Holzbau", "Haustechnik"
+]
+COMPANY_FORMS = [
+    ("GmbH", "klein", 5), ("AG", "mittel", 4), ("Gruppe", "mittel", 1),
+    ("Schweiz AG", "gross", 1), ("International AG", "gross", 1)
+]
+
+def _cumulative(weights: List[float]) -> List[float]:
+    return list(itertools.accumulate(weights))
+
+def generate_companies(count: int, rng: random.Random, start_id: int = 1) -> List[Dict]:
+    """Generate company rows with explicit ids"""
+
+    city_weights = _cumulative([city[3] for city in CITIES])
+    form_weights = _cumulative([form[2] for form in COMPANY_FORMS])
+
+    companies = []
+    for i in range(count):
+        city, base_plz, spread, _ = rng.choices(CITIES, cum_weights=city_weights)[0]
+        form, size, _ = rng.choices(COMPANY_FORMS, cum_weights=form_weights)[0]
+        name = f"{rng.choice(COMPANY_NAMES)} {rng.choice(COMPANY_TRADES)} {form}"
+
+        companies.append({
+            "id": start_id + i,
+            "name": name,
+            "website": f"https://www.{name.split()[0].lower()}-{start_id + i}.invalid",
+            "size": size,
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "location": city,
+            "postal_code": str(base_plz + rng.randint(0, spread))
+        })
+
+    return companies
+
+def generate_apprenticeships(count: int, companies: List[Dict], rng: random.Random,
+                             seed: int, reference_date: datetime,
+                             active_share: float = 0.85, missing_postal_share: float = 0.03) -> List[Dict]:
+    """Generate apprenticeship rows for the given companies"""
+
+    profession_mapping = ApprenticeshipQuestionnaire().get_profession_mapping()
+    professions = list(profession_mapping)
+    profession_weights = _cumulative([PROFESSION_WEIGHTS.get(profession, 1) for profession in professions])
+    categories = list(InterestCategory)
+
+    apprenticeships = []
+    for i in range(count):
+        company = rng.choice(companies)
+        profession = rng.choices(professions, cum_weights=profession_weights)[0]
+        interests = profession_mapping[profession]
+
+        phrases = [rng.choice(INTEREST_PHRASES[interest]) for interest in interests]
+        phrases.append(rng.choice(INTEREST_PHRASES[rng.choice(categories)]))
+        phrases.append(rng.choice(WORK_STYLE_PHRASES))
+        description = f"Lehrstelle als {profession} bei {company['name']}. " + " ".join(p for p in phrases if p)
+
+        # Inactive listings have not been seen by the scraper for a while
+        is_active = rng.random() < active_share
+        updated_at = reference_date - timedelta(days=rng.randint(0, 25) if is_active else rng.randint(31, 365))
+        created_at = updated_at - timedelta(days=rng.randint(0, 120))
+        start_year = reference_date.year + (1 if reference_date.month >= 8 else 0)
+        salary_min = rng.choice([700, 750, 800, 850, 900])
+
+        apprenticeships.append({
+            "company_id": company["id"],
+            "title": f"Lehrstelle {profession}",
+            "profession": profession,
+            "description": description,
+            "requirements": ", ".join(rng.sample(REQUIREMENTS, 2)),
+            "benefits": ", ".join(rng.sample(BENEFITS, 3)),
+            "location": company["location"],
+            "postal_code": None if rng.random() < missing_postal_share else company["postal_code"],
+            "start_date": f"August {start_year}",
+            "duration_years": 2 if "EBA" in profession else rng.choice([3, 3, 4]),
+            "salary_min": salary_min,
+            "salary_max": salary_min + rng.choice([600, 800, 1000]),
+            "application_deadline": reference_date + timedelta(days=rng.randint(14, 180)),
+            "application_url": f"https://synthetic.invalid/bewerben/{seed}/{i}",
+            "source_url": f"https://synthetic.invalid/lehrstelle/{seed}/{i}",
+            "source_platform": SYNTHETIC_PLATFORM,
+            "company_name": company["name"],
+            "is_active": is_active,
+            "created_at": created_at,
+            "updated_at": updated_at
+        })
+
+    return apprenticeships
+
+def generate_corpus(listings: int, companies: Optional[int] = None, seed: int = 42,
+                    reference_date: Optional[datetime] = None, start_company_id: int = 1) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Generate company and apprenticeship rows
+
+    Args:
+        listings: Number of apprenticeships
+        companies: Number of companies (default: one per 5 listings)
+        seed: Random seed
+        reference_date: "Today" for dates (default: now; fix it for identical output)
+        start_company_id: First company id
+
+    Returns:
+        Company rows and apprenticeship rows
+    """
+
+    rng = random.Random(seed)
+    reference_date = reference_date or datetime.now()
+
+    company_rows = generate_companies(companies or max(1, listings // 5), rng, start_company_id)
+    apprenticeship_rows = generate_apprenticeships(listings, company_rows, rng, seed, reference_date)
+
+    return company_rows, apprenticeship_rows
+
+def load_synthetic_corpus(listings: int, seed: int = 42, db_path: Optional[str] = None,
+                          clear: bool = False, reference_date: Optional[datetime] = None,
+                          batch_size: int = 5000) -> Dict:
+    """
+    Generate a corpus and bulk-load it into the database
+
+    Args:
+        listings: Number of apprenticeships
+        seed: Random seed
+        db_path: Database (default: DATABASE_PATH or data/apprenticeships.db)
+        clear: Delete all existing companies and apprenticeships first
+        reference_date: "Today" for dates (default: now)
+        batch_size: Rows per INSERT batch
+
+    Returns:
+        Load statistics
+    """
+
+    session = get_session(db_path)
+    started_at = datetime.now()
+
+    try:
+        # Full-text index is rebuilt once at the end instead of row by row
+        with search_index_suspended(session):
+            if clear:
+                session.query(Apprenticeship).delete()
+                session.query(Company).delete()
+
+            start_company_id = (session.query(func.max(Company.id)).scalar() or 0) + 1
+            company_rows, apprenticeship_rows = generate_corpus(
+                listings, seed=seed, reference_date=reference_date, start_company_id=start_company_id
+            )
+
+            company_columns = {column.name for column in Company.__table__.columns}
+            company_rows = [{k: v for k, v in row.items() if k in company_columns} for row in company_rows]
+
+            # Executemany on the tables (bypasses the ORM), one transaction for the whole corpus
+            for start in range(0, len(company_rows), batch_size):
+                session.execute(Company.__table__.insert(), company_rows[start:start + batch_size])
+            for start in range(0, len(apprenticeship_rows), batch_size):
+                session.execute(Apprenticeship.__table__.insert(), apprenticeship_rows[start:start + batch_size])
+        session.commit()
+
+        bump_data_generation(session)
+
+        return {
+            "companies": len(company_rows),
+            "apprenticeships": len(apprenticeship_rows),
+            "active": sum(1 for row in apprenticeship_rows if row["is_active"]),
+            "duration_seconds": (datetime.now() - started_at).total_seconds()
+        }
+
+    except Exception:
+        session.rollback()
+        raise
+
+    finally:
+        session.close()
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Synthetic Apprenticeship Corpus Generator')
+    parser.add_argument('--listings', type=int, default=10000,
+                       help='Number of apprenticeships to generate')
+    parser.add_argument('--seed', type=int, default=42,
+                       help='Random seed')
+    parser.add_argument('--db', help='Database path (default: DATABASE_PATH or data/apprenticeships.db)')
+    parser.add_argument('--clear', action='store_true',
+                       help='Delete existing companies and apprenticeships first')
+
+    args = parser.parse_args()
+
+    stats = load_synthetic_corpus(args.listings, seed=args.seed, db_path=args.db, clear=args.clear)
+
+    print(f"Loaded {stats['apprenticeships']} apprenticeships ({stats['active']} active) "
+          f"from {stats['companies']} companies in {stats['duration_seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
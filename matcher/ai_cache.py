@@ -0,0 +1,127 @@
+"""
+Persistent cache for AI chat completions
+
+Entries are keyed by a hash of model, prompts and sampling parameters and
+store the parsed result (JSON), so reopening a detail page neither re-bills
+nor re-waits for the API. Entries expire after a TTL; the least recently used
+entries are evicted once the cache exceeds its size bound.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+DEFAULT_AI_CACHE_PATH = "data/ai_cache.db"
+
+class AIResponseCache:
+    """SQLite-backed LRU/TTL cache for parsed AI responses"""
+
+    def __init__(self, db_path: str = DEFAULT_AI_CACHE_PATH, ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 5000):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._connection = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(params: Dict, system_prompt: str, prompt: str) -> str:
+        """Hash of everything that determines the response"""
+        payload = json.dumps(
+            {"params": params, "system": system_prompt, "prompt": prompt},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so engines without API key never create the file
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS ai_responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ai_responses_accessed ON ai_responses (accessed_at)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get(self, key: str):
+        """Cached value (decoded JSON) or None"""
+        with self._lock:
+            try:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT value, created_at FROM ai_responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                now = time.time()
+                if row is None or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        connection.execute("DELETE FROM ai_responses WHERE key = ?", (key,))
+                        connection.commit()
+                    self.misses += 1
+                    return None
+
+                connection.execute("UPDATE ai_responses SET accessed_at = ? WHERE key = ?", (now, key))
+                connection.commit()
+                self.hits += 1
+                return json.loads(row[0])
+
+            except sqlite3.Error as e:
+                print(f"Could not read AI response cache: {e}")
+                self.misses += 1
+                return None
+
+    def put(self, key: str, value):
+        """Store a JSON-serializable value, evicting the least recently used entries"""
+        with self._lock:
+            try:
+                connection = self._connect()
+                now = time.time()
+                connection.execute(
+                    "INSERT OR REPLACE INTO ai_responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                connection.execute("DELETE FROM ai_responses WHERE created_at < ?", (now - self.ttl_seconds,))
+                connection.execute("""
+                    DELETE FROM ai_responses WHERE key IN (
+                        SELECT key FROM ai_responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+                connection.commit()
+
+            except sqlite3.Error as e:
+                print(f"Could not write AI response cache: {e}")
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM ai_responses")
+            connection.commit()
+
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            entries = None
+            if self._connection is not None:
+                entries = self._connection.execute("SELECT COUNT(*) FROM ai_responses").fetchone()[0]
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -1,8 +1,11 @@
 import openai
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import json
 import os
-from dataclasses import dataclass
+import queue
+import threading
+from dataclasses import dataclass, asdict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 import sys
 from dotenv import load_dotenv
 
@@ -14,6 +17,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from matcher.questionnaire import UserProfile, InterestCategory
 from matcher.scoring_engine import MatchScore, RankedApprenticeship
+from matcher.tracing import current_trace
+from matcher.ai_cache import AIResponseCache, DEFAULT_AI_CACHE_PATH
+from matcher.explanation_templates import ExplanationTemplates, DEFAULT_TEMPLATES_PATH
+from matcher.ai_output import (
+    RECOMMENDATION_JSON_FORMAT, JSONPrefixScanner, parse_recommendation_json, partial_recommendation
+)
+from matcher.outbound import ProviderGuard, bind_deadline, get_provider, remaining_time
 from data.database import Apprenticeship
 
 @dataclass
@@ -25,10 +35,30 @@ class AIRecommendation:
     next_steps: List[str]  # Recommended actions
     confidence: float  # 0-1 confidence in recommendation
 
+class RecommendationStream:
+    """Partial recommendations of a streamed explanation, read with the JSON prefix scanner"""
+    
+    def __init__(self):
+        self.scanner = JSONPrefixScanner()
+    
+    @property
+    def text(self) -> str:
+        return self.scanner.text
+    
+    def feed(self, chunk: str):
+        self.scanner.feed(chunk)
+    
+    def partial(self) -> Dict:
+        return partial_recommendation(self.scanner)
+
+EXPLANATION_SYSTEM_PROMPT = "Du bist ein erfahrener Schweizer Berufsberater, der Jugendlichen bei der Lehrstellenwahl hilft. Antworte immer auf Deutsch."
+SUMMARY_SYSTEM_PROMPT = "Du bist ein motivierender Berufsberater."
+
 class AIIntegration:
     """AI-powered recommendations and explanations"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, response_cache: Optional[AIResponseCache] = None,
+                 deterministic: Optional[bool] = None, outbound: Optional[ProviderGuard] = None):
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         
         if self.api_key:
@@ -37,6 +67,32 @@ class AIIntegration:
         else:
             self.client = None
         
+        self.model = os.getenv('OPENAI_CHAT_MODEL', 'gpt-3.5-turbo')
+        self.request_timeout = float(os.getenv('OPENAI_TIMEOUT_SECONDS', 30))
+        
+        # Shared rate limit and circuit breaker; an open breaker means fallbacks right away
+        self.outbound = outbound or get_provider("openai")
+        
+        # Time budget of deferred summaries; searches return before the summary is ready
+        self.summary_timeout = float(os.getenv('AI_SUMMARY_TIMEOUT_SECONDS', 10))
+        self._summary_executor = None
+        self._summary_executor_lock = threading.Lock()
+        
+        # Parsed responses survive restarts; same prompt and parameters = same entry
+        self.response_cache = response_cache or AIResponseCache(
+            db_path=os.getenv('AI_CACHE_PATH', DEFAULT_AI_CACHE_PATH),
+            ttl_seconds=float(os.getenv('AI_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+            max_entries=int(os.getenv('AI_CACHE_MAX_ENTRIES', 5000))
+        )
+        
+        # Deterministic sampling makes cached answers reproducible, so they can be reused freely
+        if deterministic is None:
+            deterministic = os.getenv('AI_DETERMINISTIC', '').lower() in ('1', 'true', 'yes')
+        self.deterministic = deterministic
+        
+        # Precomputed explanations per profile archetype and profession (offline job)
+        self.templates = ExplanationTemplates(os.getenv('EXPLANATION_TEMPLATES_PATH', DEFAULT_TEMPLATES_PATH))
+        
         # Fallback templates for when AI is not available
         self.fallback_templates = {
             "high_match": "Diese Lehrstelle passt sehr gut zu deinen Interessen und Fähigkeiten.",
@@ -51,15 +107,181 @@ class AIIntegration:
                                  match_score: MatchScore) -> AIRecommendation:
         """Generate detailed AI explanation for why this apprenticeship matches"""
         
-        if self.client and self.api_key:
+        templated = self._template_recommendation(user_profile, apprenticeship, match_score)
+        if templated is not None:
+            return templated
+        
+        if self._use_ai():
             return self._generate_ai_explanation(user_profile, apprenticeship, match_score)
         else:
             return self._generate_fallback_explanation(user_profile, apprenticeship, match_score)
     
-    def _generate_ai_explanation(self, user_profile: UserProfile, 
-                               apprenticeship: Apprenticeship, 
-                               match_score: MatchScore) -> AIRecommendation:
-        """Generate explanation using OpenAI"""
+    def stream_match_explanation(self, user_profile: UserProfile,
+                                 apprenticeship: Apprenticeship,
+                                 match_score: MatchScore) -> Iterator[AIRecommendation]:
+        """
+        Yield the explanation while it is being generated
+        
+        Partial recommendations fill up section by section as tokens arrive;
+        the last item is the complete recommendation, the same one
+        generate_match_explanation returns.
+        """
+        
+        templated = self._template_recommendation(user_profile, apprenticeship, match_score)
+        if templated is not None:
+            yield templated
+            return
+        
+        if not self._use_ai():
+            yield self._generate_fallback_explanation(user_profile, apprenticeship, match_score)
+            return
+        
+        prompt = self._explanation_prompt(user_profile, apprenticeship, match_score)
+        params = self._chat_params(max_tokens=500, json_output=True)
+        cache_key = self.response_cache.make_key(params, EXPLANATION_SYSTEM_PROMPT, prompt)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            current_trace().count("ai_cache.hit")
+            yield AIRecommendation(**dict(cached, confidence=match_score.total_score))
+            return
+        current_trace().count("ai_cache.miss")
+        
+        parser = RecommendationStream()
+        chunks = queue.Queue()
+        abandoned = threading.Event()
+        try:
+            current_trace().count("openai.requests")
+            # The provider is read on its own thread: the outbound slot times only the
+            # provider and is released once its stream ends, however slowly the consumer reads
+            threading.Thread(
+                target=bind_deadline(self._read_explanation_stream),
+                args=(prompt, params, chunks, abandoned),
+                name="ai-explanation-stream",
+                daemon=True
+            ).start()
+            
+            while True:
+                # Stall guard in case the reader thread hangs between chunks
+                delta = chunks.get(timeout=self.request_timeout)
+                if delta is None:
+                    break
+                if isinstance(delta, Exception):
+                    raise delta
+                
+                parser.feed(delta)
+                yield AIRecommendation(confidence=match_score.total_score, **parser.partial())
+            
+        except Exception as e:
+            print(f"Error streaming from OpenAI API: {e}")
+            current_trace().count("openai.errors")
+            yield self._generate_fallback_explanation(user_profile, apprenticeship, match_score)
+            return
+        
+        finally:
+            abandoned.set()
+        
+        recommendation, method = self._parse_ai_response(parser.text, match_score.total_score)
+        if method != "failed":
+            # Unusable answers are asked again next time instead of caching the fallback
+            self.response_cache.put(cache_key, asdict(recommendation))
+        yield recommendation
+    
+    def _read_explanation_stream(self, prompt: str, params: Dict, chunks: queue.Queue,
+                                 abandoned: threading.Event):
+        """Put the streamed text deltas into chunks, then None (or the exception that ended the call)"""
+        try:
+            with self.outbound.slot(self.request_timeout) as call_timeout:
+                stream = self.client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    timeout=call_timeout,
+                    stream=True,
+                    **params
+                )
+                
+                for chunk in stream:
+                    if abandoned.is_set():
+                        break  # Nobody reads the rest
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        chunks.put(delta)
+            
+            chunks.put(None)
+            
+        except Exception as e:
+            chunks.put(e)
+    
+    def generate_match_explanations(self, user_profile: UserProfile,
+                                    items: List[Tuple[Apprenticeship, MatchScore]],
+                                    max_concurrency: int = 4,
+                                    timeout: Optional[float] = None,
+                                    use_templates: bool = True) -> List[AIRecommendation]:
+        """
+        Generate explanations for several apprenticeships at once (e.g. the visible top-N)
+        
+        Requests run concurrently, at most max_concurrency at a time, so the batch
+        takes about as long as its slowest call. Items that fail or exceed the
+        per-request timeout get the fallback explanation.
+        """
+        
+        recommendations = [
+            self._template_recommendation(user_profile, app, score) if use_templates else None
+            for app, score in items
+        ]
+        missing = [i for i, recommendation in enumerate(recommendations) if recommendation is None]
+        
+        if not missing:
+            return recommendations
+        
+        if not self._use_ai():
+            for i in missing:
+                recommendations[i] = self._generate_fallback_explanation(user_profile, *items[i])
+            return recommendations
+        
+        timeout = timeout or self.request_timeout
+        max_concurrency = max(1, min(max_concurrency, len(missing)))
+        
+        executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ai-explanation")
+        try:
+            futures = [
+                executor.submit(bind_deadline(self._generate_ai_explanation), user_profile, *items[i], timeout)
+                for i in missing
+            ]
+            # Queued items start when a slot frees up, one timeout per wave
+            waves = -(-len(missing) // max_concurrency)
+            batch_timeout = timeout * waves
+            if remaining_time() is not None:
+                batch_timeout = max(min(batch_timeout, remaining_time()), 0.0)
+            done, _ = wait(futures, timeout=batch_timeout)
+        finally:
+            # Do not wait for stragglers; their results are replaced by the fallback
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        for future, i in zip(futures, missing):
+            if future in done and future.exception() is None:
+                recommendations[i] = future.result()
+            else:
+                current_trace().count("openai.timeouts")
+                recommendations[i] = self._generate_fallback_explanation(user_profile, *items[i])
+        
+        return recommendations
+    
+    def _template_recommendation(self, user_profile: UserProfile,
+                                 apprenticeship: Apprenticeship,
+                                 match_score: MatchScore) -> Optional[AIRecommendation]:
+        """Precomputed explanation for the profile's archetype and this profession, if any"""
+        
+        fields = self.templates.lookup(user_profile, apprenticeship, match_score)
+        current_trace().count("explanation_template.hit" if fields is not None else "explanation_template.miss")
+        
+        return AIRecommendation(**fields) if fields is not None else None
+    
+    def _explanation_prompt(self, user_profile: UserProfile, 
+                            apprenticeship: Apprenticeship, 
+                            match_score: MatchScore) -> str:
+        """Prompt of the detailed match explanation"""
         
         # Prepare context for AI
         context = self._prepare_context(user_profile, apprenticeship, match_score)
@@ -76,41 +298,70 @@ LEHRSTELLE:
 MATCH-SCORES:
 {context['scoring_context']}
 
-Erstelle eine persönliche Empfehlung mit folgenden Punkten:
-
-1. WARUM PASST ES? (2-3 Sätze)
-Erkläre konkret, warum diese Lehrstelle zu diesem Jugendlichen passt.
-
-2. WACHSTUMSPOTENTIAL (2-3 Sätze)
-Welche Karrieremöglichkeiten bietet diese Richtung?
-
-3. ÜBERLEGUNGEN (2-3 Sätze)
-Was sollte der Jugendliche bedenken oder beachten?
-
-4. NÄCHSTE SCHRITTE (3-4 Stichpunkte)
-Konkrete Handlungsempfehlungen.
+Erstelle eine persönliche Empfehlung. Antworte ausschliesslich mit einem JSON-Objekt in diesem Format:
+{RECOMMENDATION_JSON_FORMAT}
 
-Antworte auf Deutsch, persönlich und motivierend.
+Schreibe die Texte auf Deutsch, persönlich und motivierend.
 """
         
+        return prompt
+    
+    def _generate_ai_explanation(self, user_profile: UserProfile, 
+                               apprenticeship: Apprenticeship, 
+                               match_score: MatchScore,
+                               timeout: Optional[float] = None) -> AIRecommendation:
+        """Generate explanation using OpenAI"""
+        
+        prompt = self._explanation_prompt(user_profile, apprenticeship, match_score)
+        
+        params = self._chat_params(max_tokens=500, json_output=True)
+        cache_key = self.response_cache.make_key(params, EXPLANATION_SYSTEM_PROMPT, prompt)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            current_trace().count("ai_cache.hit")
+            return AIRecommendation(**dict(cached, confidence=match_score.total_score))
+        current_trace().count("ai_cache.miss")
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Du bist ein erfahrener Schweizer Berufsberater, der Jugendlichen bei der Lehrstellenwahl hilft. Antworte immer auf Deutsch."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
+            current_trace().count("openai.requests")
+            with current_trace().span("openai.match_explanation"), \
+                    self.outbound.slot(timeout or self.request_timeout) as call_timeout:
+                response = self.client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": EXPLANATION_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    timeout=call_timeout,
+                    **params
+                )
             
             ai_response = response.choices[0].message.content
-            return self._parse_ai_response(ai_response, match_score.total_score)
+            recommendation, method = self._parse_ai_response(ai_response, match_score.total_score)
+            if method != "failed":
+                # Unusable answers are asked again next time instead of caching the fallback
+                self.response_cache.put(cache_key, asdict(recommendation))
+            return recommendation
             
         except Exception as e:
             print(f"Error calling OpenAI API: {e}")
+            current_trace().count("openai.errors")
             return self._generate_fallback_explanation(user_profile, apprenticeship, match_score)
     
+    def _use_ai(self) -> bool:
+        """AI calls possible right now (API key set, provider not degraded)"""
+        return bool(self.client and self.api_key) and self.outbound.available()
+    
+    def _chat_params(self, max_tokens: int, json_output: bool = False) -> Dict:
+        """Sampling parameters (also part of the response cache key)"""
+        if self.deterministic:
+            params = {"model": self.model, "max_tokens": max_tokens, "temperature": 0, "seed": 0}
+        else:
+            params = {"model": self.model, "max_tokens": max_tokens, "temperature": 0.7}
+        
+        if json_output:
+            params["response_format"] = {"type": "json_object"}
+        return params
+    
     def _prepare_context(self, user_profile: UserProfile, 
                         apprenticeship: Apprenticeship, 
                         match_score: MatchScore) -> Dict[str, str]:
@@ -153,61 +404,36 @@ Gesamt-Match: {match_score.total_score:.1%}
             "scoring_context": scoring_context
         }
     
-    def _parse_ai_response(self, ai_response: str, total_score: float) -> AIRecommendation:
-        """Parse AI response into structured recommendation"""
+    def _parse_ai_response(self, ai_response: str, total_score: float) -> Tuple[AIRecommendation, str]:
+        """
+        Parse AI response into structured recommendation
         
-        # Simple parsing - in production, could use more sophisticated NLP
-        sections = ai_response.split('\n\n')
+        Returns:
+            The recommendation and the parse method; "failed" means the
+            score-based fallback was used
+        """
         
-        match_reason = ""
-        growth_potential = ""
-        considerations = ""
-        next_steps = []
+        sections, method = parse_recommendation_json(ai_response)
+        if sections is None:
+            # No usable JSON object (refusal, or the model ignored the format)
+            sections = {"match_reason": "", "growth_potential": "", "considerations": "", "next_steps": []}
+            method = "failed"
         
-        current_section = ""
-        for line in ai_response.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-                
-            if "WARUM PASST" in line.upper() or "1." in line:
-                current_section = "match"
-                continue
-            elif "WACHSTUM" in line.upper() or "POTENTIAL" in line.upper() or "2." in line:
-                current_section = "growth"
-                continue
-            elif "ÜBERLEGUNG" in line.upper() or "BEDENKEN" in line.upper() or "3." in line:
-                current_section = "considerations"
-                continue
-            elif "NÄCHSTE" in line.upper() or "SCHRITTE" in line.upper() or "4." in line:
-                current_section = "steps"
-                continue
-            elif line.startswith('-') or line.startswith('•'):
-                if current_section == "steps":
-                    next_steps.append(line[1:].strip())
-                continue
-                
-            if current_section == "match":
-                match_reason += line + " "
-            elif current_section == "growth":
-                growth_potential += line + " "
-            elif current_section == "considerations":
-                considerations += line + " "
-        
-        # Clean up texts
-        match_reason = match_reason.strip()
-        growth_potential = growth_potential.strip()
-        considerations = considerations.strip()
+        current_trace().count(f"ai_parse.{method}")
+        return self._recommendation_from_sections(sections, total_score), method
+    
+    def _recommendation_from_sections(self, sections: Dict, total_score: float) -> AIRecommendation:
+        """Final recommendation from parsed sections"""
         
         # If parsing failed, use fallback
-        if not match_reason:
+        if not sections["match_reason"]:
             return self._generate_fallback_explanation_from_score(total_score)
         
         return AIRecommendation(
-            match_reason=match_reason,
-            growth_potential=growth_potential,
-            considerations=considerations,
-            next_steps=next_steps if next_steps else self.fallback_templates["next_steps"],
+            match_reason=sections["match_reason"],
+            growth_potential=sections["growth_potential"],
+            considerations=sections["considerations"],
+            next_steps=sections["next_steps"] or self.fallback_templates["next_steps"],
             confidence=total_score
         )
     
@@ -248,13 +474,42 @@ Gesamt-Match: {match_score.total_score:.1%}
         if not ranked_apprenticeships:
             return "Keine passenden Lehrstellen gefunden."
         
-        if self.client and self.api_key:
+        if self._use_ai():
             return self._generate_ai_summary(ranked_apprenticeships)
         else:
             return self._generate_fallback_summary(ranked_apprenticeships)
     
-    def _generate_ai_summary(self, ranked_apprenticeships: List[RankedApprenticeship]) -> str:
-        """Generate AI summary of recommendations"""
+    def summarize_deferred(self, ranked_apprenticeships: List[RankedApprenticeship]) -> Tuple[str, Optional[Future]]:
+        """
+        Summary available now plus a future for the AI summary
+        
+        Returns the final summary and None if no AI call is needed (no results,
+        no API key, or a cached response). Otherwise returns the fallback summary
+        and a future resolving to the AI summary within summary_timeout.
+        """
+        
+        if not ranked_apprenticeships or not self._use_ai():
+            return self.generate_top_recommendations_summary(ranked_apprenticeships), None
+        
+        prompt = self._summary_prompt(ranked_apprenticeships)
+        cached = self.response_cache.get(
+            self.response_cache.make_key(self._chat_params(max_tokens=150), SUMMARY_SYSTEM_PROMPT, prompt)
+        )
+        if cached is not None:
+            current_trace().count("ai_cache.hit")
+            return cached, None
+        
+        with self._summary_executor_lock:
+            if self._summary_executor is None:
+                self._summary_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ai-summary")
+        
+        current_trace().count("ai_summary.deferred")
+        future = self._summary_executor.submit(self._generate_ai_summary, ranked_apprenticeships, self.summary_timeout)
+        
+        return self._generate_fallback_summary(ranked_apprenticeships), future
+    
+    def _summary_prompt(self, ranked_apprenticeships: List[RankedApprenticeship]) -> str:
+        """Prompt of the top recommendations summary"""
         
         top_3 = ranked_apprenticeships[:3]
         
@@ -272,21 +527,42 @@ Erkläre kurz, warum diese Optionen empfohlen werden und ermutige zur weiteren R
 Antworte auf Deutsch.
 """
         
+        return prompt
+    
+    def _generate_ai_summary(self, ranked_apprenticeships: List[RankedApprenticeship],
+                             timeout: Optional[float] = None) -> str:
+        """Generate AI summary of recommendations"""
+        
+        prompt = self._summary_prompt(ranked_apprenticeships)
+        
+        params = self._chat_params(max_tokens=150)
+        cache_key = self.response_cache.make_key(params, SUMMARY_SYSTEM_PROMPT, prompt)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            current_trace().count("ai_cache.hit")
+            return cached
+        current_trace().count("ai_cache.miss")
+        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "Du bist ein motivierender Berufsberater."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=150,
-                temperature=0.7
-            )
+            current_trace().count("openai.requests")
+            with current_trace().span("openai.summary"), \
+                    self.outbound.slot(timeout or self.request_timeout) as call_timeout:
+                response = self.client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    timeout=call_timeout,
+                    **params
+                )
             
-            return response.choices[0].message.content
+            summary = response.choices[0].message.content
+            self.response_cache.put(cache_key, summary)
+            return summary
             
         except Exception as e:
             print(f"Error generating AI summary: {e}")
+            current_trace().count("openai.errors")
             return self._generate_fallback_summary(ranked_apprenticeships)
     
     def _generate_fallback_summary(self, ranked_apprenticeships: List[RankedApprenticeship]) -> str:
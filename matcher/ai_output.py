@@ -0,0 +1,206 @@
+"""
+Structured (JSON) output of the AI explanations
+
+The explanation prompt asks for a JSON object with the AIRecommendation
+fields. parse_recommendation_json validates the response; responses that are
+not plain JSON (code fences, surrounding prose, trailing commas, German keys,
+output cut off at max_tokens) go through a small repair path instead of being
+thrown away. JSONPrefixScanner also yields partial fields while a response is
+still streaming.
+"""
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Format block of the explanation prompt
+RECOMMENDATION_JSON_FORMAT = """{
+  "match_reason": "2-3 Sätze: warum diese Lehrstelle konkret zu diesem Jugendlichen passt",
+  "growth_potential": "2-3 Sätze: welche Karrieremöglichkeiten diese Richtung bietet",
+  "considerations": "2-3 Sätze: was der Jugendliche bedenken oder beachten sollte",
+  "next_steps": ["3-4 konkrete Handlungsempfehlungen"]
+}"""
+
+# Keys the model sometimes uses instead of the requested ones
+KEY_ALIASES = {
+    "match_reason": "match_reason", "warum_passt_es": "match_reason", "warum": "match_reason",
+    "begruendung": "match_reason", "begründung": "match_reason",
+    "growth_potential": "growth_potential", "wachstumspotential": "growth_potential",
+    "wachstumspotenzial": "growth_potential", "wachstum": "growth_potential",
+    "considerations": "considerations", "ueberlegungen": "considerations",
+    "überlegungen": "considerations", "bedenken": "considerations",
+    "next_steps": "next_steps", "naechste_schritte": "next_steps",
+    "nächste_schritte": "next_steps", "schritte": "next_steps"
+}
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+LIST_MARKER = re.compile(r"^\s*(?:[-•*]|\d+[.)])\s*")
+
+class JSONPrefixScanner:
+    """
+    Incremental scan of a (possibly incomplete) JSON object in model output
+
+    Tracks string state and open brackets of the first top-level object, so a
+    truncated prefix can be closed into parseable JSON. Text before the first
+    '{' and after the object (code fences, prose) is ignored.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.start: Optional[int] = None  # Index of the opening '{'
+        self.end: Optional[int] = None  # Index after the closing '}'
+        self._pos = 0
+        self._in_string = False
+        self._escape = False
+        self._escape_start = -1  # Index of the last backslash escape in a string
+        self._stack: List[str] = []  # Expected closing brackets
+        self._last_comma: Optional[Tuple[int, Tuple[str, ...]]] = None
+
+    def feed(self, chunk: str):
+        self.text += chunk
+        text = self.text
+        i = self._pos
+
+        if self.start is None:
+            start = text.find("{", i)
+            if start < 0:
+                self._pos = len(text)
+                return
+            self.start = i = start
+
+        while i < len(text) and self.end is None:
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                    self._escape_start = i
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._stack.append("}")
+            elif ch == "[":
+                self._stack.append("]")
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self.end = i + 1
+            elif ch == ",":
+                self._last_comma = (i, tuple(self._stack))
+            i += 1
+
+        self._pos = i
+
+    def candidates(self) -> List[str]:
+        """JSON texts to try: the complete object, or closings of the truncated prefix"""
+        if self.start is None:
+            return []
+        if self.end is not None:
+            return [self.text[self.start:self.end]]
+
+        body = self.text[self.start:]
+        if self._in_string:
+            # Cut an unfinished escape sequence (backslash or partial \uXXXX)
+            escape = self.text[self._escape_start:]
+            if self._escape or (escape.startswith("\\u") and len(escape) < 6):
+                body = self.text[self.start:self._escape_start]
+        candidates = [body + ('"' if self._in_string else "") + "".join(reversed(self._stack))]
+
+        # Drop a dangling key or unfinished value after the last comma
+        if self._last_comma is not None:
+            position, stack = self._last_comma
+            candidates.append(self.text[self.start:position] + "".join(reversed(stack)))
+
+        return candidates
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return " ".join(str(item).strip() for item in value if str(item).strip())
+    return None
+
+def _steps(value) -> Optional[List[str]]:
+    if isinstance(value, str):
+        value = value.splitlines()
+    if not isinstance(value, list):
+        return None
+    steps = [LIST_MARKER.sub("", str(step)).strip() for step in value if not isinstance(step, (dict, list))]
+    return [step for step in steps if step]
+
+def normalize_recommendation(data, partial: bool = False) -> Optional[Dict]:
+    """
+    Validated recommendation fields of a decoded response
+
+    Returns None if the response does not match the schema; unless partial,
+    a non-empty match_reason is required.
+    """
+    if not isinstance(data, dict):
+        return None
+
+    # Single wrapper object, e.g. {"empfehlung": {...}}
+    if len(data) == 1:
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict):
+            data = inner
+
+    fields = {"match_reason": "", "growth_potential": "", "considerations": "", "next_steps": []}
+    for key, value in data.items():
+        field = KEY_ALIASES.get(str(key).strip().lower().rstrip("?").replace(" ", "_").replace("-", "_"))
+        if field is None:
+            continue
+
+        parsed = _steps(value) if field == "next_steps" else _text(value)
+        if parsed is None:
+            if partial:
+                continue
+            return None
+        fields[field] = parsed
+
+    if not partial and not fields["match_reason"]:
+        return None
+    return fields
+
+def parse_recommendation_json(text: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Recommendation fields of a response and how they were obtained
+
+    Returns (fields, "json") for valid JSON, (fields, "repaired") if the
+    response needed repairs, and (None, None) if it holds no usable object.
+    """
+    try:
+        fields = normalize_recommendation(json.loads(text))
+        if fields is not None:
+            return fields, "json"
+    except ValueError:
+        pass
+
+    scanner = JSONPrefixScanner()
+    scanner.feed(text)
+    for candidate in scanner.candidates():
+        for variant in (candidate, TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                data = json.loads(variant)
+            except ValueError:
+                continue
+            fields = normalize_recommendation(data)
+            if fields is not None:
+                return fields, "repaired"
+
+    return None, None
+
+def partial_recommendation(scanner: JSONPrefixScanner) -> Dict:
+    """Fields streamed so far (empty values for fields not yet started)"""
+    for candidate in scanner.candidates():
+        for variant in (candidate, TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                fields = normalize_recommendation(json.loads(variant), partial=True)
+            except ValueError:
+                continue
+            if fields is not None:
+                return fields
+
+    return {"match_reason": "", "growth_potential": "", "considerations": "", "next_steps": []}
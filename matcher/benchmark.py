@@ -0,0 +1,328 @@
+"""
+Benchmark harness for the matching pipeline
+
+Seeds synthetic databases at several scales, runs the pipeline stage by stage
+with network backends stubbed and writes machine-readable JSON reports.
+
+Usage:
+    python matcher/benchmark.py --scales 1000 10000 100000 --output benchmark.json
+    python matcher/benchmark.py --compare benchmark.json
+"""
+import sys
+import os
+import json
+import random
+import platform
+import resource
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher.questionnaire import UserProfile, InterestCategory, SkillLevel, create_sample_profile
+from matcher.commute_matrix import CommuteMatrix
+from matcher.candidates import load_candidate_rows
+from matcher.scoring_engine import CandidateScoreTable
+from data.database import Apprenticeship, get_session
+from data.generator import CITIES, load_synthetic_corpus
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+DEFAULT_BENCHMARK_DIR = "data/benchmark"
+
+# Pipeline stages in execution order
+STAGES = ['distance_filter', 'sector_filter', 'db_load', 'scoring', 'sort', 'ranking', 'ai_summary']
+
+# Free-text queries of the search benchmark (specific, prefix and very broad terms)
+SEARCH_QUERIES = ["Informatik", "Koch", "Kauf", "Pflege", "Elektro", "Zimmermann", "EFZ"]
+
+# User locations of the benchmark profiles
+BENCHMARK_POSTAL_CODES = [str(base_plz) for _, base_plz, _, _ in CITIES[:6]]
+
+def seed_benchmark_database(db_path: str, listings: int, seed: int = 42) -> int:
+    """
+    Fill a database with a synthetic corpus (reused if it already has the right size)
+
+    Returns:
+        Number of listings in the database
+    """
+
+    session = get_session(db_path)
+    try:
+        existing = session.query(Apprenticeship).count()
+    finally:
+        session.close()
+
+    if existing != listings:
+        load_synthetic_corpus(listings, seed=seed, db_path=db_path, clear=True)
+
+    return listings
+
+def make_benchmark_profiles(count: int, seed: int = 42) -> List[UserProfile]:
+    """Deterministic, varied user profiles"""
+
+    rng = random.Random(seed)
+    base = create_sample_profile()
+    sectors = ['gastronomy', 'retail', 'construction', 'finance', 'healthcare']
+
+    profiles = []
+    for _ in range(count):
+        profiles.append(UserProfile(
+            age=rng.randint(15, 19),
+            location=base.location,
+            postal_code=rng.choice(BENCHMARK_POSTAL_CODES),
+            max_commute_minutes=rng.choice([30, 45, 60, 90]),
+            preferred_transport=rng.choice(["public", "car", "bike"]),
+            interests={category: rng.randint(1, 5) for category in InterestCategory},
+            technical_skills={skill: rng.choice(list(SkillLevel)) for skill in base.technical_skills},
+            soft_skills={skill: rng.randint(1, 5) for skill in base.soft_skills},
+            company_size_preference=rng.choice(["small", "medium", "large", "any"]),
+            work_environment=rng.choice(["office", "field", "mixed", "any"]),
+            team_vs_individual=rng.randint(1, 5),
+            career_goals=base.career_goals,
+            salary_importance=base.salary_importance,
+            growth_importance=base.growth_importance,
+            avoid_sectors=rng.sample(sectors, rng.randint(0, 2)),
+            required_benefits=base.required_benefits
+        ))
+
+    return profiles
+
+def stub_network(engine):
+    """Make the engine use only offline fallbacks (no Google Maps, no OpenAI, no commute matrix)"""
+    engine.distance_calculator.api_key = None
+    engine.distance_calculator.commute_matrix = CommuteMatrix(matrix_dir=os.path.join(DEFAULT_BENCHMARK_DIR, "no_matrix"))
+    engine.ai_integration.api_key = None
+    engine.ai_integration.client = None
+    engine.text_matcher.api_key = None
+
+def run_pipeline_stages(engine, user_profile: UserProfile, limit: int = 20, min_score: float = 0.3) -> Dict[str, float]:
+    """
+    Run the matching pipeline once, timing each stage (same steps as _find_matches_uncached)
+
+    Returns:
+        Seconds per stage, plus 'total' and the number of results
+    """
+
+    timings = {}
+    session = get_session()
+
+    try:
+        start = time.perf_counter()
+        isochrone = engine._get_isochrone(session, user_profile)
+        reachable = isochrone.within(user_profile.max_commute_minutes)
+        timings['distance_filter'] = time.perf_counter() - start
+
+        # Only builds the clause, the exclusion itself runs in SQL during db_load
+        start = time.perf_counter()
+        clauses = engine.query_planner.build_clauses(
+            avoid_sectors=user_profile.avoid_sectors, reachable_postal_codes=reachable, custom_filters=None
+        )
+        timings['sector_filter'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        candidates = load_candidate_rows(session, clauses)
+        minutes_by_postal = isochrone.minutes_by_postal()
+        commute_minutes = np.array(
+            [minutes_by_postal.get(candidate.postal_code, np.nan) for candidate in candidates], dtype=float
+        )
+        timings['db_load'] = time.perf_counter() - start
+
+    finally:
+        session.close()
+
+    # Features from the published snapshot (extracted without one), scored as one matrix row
+    start = time.perf_counter()
+    features = engine._candidate_features(candidates)
+    sub_scores = engine.scoring_engine.score_profiles([user_profile], features, commute_minutes[np.newaxis, :])[0]
+    table = CandidateScoreTable.from_sub_scores(candidates, sub_scores, commute_minutes, engine.scoring_engine.weights)
+    timings['scoring'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top = table.select(min_score=min_score, limit=limit)
+    timings['sort'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranked = engine.scoring_engine.build_ranked(user_profile, table, top)
+    engine._hydrate_results(ranked)
+    timings['ranking'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.ai_integration.generate_top_recommendations_summary(ranked)
+    timings['ai_summary'] = time.perf_counter() - start
+
+    timings['total'] = sum(timings[stage] for stage in STAGES)
+    timings['candidates'] = len(candidates)
+    timings['results'] = len(ranked)
+
+    return timings
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean in milliseconds"""
+    if not seconds:
+        return {}
+
+    p50, p95, p99 = np.percentile(np.array(seconds) * 1000, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(np.mean(seconds) * 1000), 3)
+    }
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def benchmark_scale(listings: int, runs: int = 10, seed: int = 42,
+                    benchmark_dir: str = DEFAULT_BENCHMARK_DIR) -> Dict:
+    """Benchmark the pipeline against a synthetic database with the given number of listings"""
+
+    from matcher.matching_engine import ApprenticeshipMatchingEngine
+
+    db_path = os.path.join(benchmark_dir, f"listings_{listings}.db")
+
+    start = time.perf_counter()
+    seed_benchmark_database(db_path, listings, seed)
+    seed_seconds = time.perf_counter() - start
+
+    previous_db_path = os.environ.get("DATABASE_PATH")
+    os.environ["DATABASE_PATH"] = db_path
+
+    try:
+        engine = ApprenticeshipMatchingEngine()
+        stub_network(engine)
+        profiles = make_benchmark_profiles(runs, seed)
+
+        # First run fills the isochrone cache
+        cold = run_pipeline_stages(engine, profiles[0])
+
+        measured = [run_pipeline_stages(engine, user_profile) for user_profile in profiles]
+
+        search_seconds = []
+        for _ in range(runs):
+            for query in SEARCH_QUERIES:
+                start = time.perf_counter()
+                engine.search_apprenticeships(query)
+                search_seconds.append(time.perf_counter() - start)
+
+        # Allocation peak of one warm run (tracemalloc slows the run down, so it is not timed)
+        tracemalloc.start()
+        run_pipeline_stages(engine, profiles[0])
+        _, peak_alloc = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    finally:
+        if previous_db_path is None:
+            os.environ.pop("DATABASE_PATH", None)
+        else:
+            os.environ["DATABASE_PATH"] = previous_db_path
+
+    return {
+        "listings": listings,
+        "runs": runs,
+        "seed_seconds": round(seed_seconds, 3),
+        "cold_ms": round(cold['total'] * 1000, 3),
+        "latency": latency_summary([timings['total'] for timings in measured]),
+        "stages": {stage: latency_summary([timings[stage] for timings in measured]) for stage in STAGES},
+        "search": latency_summary(search_seconds),
+        "avg_candidates": float(np.mean([timings['candidates'] for timings in measured])),
+        "avg_results": float(np.mean([timings['results'] for timings in measured])),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_alloc_mb": round(peak_alloc / (1024 * 1024), 2)
+    }
+
+def run_benchmark(scales: Optional[List[int]] = None, runs: int = 10, seed: int = 42,
+                  benchmark_dir: str = DEFAULT_BENCHMARK_DIR) -> Dict:
+    """Benchmark all scales and return the JSON report"""
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform()
+        },
+        "seed": seed,
+        "scales": {}
+    }
+
+    for listings in scales or DEFAULT_SCALES:
+        print(f"Benchmarking {listings} listings...")
+        report["scales"][str(listings)] = benchmark_scale(listings, runs, seed, benchmark_dir)
+
+    return report
+
+def compare_reports(baseline: Dict, current: Dict) -> Dict[str, Dict[str, float]]:
+    """p50 ratio current/baseline per scale and stage (< 1 = faster)"""
+
+    comparison = {}
+    for scale, result in current["scales"].items():
+        if scale not in baseline["scales"]:
+            continue
+
+        base = baseline["scales"][scale]
+        ratios = {}
+        for stage in STAGES:
+            old = base["stages"].get(stage, {}).get("p50_ms")
+            new = result["stages"].get(stage, {}).get("p50_ms")
+            if old and new is not None:
+                ratios[stage] = round(new / old, 3)
+        if base["latency"].get("p50_ms"):
+            ratios["total"] = round(result["latency"]["p50_ms"] / base["latency"]["p50_ms"], 3)
+
+        comparison[scale] = ratios
+
+    return comparison
+
+def print_report(report: Dict):
+    """Print a readable summary of a benchmark report"""
+
+    for scale, result in report["scales"].items():
+        print(f"\n=== {scale} listings ({result['avg_candidates']:.0f} candidates per run) ===")
+        print(f"Latency: p50={result['latency']['p50_ms']:.1f}ms p95={result['latency']['p95_ms']:.1f}ms "
+              f"p99={result['latency']['p99_ms']:.1f}ms (cold {result['cold_ms']:.1f}ms)")
+        for stage in STAGES:
+            print(f"  {stage:16s} p50={result['stages'][stage]['p50_ms']:9.3f}ms  p95={result['stages'][stage]['p95_ms']:9.3f}ms")
+        if result.get('search'):
+            print(f"Search: p50={result['search']['p50_ms']:.2f}ms p95={result['search']['p95_ms']:.2f}ms")
+        print(f"Peak RSS: {result['peak_rss_mb']} MB, peak allocations: {result['peak_alloc_mb']} MB")
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Matching Pipeline Benchmark')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                       help='Numbers of listings to benchmark')
+    parser.add_argument('--runs', type=int, default=10,
+                       help='Measured runs per scale')
+    parser.add_argument('--seed', type=int, default=42,
+                       help='Seed for synthetic data and profiles')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+
+    args = parser.parse_args()
+
+    report = run_benchmark(args.scales, args.runs, args.seed)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\n=== p50 ratio vs baseline (< 1 = faster) ===")
+        for scale, ratios in compare_reports(baseline, report).items():
+            print(f"{scale}: " + ", ".join(f"{stage}={ratio}" for stage, ratio in ratios.items()))
+
+if __name__ == "__main__":
+    main()
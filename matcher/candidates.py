@@ -0,0 +1,104 @@
+"""
+Lightweight candidate rows for the matching hot path
+"""
+import sys
+import os
+import tracemalloc
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, select
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import get_session, Apprenticeship
+
+class CandidateRow:
+    """Scoring-relevant fields of an apprenticeship, loaded without the ORM"""
+    
+    __slots__ = (
+        'id', 'title', 'profession', 'description', 'requirements',
+        'location', 'postal_code', 'company_name', 'source_url'
+    )
+    
+    def __init__(self, id, title, profession, description, requirements,
+                 location, postal_code, company_name, source_url):
+        self.id = id
+        self.title = title
+        self.profession = profession
+        self.description = description
+        self.requirements = requirements
+        self.location = location
+        self.postal_code = postal_code
+        self.company_name = company_name
+        self.source_url = source_url
+    
+    def __repr__(self):
+        return f"CandidateRow(id={self.id}, title={self.title!r})"
+
+# Columns in CandidateRow order
+CANDIDATE_COLUMNS = [getattr(Apprenticeship, name) for name in CandidateRow.__slots__]
+
+def load_candidate_rows(session, clauses: List, limit: Optional[int] = None) -> List[CandidateRow]:
+    """Load candidates with a Core select (no identity map, no instrumentation)"""
+    
+    statement = select(*CANDIDATE_COLUMNS).where(and_(*clauses)).order_by(Apprenticeship.id)
+    if limit:
+        statement = statement.limit(limit)
+    return [CandidateRow(*row) for row in session.execute(statement)]
+
+def hydrate_apprenticeships(session, ids: List[int]) -> Dict[int, Apprenticeship]:
+    """Load full ORM objects for the given ids (final displayed results only)"""
+    
+    if not ids:
+        return {}
+    
+    apprenticeships = session.query(Apprenticeship).filter(Apprenticeship.id.in_(ids)).all()
+    return {app.id: app for app in apprenticeships}
+
+def measure_candidate_memory(limit: int = 5000) -> Dict:
+    """Compare memory per candidate for ORM objects and CandidateRows"""
+    
+    session = get_session()
+    
+    try:
+        results = {}
+        
+        tracemalloc.start()
+        apprenticeships = session.query(Apprenticeship).filter_by(is_active=True).limit(limit).all()
+        orm_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        count = len(apprenticeships)
+        del apprenticeships
+        session.expunge_all()
+        
+        tracemalloc.start()
+        rows = load_candidate_rows(session, [Apprenticeship.is_active == True], limit=limit)
+        row_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del rows
+        
+        if count:
+            results = {
+                "candidates": count,
+                "orm_bytes_per_candidate": orm_bytes / count,
+                "row_bytes_per_candidate": row_bytes / count,
+                "reduction": 1 - row_bytes / orm_bytes if orm_bytes else 0.0
+            }
+        
+        return results
+        
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    stats = measure_candidate_memory()
+    
+    if not stats:
+        print("No apprenticeships in database. Run scraper first.")
+    else:
+        print("=== Memory per Candidate ===")
+        print(f"Candidates: {stats['candidates']}")
+        print(f"ORM objects: {stats['orm_bytes_per_candidate']:.0f} bytes")
+        print(f"CandidateRow: {stats['row_bytes_per_candidate']:.0f} bytes")
+        print(f"Reduction: {stats['reduction']:.0%}")
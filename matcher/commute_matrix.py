@@ -0,0 +1,215 @@
+"""
+Precomputed PLZ-to-PLZ commute matrix stored as memory-mapped uint16 minutes
+
+Every build is written to its own directory and published by atomically
+replacing the CURRENT pointer file; running servers pick it up via refresh().
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Sentinel for routes that could not be calculated
+UNREACHABLE = np.iinfo(np.uint16).max
+
+# Transport modes stored in the matrix (values of UserProfile.preferred_transport)
+MATRIX_MODES = ["public", "car", "bike", "walk", "mixed"]
+
+# Google Maps mode names map onto the same matrix
+MODE_ALIASES = {
+    "transit": "public",
+    "driving": "car",
+    "bicycling": "bike",
+    "walking": "walk"
+}
+
+DEFAULT_MATRIX_DIR = "data/commute_matrix"
+
+# Name of the published matrix build inside the matrix directory
+CURRENT_FILE = "CURRENT"
+
+class CommuteMatrix:
+    """Read-only access to a precomputed commute matrix, one file per transport mode"""
+
+    def __init__(self, matrix_dir: str = DEFAULT_MATRIX_DIR):
+        self.matrix_dir = matrix_dir
+        self.origin_index: Dict[str, int] = {}
+        self.destination_index: Dict[str, int] = {}
+        self.matrices: Dict[str, np.ndarray] = {}
+        self.generated_at: Optional[str] = None
+        self.source: Optional[str] = None
+        self._tables = ({}, {}, {})  # (origin_index, destination_index, matrices), swapped as one
+        self._mtime = None
+
+        self.load()
+
+    @staticmethod
+    def normalize_mode(transport_mode: str) -> str:
+        """Map Google Maps mode names onto the stored matrix modes"""
+        return MODE_ALIASES.get(transport_mode, transport_mode)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.matrices)
+
+    def _pointer_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(os.path.join(self.matrix_dir, CURRENT_FILE))
+        except OSError:
+            return None
+
+    def load(self):
+        """Memory-map the published matrix files if a matrix has been built"""
+        self._mtime = self._pointer_mtime()
+        try:
+            with open(os.path.join(self.matrix_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+                build_dir = os.path.join(self.matrix_dir, f.read().strip())
+        except OSError:
+            build_dir = self.matrix_dir  # Matrix built before the pointer file
+
+        index_file = os.path.join(build_dir, "index.json")
+        if not os.path.exists(index_file):
+            return
+
+        try:
+            with open(index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+
+            matrices = {}
+            for mode in index["modes"]:
+                matrices[mode] = np.load(os.path.join(build_dir, f"{mode}.npy"), mmap_mode="r")
+
+            origin_index = {plz: i for i, plz in enumerate(index["origins"])}
+            destination_index = {plz: i for i, plz in enumerate(index["destinations"])}
+
+        except Exception as e:
+            # Keep serving the previously loaded matrix
+            print(f"Could not load commute matrix: {e}")
+            return
+
+        # Lookups read one consistent set of tables, also while a reload swaps them
+        self._tables = (origin_index, destination_index, matrices)
+        self.origin_index, self.destination_index, self.matrices = self._tables
+        self.generated_at = index.get("generated_at")
+        self.source = index.get("source")
+
+    def refresh(self) -> bool:
+        """Reload after the scheduler published a new matrix; True if it was reloaded"""
+        mtime = self._pointer_mtime()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self.load()
+        return True
+
+    def lookup(self, origin_postal: str, destination_postal: str, transport_mode: str) -> Optional[int]:
+        """
+        Look up the commute time in minutes
+
+        Returns None if the pair or mode is not covered by the matrix,
+        UNREACHABLE if the route could not be calculated.
+        """
+        origin_index, destination_index, matrices = self._tables
+        matrix = matrices.get(self.normalize_mode(transport_mode))
+        if matrix is None:
+            return None
+
+        row = origin_index.get(origin_postal)
+        col = destination_index.get(destination_postal)
+        if row is None or col is None:
+            return None
+
+        return int(matrix[row, col])
+
+    def stats(self) -> Dict:
+        """Get matrix statistics"""
+        return {
+            "origins": len(self.origin_index),
+            "destinations": len(self.destination_index),
+            "modes": sorted(self.matrices.keys()),
+            "generated_at": self.generated_at,
+            "source": self.source
+        }
+
+def build_commute_matrix(calculator, origins: List[str], destinations: List[str],
+                         modes: Optional[List[str]] = None, use_api: bool = False,
+                         request_delay: float = 0.1,
+                         matrix_dir: str = DEFAULT_MATRIX_DIR, keep: int = 2) -> Dict:
+    """
+    Compute and store the commute matrix for all origin/destination pairs
+
+    Args:
+        calculator: DistanceCalculator used for the travel time estimates
+        origins: Postal codes users search from
+        destinations: Postal codes with active listings
+        modes: Transport modes to compute (default: all MATRIX_MODES)
+        use_api: Query Google Maps per pair instead of the fallback model
+        request_delay: Delay between API requests (rate limit)
+        matrix_dir: Directory holding the matrix builds and the CURRENT pointer
+        keep: Number of builds kept on disk (older ones are removed)
+
+    Returns:
+        Matrix statistics
+    """
+    modes = modes or MATRIX_MODES
+    origins = sorted(set(origins))
+    destinations = sorted(set(destinations))
+    use_api = use_api and bool(calculator.api_key)
+
+    # Each build gets its own directory, published by flipping the CURRENT pointer
+    os.makedirs(matrix_dir, exist_ok=True)
+    name = f"build-{datetime.now():%Y%m%d-%H%M%S-%f}"
+    staging_dir = os.path.join(matrix_dir, f"{name}.staging")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    for mode in modes:
+        if use_api:
+            matrix = np.full((len(origins), len(destinations)), UNREACHABLE, dtype=np.uint16)
+            for i, origin in enumerate(origins):
+                results = calculator.batch_calculate_distances(origin, destinations, mode, delay=request_delay)
+                for j, destination in enumerate(destinations):
+                    result = results[destination]
+                    if result.route_found or not result.error_message:
+                        matrix[i, j] = min(result.duration_minutes, UNREACHABLE - 1)
+        else:
+            durations = calculator.estimate_duration_matrix(origins, destinations, mode)
+            matrix = np.minimum(durations, UNREACHABLE - 1).astype(np.uint16)
+
+        np.save(os.path.join(staging_dir, f"{mode}.npy"), matrix)
+
+    index = {
+        "origins": origins,
+        "destinations": destinations,
+        "modes": list(modes),
+        "generated_at": datetime.now().isoformat(),
+        "source": "google_maps" if use_api else "fallback"
+    }
+
+    with open(os.path.join(staging_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    # Complete directory first, then replace the pointer atomically
+    build_dir = os.path.join(matrix_dir, name)
+    os.replace(staging_dir, build_dir)
+
+    pointer_tmp = os.path.join(matrix_dir, f"{CURRENT_FILE}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(matrix_dir, CURRENT_FILE))
+
+    # Unlinked files stay readable for processes that still map them
+    builds = sorted(entry for entry in os.listdir(matrix_dir)
+                    if entry.startswith("build-") and not entry.endswith(".staging"))
+    for old in builds[:max(len(builds) - keep, 0)]:
+        shutil.rmtree(os.path.join(matrix_dir, old), ignore_errors=True)
+
+    return {
+        "origins": len(origins),
+        "destinations": len(destinations),
+        "modes": list(modes),
+        "source": index["source"],
+        "size_bytes": len(origins) * len(destinations) * len(modes) * 2
+    }
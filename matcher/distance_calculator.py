@@ -1,15 +1,27 @@
 import requests
 import time
-from typing import Tuple, Optional, Dict, List
+import threading
+from bisect import bisect_right
+from typing import Tuple, Optional, Dict, List, Set
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import json
 import math
+import numpy as np
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher.commute_matrix import CommuteMatrix, DEFAULT_MATRIX_DIR, UNREACHABLE
+from matcher.tracing import current_trace
+from matcher.result_cache import MatchResultCache
+from matcher.outbound import OutboundUnavailable, get_provider
+
 @dataclass
 class DistanceResult:
     """Result of distance calculation"""
@@ -19,14 +31,56 @@ class DistanceResult:
     route_found: bool
     error_message: Optional[str] = None
 
+@dataclass
+class Isochrone:
+    """Destination postal codes reachable from one origin, sorted by travel time"""
+    origin_postal: str
+    transport_mode: str
+    minutes: List[int] = field(default_factory=list)  # Ascending
+    postal_codes: List[str] = field(default_factory=list)  # Aligned with minutes
+    covered: Set[str] = field(default_factory=set)  # All destinations evaluated, incl. unreachable
+    
+    def within(self, max_minutes: int) -> List[str]:
+        """Postal codes reachable within max_minutes"""
+        return self.postal_codes[:bisect_right(self.minutes, max_minutes)]
+    
+    def minutes_by_postal(self) -> Dict[str, int]:
+        """Travel time per reachable postal code"""
+        return dict(zip(self.postal_codes, self.minutes))
+    
+    def merged(self, new_minutes: Dict[str, Optional[int]]) -> 'Isochrone':
+        """Copy with additional destinations (None = unreachable)"""
+        pairs = list(zip(self.minutes, self.postal_codes))
+        pairs.extend((minutes, postal) for postal, minutes in new_minutes.items() if minutes is not None)
+        pairs.sort()
+        
+        return Isochrone(
+            origin_postal=self.origin_postal,
+            transport_mode=self.transport_mode,
+            minutes=[minutes for minutes, _ in pairs],
+            postal_codes=[postal for _, postal in pairs],
+            covered=self.covered | set(new_minutes)
+        )
+
 class DistanceCalculator:
     """Calculate distances and travel times between locations"""
     
-    def __init__(self, api_key: Optional[str] = None, cache_enabled: bool = True):
+    def __init__(self, api_key: Optional[str] = None, cache_enabled: bool = True,
+                 commute_matrix_dir: str = DEFAULT_MATRIX_DIR):
         self.api_key = api_key or os.getenv('GOOGLE_MAPS_API_KEY')
         self.cache_enabled = cache_enabled
         self.cache = {}  # Simple in-memory cache
+        # Isochrones per (origin, mode): bounded, expire so API travel times are re-checked
+        self.isochrone_cache = MatchResultCache(max_entries=256, ttl_seconds=6 * 3600)
+        self._isochrone_lock = threading.Lock()
+        
+        # Precomputed PLZ-to-PLZ matrix (built by the scheduler), empty if not built yet
+        self.commute_matrix = CommuteMatrix(commute_matrix_dir)
+        self.matrix_poll_seconds = 5.0
+        self._matrix_checked_at = time.monotonic()
         self.base_url = "https://maps.googleapis.com/maps/api/distancematrix/json"
+        self.request_timeout = 10
+        self.outbound = get_provider("google_maps")
         
         # Fallback coordinates for major Swiss cities
         self.swiss_cities = {
@@ -51,24 +105,40 @@ class DistanceCalculator:
             transport_mode: "driving", "transit", "walking", "bicycling"
         """
         
+        return self._calculate_distance(origin_postal, destination_postal, transport_mode)[0]
+    
+    def _calculate_distance(self, origin_postal: str, destination_postal: str,
+                            transport_mode: str) -> Tuple[DistanceResult, bool]:
+        """calculate_distance, plus whether the result is a stand-in estimate made while the API was degraded"""
+        
         # Check cache first
         cache_key = f"{origin_postal}_{destination_postal}_{transport_mode}"
         if self.cache_enabled and cache_key in self.cache:
-            return self.cache[cache_key]
+            current_trace().count("distance_cache.hit")
+            return self.cache[cache_key], False
+        
+        current_trace().count("distance_cache.miss")
         
         try:
-            # If Google Maps API is available, use it
-            if self.api_key:
-                result = self._calculate_with_google_maps(origin_postal, destination_postal, transport_mode)
+            # If Google Maps API is available (and not degraded), use it
+            use_api = bool(self.api_key) and self.outbound.available()
+            if use_api:
+                with current_trace().span("google_maps.request", mode=transport_mode):
+                    result = self._calculate_with_google_maps(origin_postal, destination_postal, transport_mode)
             else:
                 # Fallback to postal code distance estimation
                 result = self._calculate_fallback_distance(origin_postal, destination_postal, transport_mode)
             
-            # Cache the result
-            if self.cache_enabled:
+            # Cache the result (estimates made while the API is degraded are retried later)
+            degraded = bool(self.api_key) and not use_api
+            if self.cache_enabled and not degraded:
                 self.cache[cache_key] = result
             
-            return result
+            return result, degraded
+            
+        except OutboundUnavailable:
+            # Rate limit or request deadline reached: estimate instead of waiting
+            return self._calculate_fallback_distance(origin_postal, destination_postal, transport_mode), True
             
         except Exception as e:
             return DistanceResult(
@@ -77,7 +147,7 @@ class DistanceCalculator:
                 transport_mode=transport_mode,
                 route_found=False,
                 error_message=str(e)
-            )
+            ), False
     
     def _calculate_with_google_maps(self, origin_postal: str, destination_postal: str, 
                                   transport_mode: str) -> DistanceResult:
@@ -111,13 +181,14 @@ class DistanceCalculator:
             params["transit_mode"] = "bus|train|tram"
             params["departure_time"] = "now"
         
-        response = requests.get(self.base_url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if data["status"] != "OK":
-            raise Exception(f"Google Maps API error: {data.get('error_message', 'Unknown error')}")
+        with self.outbound.slot(self.request_timeout) as call_timeout:
+            response = requests.get(self.base_url, params=params, timeout=call_timeout)
+            response.raise_for_status()
+            
+            data = response.json()
+            
+            if data["status"] != "OK":
+                raise Exception(f"Google Maps API error: {data.get('error_message', 'Unknown error')}")
         
         # Extract distance and duration
         elements = data["rows"][0]["elements"][0]
@@ -197,7 +268,7 @@ class DistanceCalculator:
             else:
                 return None
                 
-        except ValueError:
+        except (TypeError, ValueError):
             return None
     
     def _haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -241,6 +312,45 @@ class DistanceCalculator:
         
         return max(5, int(travel_time))  # Minimum 5 minutes
     
+    def estimate_duration_matrix(self, origin_postals: List[str], destination_postals: List[str],
+                                 transport_mode: str) -> np.ndarray:
+        """Fallback travel times in minutes for all origin/destination pairs (vectorized)"""
+        
+        def coordinates(postals):
+            coords = np.full((len(postals), 2), np.nan)
+            for i, postal in enumerate(postals):
+                point = self._get_postal_coordinates(postal)
+                if point:
+                    coords[i] = (point["lat"], point["lon"])
+            return np.radians(coords)
+        
+        origin_coords = coordinates(origin_postals)
+        dest_coords = coordinates(destination_postals)
+        
+        # Haversine distance for all pairs
+        lat1 = origin_coords[:, 0][:, np.newaxis]
+        lon1 = origin_coords[:, 1][:, np.newaxis]
+        lat2 = dest_coords[:, 0][np.newaxis, :]
+        lon2 = dest_coords[:, 1][np.newaxis, :]
+        a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+        distance_km = 2 * np.arcsin(np.sqrt(a)) * 6371
+        
+        # Same speed model as _estimate_travel_time
+        speed = {"car": 60, "driving": 60, "public": 40, "transit": 40,
+                 "bike": 20, "bicycling": 20, "walk": 5, "walking": 5}.get(transport_mode, 40)
+        base_time = 10 if transport_mode in ["public", "transit"] else 5
+        
+        with np.errstate(invalid="ignore"):
+            durations = np.maximum(5, np.floor(distance_km / speed * 60 + base_time))
+        
+        # Pairs without coordinates use the postal code difference estimate
+        for i, j in zip(*np.where(np.isnan(durations))):
+            durations[i, j] = self._estimate_distance_by_postal_diff(
+                origin_postals[i], destination_postals[j], transport_mode
+            ).duration_minutes
+        
+        return durations.astype(np.int32)
+    
     def _estimate_distance_by_postal_diff(self, origin: str, destination: str, 
                                         transport_mode: str) -> DistanceResult:
         """Very rough estimation based on postal code difference"""
@@ -264,7 +374,7 @@ class DistanceCalculator:
             else:
                 distance_km = 150
                 
-        except ValueError:
+        except (TypeError, ValueError):
             distance_km = 50  # Default assumption
         
         duration_minutes = self._estimate_travel_time(distance_km, transport_mode)
@@ -278,7 +388,8 @@ class DistanceCalculator:
     
     def batch_calculate_distances(self, origin_postal: str, 
                                 destination_postals: List[str], 
-                                transport_mode: str = "transit") -> Dict[str, DistanceResult]:
+                                transport_mode: str = "transit",
+                                delay: float = 0.1) -> Dict[str, DistanceResult]:
         """Calculate distances to multiple destinations efficiently"""
         
         results = {}
@@ -289,7 +400,8 @@ class DistanceCalculator:
                 results[dest_postal] = result
                 
                 # Small delay to avoid API rate limits
-                time.sleep(0.1)
+                if delay:
+                    time.sleep(delay)
                 
             except Exception as e:
                 results[dest_postal] = DistanceResult(
@@ -302,16 +414,128 @@ class DistanceCalculator:
         
         return results
     
+    def get_isochrone(self, origin_postal: str, destination_postals: List[str],
+                      transport_mode: str = "transit") -> Isochrone:
+        """
+        Get the travel times from origin to all destinations, sorted ascending
+        
+        The isochrone is cached per origin and transport mode; later calls only
+        evaluate destinations that were not covered yet.
+        """
+        
+        self.refresh_commute_matrix()
+        
+        key = (origin_postal, transport_mode)
+        isochrone = self.isochrone_cache.get(key) or Isochrone(origin_postal, transport_mode)
+        
+        missing = [postal for postal in set(destination_postals) if postal not in isochrone.covered]
+        if not missing:
+            current_trace().count("isochrone_cache.hit")
+            return isochrone
+        
+        current_trace().count("isochrone_cache.miss")
+        current_trace().count("isochrone.destinations_calculated", len(missing))
+        
+        new_minutes, estimated = self._calculate_isochrone_minutes(origin_postal, missing, transport_mode)
+        
+        with self._isochrone_lock:
+            # Another thread may have extended the isochrone in the meantime
+            current = self.isochrone_cache.get(key) or Isochrone(origin_postal, transport_mode)
+            isochrone = current.merged({
+                postal: minutes for postal, minutes in new_minutes.items()
+                if postal not in current.covered and postal not in estimated
+            })
+            if self.cache_enabled:
+                self.isochrone_cache.put(key, isochrone)
+        
+        # Estimates made while the API is degraded serve this request only, later ones ask the API again
+        if estimated:
+            isochrone = isochrone.merged({
+                postal: new_minutes[postal] for postal in estimated if postal not in isochrone.covered
+            })
+        
+        return isochrone
+    
+    def _calculate_isochrone_minutes(self, origin_postal: str, destination_postals: List[str],
+                                     transport_mode: str) -> Tuple[Dict[str, Optional[int]], Set[str]]:
+        """
+        Travel time per destination, None if the route could not be calculated
+        
+        Returns:
+            The minutes and the destinations that were only estimated because
+            the API was degraded (open circuit breaker, rate limit, deadline)
+        """
+        
+        minutes = {}
+        estimated = set()
+        remaining = []
+        
+        for postal in destination_postals:
+            matrix_minutes = self.commute_matrix.lookup(origin_postal, postal, transport_mode)
+            if matrix_minutes is None:
+                remaining.append(postal)
+            else:
+                minutes[postal] = None if matrix_minutes == UNREACHABLE else matrix_minutes
+        
+        current_trace().count("commute_matrix.hit", len(destination_postals) - len(remaining))
+        
+        if not remaining:
+            return minutes, estimated
+        
+        if not self.api_key:
+            # Fallback model can be evaluated for all destinations at once
+            durations = self.estimate_duration_matrix([origin_postal], remaining, transport_mode)[0]
+            minutes.update(zip(remaining, (int(d) for d in durations)))
+        else:
+            for postal in remaining:
+                result, degraded = self._calculate_distance(origin_postal, postal, transport_mode)
+                minutes[postal] = None if not result.route_found and result.error_message else result.duration_minutes
+                if degraded:
+                    estimated.add(postal)
+        
+        return minutes, estimated
+    
+    def get_commute_minutes(self, origin_postal: str, destination_postal: str,
+                            transport_mode: str = "transit") -> Optional[int]:
+        """Get commute time in minutes, None if the route could not be calculated"""
+        
+        # O(1) lookup in the precomputed matrix when the pair is covered
+        self.refresh_commute_matrix()
+        minutes = self.commute_matrix.lookup(origin_postal, destination_postal, transport_mode)
+        if minutes is not None:
+            return None if minutes == UNREACHABLE else minutes
+        
+        result = self.calculate_distance(origin_postal, destination_postal, transport_mode)
+        
+        if not result.route_found and result.error_message:
+            return None
+        
+        return result.duration_minutes
+    
+    def refresh_commute_matrix(self):
+        """
+        Pick up a newly published commute matrix; isochrones built on the old one are dropped
+        
+        The pointer file is checked at most every matrix_poll_seconds, not on every lookup.
+        """
+        now = time.monotonic()
+        if now - self._matrix_checked_at < self.matrix_poll_seconds:
+            return
+        self._matrix_checked_at = now
+        
+        if self.commute_matrix.refresh():
+            self.isochrone_cache.invalidate()
+    
     def is_within_commute_time(self, origin_postal: str, destination_postal: str,
                              max_minutes: int, transport_mode: str = "transit") -> bool:
         """Check if destination is within acceptable commute time"""
         
-        result = self.calculate_distance(origin_postal, destination_postal, transport_mode)
+        minutes = self.get_commute_minutes(origin_postal, destination_postal, transport_mode)
         
-        if not result.route_found and result.error_message:
+        if minutes is None:
             return False  # Conservative approach - reject if calculation failed
         
-        return result.duration_minutes <= max_minutes
+        return minutes <= max_minutes
 
 def test_distance_calculator():
     """Test the distance calculator"""
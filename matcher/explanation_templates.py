@@ -0,0 +1,245 @@
+"""
+Precomputed explanations per profile archetype and profession
+
+Most users fall into a few dozen archetypes (top two interests, company size
+preference, work environment). An offline job generates one AI explanation per
+(archetype, profession) pair; at request time AIIntegration serves a matching
+template instantly, filled in with the listing's company and location, and only
+calls the LLM for pairs without a template.
+
+Usage:
+    python matcher/explanation_templates.py --profiles 5000 --professions 30
+"""
+import sys
+import os
+import gzip
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher.questionnaire import UserProfile, InterestCategory, create_sample_profile
+
+DEFAULT_TEMPLATES_PATH = "data/explanation_templates.json.gz"
+
+# Placeholders of the stand-in listing, replaced by the real listing's values
+COMPANY_TOKEN = "{firma}"
+LOCATION_TOKEN = "{ort}"
+
+# Templates are written for good matches; weaker ones get an individual explanation
+TEMPLATE_MIN_SCORE = 0.5
+
+def profile_archetype(user_profile: UserProfile) -> str:
+    """Archetype key: top two interests, company size preference, work environment"""
+    categories = list(InterestCategory)
+    top_two = sorted(
+        categories, key=lambda category: (-user_profile.interests.get(category, 0), categories.index(category))
+    )[:2]
+
+    return "|".join([
+        "+".join(category.value for category in top_two),
+        user_profile.company_size_preference,
+        user_profile.work_environment
+    ])
+
+def archetype_profile(archetype: str) -> UserProfile:
+    """Representative profile of an archetype"""
+    interests, company_size, environment = archetype.split("|")
+    top_two = [InterestCategory(value) for value in interests.split("+")]
+
+    profile = create_sample_profile()
+    profile.interests = {category: 5 if category in top_two else 2 for category in InterestCategory}
+    profile.company_size_preference = company_size
+    profile.work_environment = environment
+    profile.location = ""
+    profile.postal_code = ""
+    profile.avoid_sectors = []
+
+    return profile
+
+class ExplanationTemplates:
+    """Read access to the template file, reloaded when it changes on disk"""
+
+    def __init__(self, path: str = DEFAULT_TEMPLATES_PATH):
+        self.path = path
+        self.templates: Dict[str, Dict[str, List]] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            self.templates = {}
+            self._mtime = None
+            return
+
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            try:
+                with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                    self.templates = json.load(f)["templates"]
+                self._mtime = mtime
+            except Exception as e:
+                print(f"Could not load explanation templates: {e}")
+                self.templates = {}
+
+    def lookup(self, user_profile: UserProfile, apprenticeship, match_score) -> Optional[Dict]:
+        """
+        Personalised recommendation fields for this profile and listing,
+        None if there is no template (or the match is too weak for one)
+        """
+        if match_score.total_score < TEMPLATE_MIN_SCORE:
+            return None
+
+        self._load()
+        profession = apprenticeship.profession or apprenticeship.title
+        entry = self.templates.get(profile_archetype(user_profile), {}).get(profession)
+        if entry is None:
+            return None
+
+        match_reason, growth_potential, considerations, next_steps = entry
+
+        def personalise(text: str) -> str:
+            return (text
+                    .replace(COMPANY_TOKEN, apprenticeship.company_name or "dem Lehrbetrieb")
+                    .replace(LOCATION_TOKEN, apprenticeship.location or "deiner Region"))
+
+        return {
+            "match_reason": personalise(match_reason),
+            "growth_potential": personalise(growth_potential),
+            "considerations": personalise(considerations),
+            "next_steps": [personalise(step) for step in next_steps],
+            "confidence": match_score.total_score
+        }
+
+    def stats(self) -> Dict:
+        self._load()
+        return {
+            "archetypes": len(self.templates),
+            "templates": sum(len(professions) for professions in self.templates.values())
+        }
+
+def build_explanation_templates(ai, profiles: List[UserProfile], professions: List[str],
+                                min_profiles: int = 1, path: str = DEFAULT_TEMPLATES_PATH,
+                                max_concurrency: int = 4) -> Dict:
+    """
+    Generate one explanation per (archetype, profession) and store them compactly
+
+    Args:
+        ai: AIIntegration with an API key (templates are generated by the LLM)
+        profiles: Historical or synthetic profiles; their archetypes are covered
+        professions: Professions to generate templates for
+        min_profiles: Skip archetypes with fewer profiles
+        path: Output file (gzipped JSON)
+        max_concurrency: Parallel LLM requests
+
+    Returns:
+        Build statistics
+    """
+    # Imported here: the scoring engine is only needed by the offline job
+    from matcher.candidates import CandidateRow
+    from matcher.scoring_engine import ScoringEngine
+
+    counts = Counter(profile_archetype(profile) for profile in profiles)
+    archetypes = sorted(archetype for archetype, count in counts.items() if count >= min_profiles)
+
+    scoring_engine = ScoringEngine()
+    templates: Dict[str, Dict[str, List]] = {}
+
+    for archetype in archetypes:
+        profile = archetype_profile(archetype)
+
+        # Stand-in listing; placeholders are filled in per listing at request time
+        listings = [
+            CandidateRow(0, profession, profession, "", "", LOCATION_TOKEN, "", COMPANY_TOKEN, "")
+            for profession in professions
+        ]
+        items = [(listing, scoring_engine.score_apprenticeship(profile, listing, commute_minutes=float("nan")))
+                 for listing in listings]
+
+        recommendations = ai.generate_match_explanations(
+            profile, items, max_concurrency=max_concurrency, use_templates=False
+        )
+
+        fallback_reasons = {
+            ai._generate_fallback_explanation_from_score(score.total_score).match_reason for _, score in items
+        }
+        templates[archetype] = {
+            profession: [rec.match_reason, rec.growth_potential, rec.considerations, rec.next_steps]
+            for profession, rec in zip(professions, recommendations)
+            # Failed requests fall back to generic text; those pairs stay on the LLM path
+            if rec.match_reason not in fallback_reasons
+        }
+
+    payload = {
+        "generated_at": datetime.now().isoformat(),
+        "profiles": len(profiles),
+        "templates": templates
+    }
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+    return {
+        "archetypes": len(archetypes),
+        "professions": len(professions),
+        "templates": sum(len(entries) for entries in templates.values()),
+        "coverage": sum(counts[archetype] for archetype in archetypes) / max(len(profiles), 1),
+        "size_bytes": os.path.getsize(path)
+    }
+
+def top_professions(limit: int = 30) -> List[str]:
+    """Most frequent professions among active listings"""
+    from sqlalchemy import func
+    from data.database import get_session, Apprenticeship
+
+    session = get_session()
+    try:
+        rows = session.query(Apprenticeship.profession, func.count(Apprenticeship.id)).filter(
+            Apprenticeship.is_active == True,
+            Apprenticeship.profession != None,
+            Apprenticeship.profession != ''
+        ).group_by(Apprenticeship.profession).order_by(func.count(Apprenticeship.id).desc()).limit(limit).all()
+        return [profession for profession, _ in rows]
+    finally:
+        session.close()
+
+def main():
+    """Build the explanation templates from synthetic profiles"""
+    import argparse
+    from matcher.ai_integration import AIIntegration
+    from matcher.benchmark import make_benchmark_profiles
+
+    parser = argparse.ArgumentParser(description='Precompute explanation templates per profile archetype')
+    parser.add_argument('--profiles', type=int, default=5000, help='Synthetic profiles to derive archetypes from')
+    parser.add_argument('--professions', type=int, default=30, help='Most frequent professions to cover')
+    parser.add_argument('--min-profiles', type=int, default=20, help='Skip rarer archetypes')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic profiles')
+    parser.add_argument('--output', default=DEFAULT_TEMPLATES_PATH, help='Template file')
+
+    args = parser.parse_args()
+
+    ai = AIIntegration()
+    if not ai.client:
+        print("OPENAI_API_KEY is required to generate explanation templates.")
+        return
+
+    stats = build_explanation_templates(
+        ai, make_benchmark_profiles(args.profiles, seed=args.seed), top_professions(args.professions),
+        min_profiles=args.min_profiles, path=args.output
+    )
+    print(f"{stats['templates']} templates for {stats['archetypes']} archetypes "
+          f"({stats['coverage']:.0%} of profiles), {stats['size_bytes'] / 1024:.0f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Semantic interest affinities of listings
+
+The keyword interest score only knows the professions of the questionnaire's
+profession mapping; every other listing gets a neutral score. A nightly job
+embeds each interest category (its questionnaire text) and each active listing
+with TextEmbeddingMatcher and stores, per listing, how its embedding is spread
+over the categories (rows sum to 1).
+
+A profile's semantic interest vector is the rating-weighted sum of the category
+embeddings, so its similarity to all listings is one product of the profile's
+ratings with the listing x category matrix. ScoringEngine blends that into the
+interest score; listings added since the last run keep the keyword score.
+
+Every build is written to its own directory and published by atomically
+replacing the CURRENT pointer file; running servers pick it up via refresh().
+"""
+import sys
+import os
+import json
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import bump_data_generation, get_session
+from matcher.questionnaire import ApprenticeshipQuestionnaire, InterestCategory
+
+DEFAULT_AFFINITY_DIR = "data/interest_affinity"
+
+# Name of the published build inside the affinity directory
+CURRENT_FILE = "CURRENT"
+
+# Share of the semantic score in the interest score of mapped professions
+# (listings of unmapped professions use the semantic score alone)
+SEMANTIC_INTEREST_WEIGHT = 0.3
+
+def resolve_affinity_dir(affinity_dir: Optional[str] = None) -> str:
+    """Affinity directory: explicit argument, INTEREST_AFFINITY_DIR environment variable or the default"""
+    return affinity_dir or os.getenv("INTEREST_AFFINITY_DIR") or DEFAULT_AFFINITY_DIR
+
+def category_texts(questionnaire: Optional[ApprenticeshipQuestionnaire] = None) -> List[str]:
+    """Questionnaire text of every interest category, in InterestCategory order"""
+    questionnaire = questionnaire or ApprenticeshipQuestionnaire()
+    section = next(section for section in questionnaire.questions if section["id"] == "interests")
+    texts = {question["key"]: question["text"] for question in section["questions"]}
+    return [texts[category.value] for category in InterestCategory]
+
+def interest_affinity(listing_embeddings: np.ndarray, category_embeddings: np.ndarray) -> np.ndarray:
+    """
+    Listing x category affinities: squared positive cosine similarities,
+    normalised per listing; NaN rows for listings unrelated to all categories
+    """
+    def normalise(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+
+    similarity = np.maximum(normalise(listing_embeddings) @ normalise(category_embeddings).T, 0.0) ** 2
+    totals = similarity.sum(axis=1, keepdims=True)
+    return np.where(totals > 0, similarity / np.where(totals > 0, totals, 1.0), np.nan).astype(np.float32)
+
+class InterestAffinities:
+    """Read-only access to the published affinities, memory-mapped"""
+
+    def __init__(self, affinity_dir: Optional[str] = None):
+        self.affinity_dir = resolve_affinity_dir(affinity_dir)
+        self.generated_at: Optional[str] = None
+        self.source: Optional[str] = None
+        # (ids, affinity), swapped as one so readers never pair arrays of two builds
+        self._tables = (np.zeros(0, dtype=np.int64), np.zeros((0, len(InterestCategory)), dtype=np.float32))
+        self._mtime = None
+
+        self.load()
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._tables[0]
+
+    @property
+    def affinity(self) -> np.ndarray:
+        return self._tables[1]
+
+    @property
+    def available(self) -> bool:
+        return len(self._tables[0]) > 0
+
+    def _published(self):
+        """Directory of the published build and the mtime identifying it, (None, None) if none"""
+        pointer = os.path.join(self.affinity_dir, CURRENT_FILE)
+        try:
+            mtime = os.path.getmtime(pointer)
+            with open(pointer, "r", encoding="utf-8") as f:
+                return os.path.join(self.affinity_dir, f.read().strip()), mtime
+        except OSError:
+            pass
+
+        # Affinities built before the pointer file
+        try:
+            return self.affinity_dir, os.path.getmtime(os.path.join(self.affinity_dir, "index.json"))
+        except OSError:
+            return None, None
+
+    def load(self):
+        """Memory-map the published affinity files if the job has run"""
+        build_dir, mtime = self._published()
+        if build_dir is None:
+            return
+
+        try:
+            with open(os.path.join(build_dir, "index.json"), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index["categories"] != [category.value for category in InterestCategory]:
+                raise ValueError("interest categories changed since the affinities were built")
+
+            ids = np.load(os.path.join(build_dir, "ids.npy"), mmap_mode="r")
+            affinity = np.load(os.path.join(build_dir, "affinity.npy"), mmap_mode="r")
+
+        except Exception as e:
+            # Keep serving the previously loaded affinities; refresh() tries again
+            print(f"Could not load interest affinities: {e}")
+            return
+
+        self._tables = (ids, affinity)
+        self.generated_at = index.get("generated_at")
+        self.source = index.get("source")
+        self._mtime = mtime
+
+    def refresh(self):
+        """Reload after the nightly job published new affinities"""
+        _, mtime = self._published()
+        if mtime is not None and mtime != self._mtime:
+            self.load()
+
+    def lookup(self, apprenticeship_id) -> Optional[np.ndarray]:
+        """Category affinities of one listing, None if unknown"""
+        ids, affinity = self._tables
+        if not len(ids) or apprenticeship_id is None:
+            return None
+
+        row = int(np.searchsorted(ids, apprenticeship_id))
+        if row >= len(ids) or ids[row] != apprenticeship_id or np.isnan(affinity[row, 0]):
+            return None
+        return affinity[row]
+
+    def rows_for(self, apprenticeship_ids: np.ndarray) -> np.ndarray:
+        """(n, categories) affinities of the given listings, NaN rows for unknown ones"""
+        ids, affinity = self._tables
+        result = np.full((len(apprenticeship_ids), len(InterestCategory)), np.nan, dtype=np.float32)
+        if not len(ids) or not len(apprenticeship_ids):
+            return result
+
+        rows = np.minimum(np.searchsorted(ids, apprenticeship_ids), len(ids) - 1)
+        found = ids[rows] == apprenticeship_ids
+        result[found] = affinity[rows[found]]
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "listings": len(self._tables[0]),
+            "generated_at": self.generated_at,
+            "source": self.source
+        }
+
+def build_interest_affinities(text_matcher, candidates: List, affinity_dir: Optional[str] = None,
+                              db_path: Optional[str] = None, keep: int = 2) -> Dict:
+    """
+    Embed the categories and listings and store the listing x category affinities
+
+    The data generation is bumped afterwards: cached results and the published
+    snapshot hold interest scores from the previous affinities.
+
+    Args:
+        text_matcher: TextEmbeddingMatcher (OpenAI embeddings, keyword embeddings without API key)
+        candidates: Active listings (CandidateRows)
+        affinity_dir: Directory holding the builds and the CURRENT pointer (default: resolve_affinity_dir())
+        db_path: Database whose data generation is bumped
+        keep: Number of builds kept on disk (older ones are removed)
+
+    Returns:
+        Build statistics
+    """
+    affinity_dir = resolve_affinity_dir(affinity_dir)
+    candidates = sorted(candidates, key=lambda candidate: candidate.id)
+    texts = [
+        text_matcher.enhance_profession_description(
+            candidate.profession or candidate.title or "", candidate.description or ""
+        )
+        for candidate in candidates
+    ]
+
+    category_embeddings = text_matcher.get_embeddings(category_texts())
+    # Listing embeddings are only needed here, they stay out of the embedding cache
+    listing_embeddings = text_matcher.get_embeddings(texts, cache=False)
+
+    if len(candidates) and listing_embeddings.shape[1] != category_embeddings.shape[1]:
+        # One side came from the API, the other from the keyword fallback
+        category_embeddings = np.array([text_matcher._create_keyword_embedding(text, noise=False)
+                                        for text in category_texts()])
+        listing_embeddings = np.array([text_matcher._create_keyword_embedding(text, noise=False)
+                                       for text in texts])
+
+    affinity = interest_affinity(listing_embeddings, category_embeddings) if len(candidates) else \
+        np.zeros((0, len(InterestCategory)), dtype=np.float32)
+    source = "openai" if category_embeddings.shape[1] != len(text_matcher.profession_keywords) else "keywords"
+
+    # Each build gets its own directory, published by flipping the CURRENT pointer
+    os.makedirs(affinity_dir, exist_ok=True)
+    name = f"gen-{datetime.now():%Y%m%d-%H%M%S-%f}"
+    staging_dir = os.path.join(affinity_dir, f"{name}.staging")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    np.save(os.path.join(staging_dir, "ids.npy"), np.array([c.id for c in candidates], dtype=np.int64))
+    np.save(os.path.join(staging_dir, "affinity.npy"), affinity)
+
+    index = {
+        "categories": [category.value for category in InterestCategory],
+        "listings": len(candidates),
+        "generated_at": datetime.now().isoformat(),
+        "source": source
+    }
+    with open(os.path.join(staging_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    # Complete directory first, then replace the pointer atomically
+    os.replace(staging_dir, os.path.join(affinity_dir, name))
+
+    pointer_tmp = os.path.join(affinity_dir, f"{CURRENT_FILE}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(affinity_dir, CURRENT_FILE))
+
+    # Unlinked files stay readable for processes that still map them
+    builds = sorted(entry for entry in os.listdir(affinity_dir)
+                    if entry.startswith("gen-") and not entry.endswith(".staging"))
+    for old in builds[:max(len(builds) - keep, 0)]:
+        shutil.rmtree(os.path.join(affinity_dir, old), ignore_errors=True)
+
+    session = get_session(db_path)
+    try:
+        generation = bump_data_generation(session)
+    finally:
+        session.close()
+
+    return {
+        "listings": len(candidates),
+        "related": int((~np.isnan(affinity[:, 0])).sum()) if len(candidates) else 0,
+        "source": source,
+        "dimensions": int(listing_embeddings.shape[1]) if len(candidates) else 0,
+        "generation": generation
+    }
@@ -3,20 +3,40 @@ Complete matching engine that combines all matching components
 """
 import sys
 import os
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from typing import Iterator, List, Dict, Optional, Tuple
+from dataclasses import dataclass, replace
 import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import numpy as np
 from datetime import datetime
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from matcher.questionnaire import UserProfile, ApprenticeshipQuestionnaire
-from matcher.scoring_engine import ScoringEngine, RankedApprenticeship, MatchScore
-from matcher.distance_calculator import DistanceCalculator
+from matcher.questionnaire import UserProfile, ApprenticeshipQuestionnaire, profile_fingerprint, changed_profile_fields
+from matcher.scoring_engine import (
+    ScoringEngine, RankedApprenticeship, MatchScore, CandidateScoreTable, CandidateFeatures, SECTOR_KEYWORDS
+)
+from matcher.distance_calculator import DistanceCalculator, Isochrone
 from matcher.text_embeddings import TextEmbeddingMatcher
 from matcher.ai_integration import AIIntegration, AIRecommendation
-from data.database import get_session, Apprenticeship
+from matcher.query_planner import MatchQueryPlanner
+from matcher.candidates import CandidateRow, load_candidate_rows, hydrate_apprenticeships
+from matcher.result_cache import MatchResultCache
+from matcher.tracing import start_trace, current_trace
+from matcher.snapshot import SnapshotStore, DataSnapshot, DEFAULT_SNAPSHOT_DIR
+from matcher.outbound import outbound_stats
+from matcher.search import SearchHit, search_apprenticeships, search_ids
+from matcher.similar_listings import load_neighbour_ids
+from data.database import get_session, get_data_generation, Apprenticeship
+
+trace_logger = logging.getLogger("matcher.trace")
+
+# Profiles scored together in one matrix operation by find_matches_batch
+BATCH_CHUNK_SIZE = 16
 
 @dataclass
 class MatchingResult:
@@ -27,6 +47,30 @@ class MatchingResult:
     processing_time: float
     ai_summary: str
     filters_applied: Dict[str, any]
+    candidate_scores: Optional[CandidateScoreTable] = None  # All candidates, for re-filtering without rescoring (not kept by find_matches_batch)
+    data_generation: Optional[int] = None  # Data generation the candidates were loaded from
+    trace: Optional[Dict] = None  # Spans and counters of this request, if tracing is enabled
+    ai_summary_future: Optional[Future] = None  # Pending AI summary; ai_summary holds the fallback until it resolves
+    
+    def summary_pending(self) -> bool:
+        """Whether the AI summary is still being generated"""
+        return self.ai_summary_future is not None and not self.ai_summary_future.done()
+    
+    def resolve_summary(self, timeout: Optional[float] = 0) -> str:
+        """AI summary if it is ready within timeout seconds, else the current (fallback) summary"""
+        future = self.ai_summary_future
+        if future is None:
+            return self.ai_summary
+        
+        try:
+            self.ai_summary = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return self.ai_summary
+        except Exception as e:
+            print(f"Error generating AI summary: {e}")
+        
+        self.ai_summary_future = None
+        return self.ai_summary
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for serialization"""
@@ -63,17 +107,33 @@ class ApprenticeshipMatchingEngine:
         
         # Initialize all components
         self.questionnaire = ApprenticeshipQuestionnaire()
-        self.scoring_engine = ScoringEngine()
         self.distance_calculator = DistanceCalculator(api_key=google_maps_api_key)
+        self.scoring_engine = ScoringEngine(distance_calculator=self.distance_calculator)
         self.text_matcher = TextEmbeddingMatcher(api_key=openai_api_key)
         self.ai_integration = AIIntegration(api_key=openai_api_key)
+        self.query_planner = MatchQueryPlanner()
+        
+        # Repeat queries for the same profile are served from memory
+        self.result_cache = MatchResultCache(max_entries=64, ttl_seconds=900)
+        self.search_cache = MatchResultCache(max_entries=128, ttl_seconds=300)  # Full-text match ids
+        self.generation_poll_seconds = 5.0
+        self._data_generation = None
+        self._generation_checked_at = 0.0
+        
+        # Read-only artifacts shared by all worker processes (built by the scheduler)
+        self.snapshots = SnapshotStore(os.getenv('SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR))
+        self._active_snapshot = None
+        
+        # Per-request spans and counters (MatchingResult.trace, logged as JSON)
+        self.tracing_enabled = os.getenv('DEBUG', '').lower() in ('1', 'true', 'yes')
         
     def find_matches(self, 
                     user_profile: UserProfile,
                     limit: int = 50,
                     min_score: float = 0.3,
                     apply_distance_filter: bool = True,
-                    custom_filters: Optional[Dict] = None) -> MatchingResult:
+                    custom_filters: Optional[Dict] = None,
+                    trace: Optional[bool] = None) -> MatchingResult:
         """
         Find matching apprenticeships for a user profile
         
@@ -83,17 +143,316 @@ class ApprenticeshipMatchingEngine:
             min_score: Minimum match score (0-1)
             apply_distance_filter: Whether to filter by commute time
             custom_filters: Additional database filters
+            trace: Collect a request trace (default: tracing_enabled)
         
         Returns:
             Complete matching result
         """
         
+        with start_trace("find_matches", self._tracing(trace)) as request_trace:
+            with request_trace.span("result_cache"):
+                cache_key = self._cache_key(user_profile, limit, min_score, apply_distance_filter, custom_filters)
+                result = self.result_cache.get(cache_key)
+            
+            if result is not None:
+                request_trace.count("result_cache.hit")
+            else:
+                request_trace.count("result_cache.miss")
+                result = self._find_matches_uncached(
+                    user_profile, limit, min_score, apply_distance_filter, custom_filters
+                )
+                result.data_generation = cache_key[-1]
+                self.result_cache.put(cache_key, result)
+        
+        return self._attach_trace(result, request_trace)
+    
+    def find_matches_batch(self,
+                           user_profiles: List[UserProfile],
+                           limit: int = 50,
+                           min_score: float = 0.3,
+                           apply_distance_filter: bool = True,
+                           custom_filters: Optional[Dict] = None,
+                           max_workers: Optional[int] = None) -> List[MatchingResult]:
+        """
+        Find matches for many profiles at once (e.g. a whole school class)
+        
+        Candidates are loaded and their features extracted once; profiles are
+        scored in chunks as profiles x candidates matrix operations, each with
+        its own sector exclusions and commute mask. Results rank the same as
+        find_matches but keep only the top matches, no candidate table.
+        
+        Args:
+            user_profiles: Profiles to match
+            max_workers: Threads for scoring chunks (default: CPU count)
+            (other arguments as in find_matches)
+        
+        Returns:
+            One matching result per profile, in input order
+        """
+        
+        with start_trace("find_matches_batch", self.tracing_enabled) as request_trace:
+            request_trace.annotate(profiles=len(user_profiles))
+            results = self._find_matches_batch(
+                user_profiles, limit, min_score, apply_distance_filter, custom_filters, max_workers
+            )
+        
+        if request_trace.enabled and request_trace.root.duration is not None:
+            trace_logger.info(request_trace.to_json())
+        
+        return results
+    
+    def _find_matches_batch(self,
+                            user_profiles: List[UserProfile],
+                            limit: int,
+                            min_score: float,
+                            apply_distance_filter: bool,
+                            custom_filters: Optional[Dict],
+                            max_workers: Optional[int]) -> List[MatchingResult]:
+        """Batch matching pipeline (worker threads do not record into the request trace)"""
+        
         start_time = datetime.now()
+        trace = current_trace()
         
-        # Get apprenticeships from database
-        apprenticeships = self._get_filtered_apprenticeships(
-            user_profile, custom_filters, apply_distance_filter
+        session = get_session()
+        
+        try:
+            # Sector and commute filters differ per profile and are applied as masks
+            with trace.span("db_load"):
+                clauses = self.query_planner.build_clauses(
+                    avoid_sectors=[], reachable_postal_codes=None, custom_filters=custom_filters
+                )
+                candidates = load_candidate_rows(session, clauses)
+                destinations = self._get_destinations(session)
+        finally:
+            session.close()
+        
+        with trace.span("features", candidates=len(candidates)):
+            features = self._candidate_features(candidates)
+        
+        chunks = [user_profiles[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(user_profiles), BATCH_CHUNK_SIZE)]
+        
+        def rank_chunk(chunk: List[UserProfile]) -> List[Tuple[List[RankedApprenticeship], int]]:
+            commute_masks = [
+                self._profile_commute(features, user_profile, destinations, apply_distance_filter)
+                for user_profile in chunk
+            ]
+            sub_scores = self.scoring_engine.score_profiles(
+                chunk, features, np.vstack([commute for commute, _ in commute_masks])
+            )
+            
+            ranked_chunk = []
+            for k, user_profile in enumerate(chunk):
+                commute, reachable = commute_masks[k]
+                table = CandidateScoreTable.from_sub_scores(
+                    features.candidates, sub_scores[k], commute, self.scoring_engine.weights
+                )
+                
+                rows = np.flatnonzero(reachable & ~self._avoided_mask(features, user_profile))
+                top = table.select(min_score=min_score, limit=limit, rows=rows)
+                
+                ranked_chunk.append((
+                    self.scoring_engine.build_ranked(user_profile, table.subset(top), np.arange(len(top))),
+                    len(rows)
+                ))
+            return ranked_chunk
+        
+        with trace.span("scoring", chunks=len(chunks)):
+            if len(chunks) > 1:
+                with ThreadPoolExecutor(max_workers=max_workers or min(len(chunks), os.cpu_count() or 1)) as executor:
+                    ranked_results = [item for chunk_result in executor.map(rank_chunk, chunks) for item in chunk_result]
+            else:
+                ranked_results = [item for chunk in chunks for item in rank_chunk(chunk)]
+        
+        # One query hydrates the displayed results of all profiles
+        with trace.span("hydrate"):
+            self._hydrate_results([ranked for ranked_list, _ in ranked_results for ranked in ranked_list])
+        
+        with trace.span("ai_summary"):
+            ai_summaries = [
+                self.ai_integration.summarize_deferred(ranked_list)
+                if total_found else ("Keine passenden Lehrstellen gefunden.", None)
+                for ranked_list, total_found in ranked_results
+            ]
+        
+        processing_time = (datetime.now() - start_time).total_seconds()
+        
+        return [
+            MatchingResult(
+                ranked_apprenticeships=ranked_list,
+                user_profile=user_profile,
+                total_found=total_found,
+                processing_time=processing_time,
+                ai_summary=ai_summary,
+                filters_applied=custom_filters or {},
+                ai_summary_future=summary_future
+            )
+            for user_profile, (ranked_list, total_found), (ai_summary, summary_future) in zip(user_profiles, ranked_results, ai_summaries)
+        ]
+    
+    def _candidate_features(self, candidates: List[CandidateRow]) -> CandidateFeatures:
+        """Candidate features from the current snapshot, extracted if there is none"""
+        
+        snapshot = self._current_snapshot()
+        features = snapshot.features_for(candidates) if snapshot is not None else None
+        current_trace().annotate(source="snapshot" if features is not None else "extracted")
+        
+        return features if features is not None else self.scoring_engine.extract_features(candidates)
+    
+    def _profile_commute(self, features: CandidateFeatures, user_profile: UserProfile,
+                         destinations: List[str], apply_distance_filter: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Commute minutes per candidate (NaN = unknown) and the reachability mask,
+        matching the isochrone filter of _get_filtered_apprenticeships
+        """
+        
+        apply_distance_filter = self._applies_distance_filter(user_profile, apply_distance_filter)
+        minutes = np.full(len(features.postal_codes), np.nan)
+        reachable = np.ones(len(features.postal_codes), dtype=bool)
+        
+        if user_profile.postal_code:
+            isochrone = self.distance_calculator.get_isochrone(
+                user_profile.postal_code, destinations, user_profile.preferred_transport
+            )
+            
+            minutes_by_postal = isochrone.minutes_by_postal()
+            minutes = np.array([minutes_by_postal.get(pc, np.nan) for pc in features.postal_codes], dtype=float)
+            
+            if apply_distance_filter:
+                # Listings without postal code stay, like in the SQL reachability clause
+                within = set(isochrone.within(user_profile.max_commute_minutes))
+                reachable = np.array([pc == "" or pc in within for pc in features.postal_codes], dtype=bool)
+        
+        return minutes[features.postal_index], reachable[features.postal_index]
+    
+    @staticmethod
+    def _applies_distance_filter(user_profile: UserProfile, apply_distance_filter: bool) -> bool:
+        """Commute filter needs a limit and a postal code to measure from (others keep all listings)"""
+        return apply_distance_filter and bool(user_profile.max_commute_minutes) and bool(user_profile.postal_code)
+    
+    def _avoided_mask(self, features: CandidateFeatures, user_profile: UserProfile) -> np.ndarray:
+        """Candidates in the profile's avoided sectors, matching the SQL sector exclusion"""
+        sectors = list(SECTOR_KEYWORDS)
+        columns = [sectors.index(sector) for sector in user_profile.avoid_sectors if sector in SECTOR_KEYWORDS]
+        
+        return features.sector_matrix[:, columns].any(axis=1)
+    
+    def update_matches(self,
+                       previous_result: MatchingResult,
+                       user_profile: UserProfile,
+                       limit: int = 50,
+                       min_score: float = 0.3,
+                       apply_distance_filter: bool = True,
+                       custom_filters: Optional[Dict] = None,
+                       trace: Optional[bool] = None) -> MatchingResult:
+        """
+        Re-rank a previous result after the user changed some profile answers
+        
+        Only the sub-scores affected by the changed fields are recomputed on the
+        previous candidates. Changes to the candidate set (location, transport,
+        avoided sectors, longer commute, new data) fall back to find_matches.
+        
+        Args:
+            previous_result: Result for the profile before the change
+            user_profile: Changed user profile
+            (other arguments as in find_matches)
+        """
+        
+        with start_trace("update_matches", self._tracing(trace)) as request_trace:
+            cache_key = self._cache_key(user_profile, limit, min_score, apply_distance_filter, custom_filters)
+            
+            result = self.result_cache.get(cache_key)
+            if result is None:
+                start_time = datetime.now()
+                
+                with request_trace.span("rescore"):
+                    candidate_scores = self._rescore_previous(
+                        previous_result, user_profile, apply_distance_filter, custom_filters, cache_key[-1]
+                    )
+                    request_trace.annotate(full_run=candidate_scores is None)
+                
+                if candidate_scores is None:
+                    result = self.find_matches(user_profile, limit, min_score, apply_distance_filter, custom_filters)
+                else:
+                    result = self._build_result(user_profile, candidate_scores, limit, min_score, custom_filters, start_time)
+                    result.data_generation = cache_key[-1]
+                    self.result_cache.put(cache_key, result)
+        
+        return self._attach_trace(result, request_trace)
+    
+    def _tracing(self, trace: Optional[bool]) -> bool:
+        return self.tracing_enabled if trace is None else trace
+    
+    def _attach_trace(self, result: MatchingResult, request_trace) -> MatchingResult:
+        """Copy of the result carrying the finished request trace (cached results stay untraced)"""
+        
+        if not request_trace.enabled or request_trace.root.duration is None:
+            return result
+        
+        trace_logger.info(request_trace.to_json())
+        return replace(result, trace=request_trace.to_dict())
+    
+    def _cache_key(self, user_profile: UserProfile, limit: int, min_score: float,
+                   apply_distance_filter: bool, custom_filters: Optional[Dict]) -> Tuple:
+        """Result cache key, ending with the current data generation"""
+        return (
+            profile_fingerprint(user_profile),
+            limit,
+            min_score,
+            apply_distance_filter,
+            json.dumps(custom_filters or {}, sort_keys=True, default=str),
+            self._get_data_generation()
         )
+    
+    def _rescore_previous(self,
+                          previous_result: MatchingResult,
+                          user_profile: UserProfile,
+                          apply_distance_filter: bool,
+                          custom_filters: Optional[Dict],
+                          generation: int) -> Optional[CandidateScoreTable]:
+        """Previous candidates with updated sub-scores, None if a full run is needed"""
+        
+        table = previous_result.candidate_scores
+        if table is None or previous_result.data_generation != generation:
+            return None
+        if previous_result.filters_applied != (custom_filters or {}):
+            return None
+        
+        previous_profile = previous_result.user_profile
+        changed_fields = changed_profile_fields(previous_profile, user_profile)
+        
+        sub_scores = self.scoring_engine.affected_sub_scores(changed_fields)
+        if sub_scores is None:
+            return None
+        
+        # A shorter commute only drops candidates, a longer one may add new ones
+        if 'max_commute_minutes' in changed_fields and apply_distance_filter:
+            old_max = previous_profile.max_commute_minutes
+            new_max = user_profile.max_commute_minutes
+            if not old_max or not new_max or new_max > old_max:
+                return None
+            table = table.subset(np.flatnonzero(~(table.commute_minutes > new_max)))
+        
+        if not sub_scores:
+            return table
+        
+        return self.scoring_engine.rescore_candidates(user_profile, table, sub_scores)
+    
+    def _find_matches_uncached(self,
+                               user_profile: UserProfile,
+                               limit: int,
+                               min_score: float,
+                               apply_distance_filter: bool,
+                               custom_filters: Optional[Dict]) -> MatchingResult:
+        """Run the full matching pipeline"""
+        
+        start_time = datetime.now()
+        
+        # Get apprenticeships from database
+        with current_trace().span("filter"):
+            apprenticeships, commute_minutes = self._get_filtered_apprenticeships(
+                user_profile, custom_filters, apply_distance_filter
+            )
+            current_trace().annotate(candidates=len(apprenticeships))
         
         if not apprenticeships:
             return MatchingResult(
@@ -105,21 +464,46 @@ class ApprenticeshipMatchingEngine:
                 filters_applied=custom_filters or {}
             )
         
-        # Score and rank apprenticeships
-        ranked_apprenticeships = self.scoring_engine.rank_apprenticeships(
-            user_profile, apprenticeships, limit=limit
-        )
+        # Features come from the shared snapshot when one is published for this generation
+        with current_trace().span("features", candidates=len(apprenticeships)):
+            features = self._candidate_features(apprenticeships)
+
+        # Score all candidates, keep sub-scores for re-filtering on the results page
+        with current_trace().span("scoring"):
+            sub_scores = self.scoring_engine.score_profiles(
+                [user_profile], features, commute_minutes[np.newaxis, :]
+            )[0]
+            candidate_scores = CandidateScoreTable.from_sub_scores(
+                apprenticeships, sub_scores, commute_minutes, self.scoring_engine.weights
+            )
         
-        # Filter by minimum score
-        ranked_apprenticeships = [
-            app for app in ranked_apprenticeships 
-            if app.match_score.total_score >= min_score
-        ]
+        return self._build_result(user_profile, candidate_scores, limit, min_score, custom_filters, start_time)
+    
+    def _build_result(self,
+                      user_profile: UserProfile,
+                      candidate_scores: CandidateScoreTable,
+                      limit: int,
+                      min_score: float,
+                      custom_filters: Optional[Dict],
+                      start_time: datetime) -> MatchingResult:
+        """Rank scored candidates and assemble the matching result"""
+        
+        trace = current_trace()
+        
+        # Rank above minimum score
+        with trace.span("ranking"):
+            ranked_apprenticeships = self.scoring_engine.build_ranked(
+                user_profile, candidate_scores, candidate_scores.select(min_score=min_score, limit=limit)
+            )
+            trace.annotate(results=len(ranked_apprenticeships))
         
-        # Generate AI summary
-        ai_summary = self.ai_integration.generate_top_recommendations_summary(
-            ranked_apprenticeships
-        )
+        # Full ORM objects only for the displayed results
+        with trace.span("hydrate"):
+            self._hydrate_results(ranked_apprenticeships)
+        
+        # AI summary resolves in the background; results are returned right away
+        with trace.span("ai_summary"):
+            ai_summary, summary_future = self.ai_integration.summarize_deferred(ranked_apprenticeships)
         
         # Calculate processing time
         processing_time = (datetime.now() - start_time).total_seconds()
@@ -127,106 +511,327 @@ class ApprenticeshipMatchingEngine:
         return MatchingResult(
             ranked_apprenticeships=ranked_apprenticeships,
             user_profile=user_profile,
-            total_found=len(apprenticeships),
+            total_found=len(candidate_scores),
             processing_time=processing_time,
             ai_summary=ai_summary,
-            filters_applied=custom_filters or {}
+            filters_applied=custom_filters or {},
+            candidate_scores=candidate_scores,
+            ai_summary_future=summary_future
         )
     
+    def get_result_page(self,
+                        result: MatchingResult,
+                        start: int,
+                        count: int,
+                        min_score: float = 0.0,
+                        sort_by: str = 'total_score',
+                        max_commute: Optional[float] = None,
+                        search: Optional[str] = None) -> Tuple[int, List[RankedApprenticeship]]:
+        """
+        Rank a slice of a result's candidates without rescoring
+        
+        Args:
+            search: Only candidates matching this full-text query
+        
+        Returns:
+            Number of candidates passing the filters and the hydrated ranked slice
+        """
+        
+        table = result.candidate_scores
+        if table is None:
+            return 0, []
+        
+        rows = self.search_rows(table, search) if search else None
+        indices = table.select(min_score=min_score, max_commute=max_commute, sort_by=sort_by, rows=rows)
+        
+        # Top matches are hydrated already
+        hydrated = {ranked.apprenticeship.id: ranked.apprenticeship for ranked in result.ranked_apprenticeships}
+        ranked_slice = self.scoring_engine.build_ranked(
+            result.user_profile, table, indices[start:start + count], hydrated, start_rank=start + 1
+        )
+        self._hydrate_results([ranked for ranked in ranked_slice if ranked.apprenticeship.id not in hydrated])
+        
+        return len(indices), ranked_slice
+    
+    def search_apprenticeships(self, query: str, limit: int = 20, offset: int = 0) -> List[SearchHit]:
+        """Free-text search over active listings, BM25-ranked (last term matched as prefix)"""
+        
+        session = get_session()
+        
+        try:
+            with current_trace().span("search", query=query):
+                return search_apprenticeships(session, query, limit=limit, offset=offset)
+        finally:
+            session.close()
+    
+    def search_rows(self, table: CandidateScoreTable, query: str) -> np.ndarray:
+        """Rows of a score table whose listing matches the full-text query (ascending)"""
+        
+        cache_key = (self._get_data_generation(), query)
+        matching_ids = self.search_cache.get(cache_key)
+        if matching_ids is None:
+            session = get_session()
+            try:
+                matching_ids = np.array(search_ids(session, query), dtype=np.int64)
+            finally:
+                session.close()
+            self.search_cache.put(cache_key, matching_ids)
+        
+        candidate_ids = np.fromiter((candidate.id for candidate in table.candidates), dtype=np.int64, count=len(table))
+        return np.flatnonzero(np.isin(candidate_ids, matching_ids))
+    
+    def find_similar_apprenticeships(self, apprenticeship_id: int, limit: int = 5) -> List[CandidateRow]:
+        """
+        Most similar active listings by content (precomputed neighbour lists)
+        
+        Listings without neighbours yet (added since the last nightly job) fall
+        back to the same profession, closest to the given listing first.
+        """
+        
+        session = get_session()
+        
+        try:
+            neighbour_ids = load_neighbour_ids(session, apprenticeship_id)
+            if neighbour_ids:
+                rows = {
+                    candidate.id: candidate
+                    for candidate in load_candidate_rows(session, [
+                        Apprenticeship.is_active == True,
+                        Apprenticeship.id.in_(neighbour_ids)
+                    ])
+                }
+                similar = [rows[neighbour_id] for neighbour_id in neighbour_ids if neighbour_id in rows]
+                if similar:
+                    return similar[:limit]
+            
+            apprenticeship = session.get(Apprenticeship, apprenticeship_id)
+            if apprenticeship is None:
+                return []
+            
+            origin_postal = apprenticeship.postal_code
+            candidates = load_candidate_rows(session, [
+                Apprenticeship.is_active == True,
+                Apprenticeship.profession == apprenticeship.profession,
+                Apprenticeship.id != apprenticeship_id
+            ])
+            destinations = self._get_destinations(session) if origin_postal else []
+            
+        finally:
+            session.close()
+        
+        if origin_postal:
+            minutes_by_postal = self.distance_calculator.get_isochrone(
+                origin_postal, destinations, "public"
+            ).minutes_by_postal()
+            candidates.sort(key=lambda candidate: minutes_by_postal.get(candidate.postal_code, float('inf')))
+        
+        return candidates[:limit]
+    
     def get_detailed_recommendation(self, 
                                   user_profile: UserProfile,
                                   apprenticeship: Apprenticeship) -> Tuple[MatchScore, AIRecommendation]:
         """Get detailed recommendation for a specific apprenticeship"""
         
-        # Calculate match score
-        match_score = self.scoring_engine.score_apprenticeship(user_profile, apprenticeship)
+        with start_trace("detailed_recommendation", self.tracing_enabled) as request_trace:
+            match_score = self._detail_score(user_profile, apprenticeship)
+            
+            # Generate AI recommendation
+            with request_trace.span("ai_explanation"):
+                ai_recommendation = self.ai_integration.generate_match_explanation(
+                    user_profile, apprenticeship, match_score
+                )
         
-        # Generate AI recommendation
-        ai_recommendation = self.ai_integration.generate_match_explanation(
-            user_profile, apprenticeship, match_score
-        )
+        if request_trace.enabled and request_trace.root.duration is not None:
+            trace_logger.info(request_trace.to_json())
         
         return match_score, ai_recommendation
     
+    def get_detailed_recommendations(self,
+                                     user_profile: UserProfile,
+                                     apprenticeships: List[Apprenticeship],
+                                     max_concurrency: int = 4,
+                                     timeout: Optional[float] = None) -> List[Tuple[MatchScore, AIRecommendation]]:
+        """Detailed recommendations for several apprenticeships, AI calls run concurrently"""
+        
+        with start_trace("detailed_recommendations", self.tracing_enabled) as request_trace:
+            match_scores = [self._detail_score(user_profile, apprenticeship) for apprenticeship in apprenticeships]
+            
+            with request_trace.span("ai_explanations", count=len(apprenticeships)):
+                recommendations = self.ai_integration.generate_match_explanations(
+                    user_profile, list(zip(apprenticeships, match_scores)),
+                    max_concurrency=max_concurrency, timeout=timeout
+                )
+        
+        if request_trace.enabled and request_trace.root.duration is not None:
+            trace_logger.info(request_trace.to_json())
+        
+        return list(zip(match_scores, recommendations))
+    
+    def stream_detailed_recommendation(self,
+                                       user_profile: UserProfile,
+                                       apprenticeship: Apprenticeship) -> Tuple[MatchScore, Iterator[AIRecommendation]]:
+        """Match score right away and the AI recommendation as it streams in (last item is final)"""
+        
+        match_score = self._detail_score(user_profile, apprenticeship)
+        
+        return match_score, self.ai_integration.stream_match_explanation(user_profile, apprenticeship, match_score)
+    
+    def _detail_score(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> MatchScore:
+        """Score of one apprenticeship, reused from a cached matching result for this profile if possible"""
+        
+        match_score = self._find_cached_score(user_profile, apprenticeship.id)
+        current_trace().count("score_reused" if match_score is not None else "score_calculated")
+        
+        if match_score is None:
+            match_score = self.scoring_engine.score_apprenticeship(user_profile, apprenticeship)
+        
+        return match_score
+    
+    def _find_cached_score(self, user_profile: UserProfile, apprenticeship_id: int) -> Optional[MatchScore]:
+        """Look up an apprenticeship's score in cached results for the same profile"""
+        
+        profile_hash = profile_fingerprint(user_profile)
+        generation = self._get_data_generation()
+        
+        cached = self.result_cache.find(lambda key: key[0] == profile_hash and key[-1] == generation)
+        if cached is None:
+            return None
+        
+        for ranked in cached.ranked_apprenticeships:
+            if ranked.apprenticeship.id == apprenticeship_id:
+                return ranked.match_score
+        
+        return None
+    
+    def _get_data_generation(self) -> int:
+        """Current data generation, re-read from the database at most every few seconds"""
+        
+        now = time.monotonic()
+        if self._data_generation is not None and now - self._generation_checked_at < self.generation_poll_seconds:
+            return self._data_generation
+        
+        session = get_session()
+        try:
+            generation = get_data_generation(session)
+        finally:
+            session.close()
+        
+        if generation != self._data_generation:
+            self.result_cache.invalidate()
+        
+        self._data_generation = generation
+        self._generation_checked_at = now
+        
+        return generation
+    
+    def _current_snapshot(self) -> Optional[DataSnapshot]:
+        """Published snapshot of the current data generation (None if missing or stale)"""
+        
+        snapshot = self.snapshots.current()
+        if snapshot is None or snapshot.generation != self._get_data_generation():
+            return None
+        
+        # Hot-swap: later requests use the new maps, running ones keep their reference
+        if snapshot is not self._active_snapshot:
+            self.text_matcher.use_snapshot(snapshot)
+            self._active_snapshot = snapshot
+        
+        return snapshot
+    
+    def warm_up(self):
+        """Load data generation and snapshot before serving the first request"""
+        self._current_snapshot()
+    
+    def invalidate_caches(self):
+        """Drop cached results, e.g. after new data was committed in this process"""
+        self.result_cache.invalidate()
+        self._data_generation = None
+    
     def _get_filtered_apprenticeships(self, 
                                     user_profile: UserProfile,
                                     custom_filters: Optional[Dict],
-                                    apply_distance_filter: bool) -> List[Apprenticeship]:
-        """Get filtered apprenticeships from database"""
+                                    apply_distance_filter: bool) -> Tuple[List[CandidateRow], np.ndarray]:
+        """
+        Get filtered candidates from database
+        
+        Returns:
+            Lightweight candidate rows and their commute minutes in one aligned
+            array (NaN = unknown), reused by the location score
+        """
         
         session = get_session()
         
         try:
-            # Base query
-            query = session.query(Apprenticeship).filter_by(is_active=True)
+            # Travel times to all listing PLZs, computed once per request
+            trace = current_trace()
+            apply_distance_filter = self._applies_distance_filter(user_profile, apply_distance_filter)
+            isochrone = None
+            if user_profile.postal_code:
+                with trace.span("distance_filter"):
+                    isochrone = self._get_isochrone(session, user_profile)
             
-            # Apply custom filters
-            if custom_filters:
-                for field, value in custom_filters.items():
-                    if hasattr(Apprenticeship, field) and value is not None:
-                        query = query.filter(getattr(Apprenticeship, field) == value)
-            
-            # Get initial results
-            apprenticeships = query.all()
+            # Sector exclusions, reachability and custom filters run in SQL
+            clauses = self.query_planner.build_clauses(
+                avoid_sectors=user_profile.avoid_sectors,
+                reachable_postal_codes=(
+                    isochrone.within(user_profile.max_commute_minutes) if apply_distance_filter else None
+                ),
+                custom_filters=custom_filters
+            )
             
-            # Apply distance filter if requested
-            if apply_distance_filter and user_profile.max_commute_minutes:
-                apprenticeships = self._filter_by_distance(
-                    apprenticeships, user_profile
-                )
+            with trace.span("db_load", clauses=len(clauses)):
+                apprenticeships = load_candidate_rows(session, clauses)
             
-            # Apply sector exclusions
-            if user_profile.avoid_sectors:
-                apprenticeships = self._filter_by_avoided_sectors(
-                    apprenticeships, user_profile.avoid_sectors
-                )
+            # Hand the travel times to scoring
+            minutes_by_postal = isochrone.minutes_by_postal() if isochrone else {}
+            commute_minutes = np.array(
+                [minutes_by_postal.get(app.postal_code, np.nan) for app in apprenticeships],
+                dtype=float
+            )
             
-            return apprenticeships
+            return apprenticeships, commute_minutes
             
         finally:
             session.close()
     
-    def _filter_by_distance(self, 
-                           apprenticeships: List[Apprenticeship],
-                           user_profile: UserProfile) -> List[Apprenticeship]:
-        """Filter apprenticeships by commute time"""
+    def _hydrate_results(self, ranked_apprenticeships: List[RankedApprenticeship]):
+        """Replace candidate rows with ORM objects in the final results"""
         
-        filtered = []
+        if not ranked_apprenticeships:
+            return
         
-        for app in apprenticeships:
-            if not app.postal_code:
-                # Keep apprenticeships without postal code (can't filter)
-                filtered.append(app)
-                continue
-            
-            # Check if within commute time
-            is_within_commute = self.distance_calculator.is_within_commute_time(
-                user_profile.postal_code,
-                app.postal_code,
-                user_profile.max_commute_minutes,
-                user_profile.preferred_transport
+        session = get_session()
+        
+        try:
+            apprenticeships = hydrate_apprenticeships(
+                session, [ranked.apprenticeship.id for ranked in ranked_apprenticeships]
             )
             
-            if is_within_commute:
-                filtered.append(app)
-        
-        return filtered
-    
-    def _filter_by_avoided_sectors(self, 
-                                  apprenticeships: List[Apprenticeship],
-                                  avoid_sectors: List[str]) -> List[Apprenticeship]:
-        """Filter out apprenticeships in avoided sectors"""
-        
-        filtered = []
-        
-        for app in apprenticeships:
-            # Use scoring engine's sector detection
-            is_avoided = self.scoring_engine._is_in_avoided_sector(app, avoid_sectors)
+            for ranked in ranked_apprenticeships:
+                ranked.apprenticeship = apprenticeships.get(ranked.apprenticeship.id, ranked.apprenticeship)
             
-            if not is_avoided:
-                filtered.append(app)
+        finally:
+            session.close()
+    
+    def _get_isochrone(self, session, user_profile: UserProfile) -> Isochrone:
+        """Get travel times from the user to every PLZ with active listings (cached)"""
         
-        return filtered
+        return self.distance_calculator.get_isochrone(
+            user_profile.postal_code,
+            self._get_destinations(session),
+            user_profile.preferred_transport
+        )
+    
+    def _get_destinations(self, session) -> List[str]:
+        """Distinct postal codes of active listings"""
+        
+        return [
+            postal_code for (postal_code,) in session.query(Apprenticeship.postal_code).filter(
+                Apprenticeship.is_active == True,
+                Apprenticeship.postal_code != None,
+                Apprenticeship.postal_code != ''
+            ).distinct()
+        ]
     
     def get_statistics(self) -> Dict:
         """Get matching engine statistics"""
@@ -241,8 +846,15 @@ class ApprenticeshipMatchingEngine:
                 "location_counts": {},
                 "cache_stats": {
                     "distance_cache": len(self.distance_calculator.cache),
+                    "isochrone_cache": self.distance_calculator.isochrone_cache.stats(),
                     "embedding_cache": self.text_matcher.get_cache_stats(),
-                }
+                    "ai_response_cache": self.ai_integration.response_cache.stats(),
+                    "explanation_templates": self.ai_integration.templates.stats(),
+                    "result_cache": self.result_cache.stats(),
+                },
+                "snapshot": self._active_snapshot.stats() if self._active_snapshot is not None else None,
+                "interest_affinities": self.scoring_engine.interest_affinities.stats(),
+                "outbound": outbound_stats()
             }
             
             # Simple stats for now
@@ -255,9 +867,10 @@ class ApprenticeshipMatchingEngine:
             session.close()
     
     def benchmark_performance(self, test_profiles: List[UserProfile], iterations: int = 1) -> Dict:
-        """Benchmark matching performance"""
+        """Benchmark matching performance (see matcher/benchmark.py for per-stage timings)"""
         
         from time import time
+        from matcher.benchmark import latency_summary
         
         results = {
             "avg_processing_time": 0.0,
@@ -268,14 +881,16 @@ class ApprenticeshipMatchingEngine:
         
         total_time = 0.0
         total_results = 0
+        latencies = []
         
         for i in range(iterations):
             for j, profile in enumerate(test_profiles):
                 start_time = time()
                 
-                matching_result = self.find_matches(profile, limit=20)
+                matching_result = self._find_matches_uncached(profile, 20, 0.3, True, None)
                 
                 elapsed = time() - start_time
+                latencies.append(elapsed)
                 total_time += elapsed
                 total_results += len(matching_result.ranked_apprenticeships)
                 
@@ -283,9 +898,25 @@ class ApprenticeshipMatchingEngine:
         
         results["avg_processing_time"] = total_time / (iterations * len(test_profiles))
         results["avg_results_per_profile"] = total_results / (iterations * len(test_profiles))
+        results["latency"] = latency_summary(latencies)
         
         return results
 
+# Process-wide engine so caches (embeddings, isochrones, API clients) stay warm
+_shared_engine = None
+_shared_engine_lock = threading.Lock()
+
+def get_shared_engine() -> ApprenticeshipMatchingEngine:
+    """Get the shared matching engine, created once per process"""
+    global _shared_engine
+    
+    if _shared_engine is None:
+        with _shared_engine_lock:
+            if _shared_engine is None:
+                _shared_engine = ApprenticeshipMatchingEngine()
+    
+    return _shared_engine
+
 def test_matching_engine():
     """Test the complete matching engine"""
     
@@ -339,7 +970,7 @@ def test_matching_engine():
     
     # AI Summary
     print("=== AI Summary ===")
-    print(matching_result.ai_summary)
+    print(matching_result.resolve_summary(timeout=engine.ai_integration.summary_timeout))
     print()
     
     # Detailed recommendation for top match
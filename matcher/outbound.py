@@ -0,0 +1,280 @@
+"""
+Shared guard for outbound API calls (OpenAI, Google Maps)
+
+Every provider gets a token bucket (requests per second), a concurrency cap
+and a circuit breaker. Calls run inside guard.slot(timeout), which shortens
+the client timeout to the deadline of the incoming request. When a provider
+keeps failing or timing out, the breaker opens and calls are rejected at once
+with OutboundUnavailable, so callers switch to their fallbacks without waiting.
+
+Limits are configured per provider via environment variables, e.g.
+OUTBOUND_OPENAI_RATE, OUTBOUND_OPENAI_BURST, OUTBOUND_OPENAI_CONCURRENCY.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from matcher.tracing import current_trace
+
+# Defaults per provider, each overridable via OUTBOUND_<PROVIDER>_<SETTING>
+PROVIDER_DEFAULTS = {
+    "openai": {
+        "rate": 5.0, "burst": 10, "concurrency": 8, "max_queue_seconds": 2.0,
+        "failure_threshold": 5, "reset_seconds": 30.0, "slow_call_seconds": 20.0
+    },
+    "openai_embeddings": {
+        "rate": 20.0, "burst": 50, "concurrency": 8, "max_queue_seconds": 2.0,
+        "failure_threshold": 5, "reset_seconds": 30.0, "slow_call_seconds": 0.0
+    },
+    "google_maps": {
+        "rate": 10.0, "burst": 20, "concurrency": 4, "max_queue_seconds": 2.0,
+        "failure_threshold": 5, "reset_seconds": 60.0, "slow_call_seconds": 0.0
+    }
+}
+
+# Absolute time.monotonic() deadline of the current request, None = no deadline
+_deadline: ContextVar[Optional[float]] = ContextVar("outbound_deadline", default=None)
+
+class OutboundUnavailable(Exception):
+    """Call rejected before reaching the provider (breaker open, rate limit, deadline)"""
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Run a block with a deadline; nested deadlines can only shorten it"""
+    if seconds is None:
+        yield
+        return
+
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left until the current deadline, None without deadline"""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+def bind_deadline(func):
+    """Wrap func so it runs under the caller's deadline (for worker threads)"""
+    current = _deadline.get()
+
+    def bound(*args, **kwargs):
+        token = _deadline.set(current)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+
+    return bound
+
+class TokenBucket:
+    """Thread-safe token bucket"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: float) -> bool:
+        """Take one token, waiting at most max_wait seconds"""
+        give_up = time.monotonic() + max(max_wait, 0.0)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_seconds = (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+            if now + wait_seconds > give_up:
+                return False
+            time.sleep(wait_seconds)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker: closed -> open after failure_threshold
+    failures, half-open after reset_seconds (one trial call), closed again
+    after a successful trial
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may proceed (reserves the trial call when half-open)"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self):
+        """Give up a reserved trial without an outcome (e.g. abandoned stream)"""
+        with self._lock:
+            self._trial_running = False
+
+class ProviderGuard:
+    """Rate limit, concurrency cap and circuit breaker of one provider"""
+
+    def __init__(self, name: str, rate: float, burst: int, concurrency: int,
+                 max_queue_seconds: float, failure_threshold: int, reset_seconds: float,
+                 slow_call_seconds: float = 0.0):
+        self.name = name
+        self.max_queue_seconds = max_queue_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.concurrency = concurrency
+        self._semaphore = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self.metrics = {
+            "calls": 0, "successes": 0, "failures": 0, "slow_calls": 0,
+            "rejected_open": 0, "rejected_rate": 0, "rejected_concurrency": 0, "rejected_deadline": 0,
+            "in_flight": 0, "total_seconds": 0.0
+        }
+
+    def available(self) -> bool:
+        """False while the breaker is open (fallbacks should be used directly)"""
+        return self.breaker.state != "open"
+
+    def _count(self, name: str, value: float = 1):
+        with self._lock:
+            self.metrics[name] += value
+
+    def _reject(self, reason: str, message: str):
+        self._count(f"rejected_{reason}")
+        current_trace().count(f"{self.name}.rejected")
+        raise OutboundUnavailable(f"{self.name}: {message}")
+
+    @contextmanager
+    def slot(self, timeout: float):
+        """
+        Guard one call; yields the client timeout to use (capped by the deadline)
+
+        Exceptions raised inside the block count as provider failures and are
+        re-raised; rejections raise OutboundUnavailable before the call starts.
+        """
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            self._reject("deadline", "request deadline exceeded")
+
+        if not self.breaker.allow():
+            self._reject("open", "circuit open")
+
+        budget = self.max_queue_seconds if remaining is None else min(self.max_queue_seconds, remaining)
+        acquired = False
+        outcome = None
+        try:
+            if not self.bucket.acquire(budget):
+                self._reject("rate", "rate limit reached")
+            if not self._semaphore.acquire(timeout=max(budget, 0.0)):
+                self._reject("concurrency", "too many concurrent calls")
+            acquired = True
+
+            remaining = remaining_time()
+            call_timeout = timeout if remaining is None else min(timeout, remaining)
+            if call_timeout <= 0:
+                self._reject("deadline", "request deadline exceeded")
+
+            self._count("calls")
+            self._count("in_flight")
+            started = time.monotonic()
+            try:
+                yield call_timeout
+            except Exception:
+                outcome = "failure"
+                raise
+            else:
+                outcome = "success"
+            finally:
+                elapsed = time.monotonic() - started
+                self._count("in_flight", -1)
+                self._count("total_seconds", elapsed)
+
+                # A provider that answers only after a long time is degraded as well
+                if outcome == "success" and self.slow_call_seconds and elapsed > self.slow_call_seconds:
+                    self._count("slow_calls")
+                    outcome = "failure"
+
+                if outcome == "failure":
+                    self._count("failures")
+                    current_trace().count(f"{self.name}.failures")
+                    self.breaker.record_failure()
+                elif outcome == "success":
+                    self._count("successes")
+                    self.breaker.record_success()
+        finally:
+            if acquired:
+                self._semaphore.release()
+            if outcome is None:
+                self.breaker.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.metrics)
+        stats["state"] = self.breaker.state
+        stats["concurrency"] = self.concurrency
+        stats["avg_seconds"] = stats["total_seconds"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+_providers: Dict[str, ProviderGuard] = {}
+_providers_lock = threading.Lock()
+
+def get_provider(name: str) -> ProviderGuard:
+    """Process-wide guard of a provider, configured from the environment"""
+    with _providers_lock:
+        if name not in _providers:
+            settings = dict(PROVIDER_DEFAULTS.get(name, PROVIDER_DEFAULTS["openai"]))
+            for key, default in settings.items():
+                value = os.getenv(f"OUTBOUND_{name.upper()}_{key.upper()}")
+                if value is not None:
+                    settings[key] = type(default)(value)
+            _providers[name] = ProviderGuard(name, **settings)
+        return _providers[name]
+
+def outbound_stats() -> Dict:
+    """Metrics of all providers used so far"""
+    with _providers_lock:
+        providers = list(_providers.values())
+    return {provider.name: provider.stats() for provider in providers}
@@ -0,0 +1,101 @@
+"""
+Query planner that pushes profile filters into SQL
+"""
+import sys
+import os
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, not_, or_
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matcher.scoring_engine import SECTOR_KEYWORDS
+from matcher.search import search_clause
+from data.database import Apprenticeship, UNICODE_LOWER_FUNCTION
+
+# custom_filters key for a full-text query instead of a column
+SEARCH_FILTER = "search"
+
+class MatchQueryPlanner:
+    """Translate profile constraints and custom filters into WHERE clauses"""
+    
+    def build_clauses(self,
+                      avoid_sectors: Optional[List[str]] = None,
+                      reachable_postal_codes: Optional[List[str]] = None,
+                      custom_filters: Optional[Dict] = None) -> List:
+        """
+        Build WHERE clauses for the candidate query
+        
+        Args:
+            avoid_sectors: Sectors from the user profile to exclude
+            reachable_postal_codes: Postal codes within commute time (None = no distance filter)
+            custom_filters: Column equality filters, plus SEARCH_FILTER for full-text search
+        """
+        
+        clauses = [Apprenticeship.is_active == True]
+        clauses.extend(self.custom_filter_clauses(custom_filters))
+        
+        if reachable_postal_codes is not None:
+            clauses.append(self.reachability_clause(reachable_postal_codes))
+        
+        if avoid_sectors:
+            clause = self.avoided_sectors_clause(avoid_sectors)
+            if clause is not None:
+                clauses.append(clause)
+        
+        return clauses
+    
+    def custom_filter_clauses(self, custom_filters: Optional[Dict]) -> List:
+        """Equality filters on Apprenticeship columns and full-text search, unknown fields are ignored"""
+        
+        clauses = []
+        columns = Apprenticeship.__table__.columns
+        
+        for field, value in (custom_filters or {}).items():
+            if field == SEARCH_FILTER and value:
+                clause = search_clause(value)
+                if clause is not None:
+                    clauses.append(clause)
+            elif field in columns and value is not None:
+                clauses.append(columns[field] == value)
+        
+        return clauses
+    
+    def reachability_clause(self, reachable_postal_codes: List[str]):
+        """Postal code within commute time; listings without postal code are kept"""
+        
+        return or_(
+            Apprenticeship.postal_code.in_(reachable_postal_codes),
+            Apprenticeship.postal_code == None,
+            Apprenticeship.postal_code == ''
+        )
+    
+    def avoided_sectors_clause(self, avoid_sectors: List[str]):
+        """Exclude listings whose profession (or title) or company matches a sector keyword"""
+        
+        keywords = [
+            keyword
+            for sector in avoid_sectors if sector in SECTOR_KEYWORDS
+            for keyword in SECTOR_KEYWORDS[sector]
+        ]
+        
+        if not keywords:
+            return None
+        
+        # Same fields as ScoringEngine._is_in_avoided_sector
+        profession = func.coalesce(func.nullif(Apprenticeship.profession, ''), Apprenticeship.title)
+        company = func.coalesce(Apprenticeship.company_name, '')
+        
+        # SQLite's lower() and LIKE only fold ASCII; keywords with umlauts are compared
+        # with str.lower() registered on the connection (slower, so only where needed)
+        unicode_lower = getattr(func, UNICODE_LOWER_FUNCTION)
+        matches = []
+        for keyword in keywords:
+            if keyword.isascii():
+                matches.extend([func.lower(profession).contains(keyword), func.lower(company).contains(keyword)])
+            else:
+                matches.extend([func.instr(unicode_lower(profession), keyword) > 0,
+                                func.instr(unicode_lower(company), keyword) > 0])
+        
+        return not_(or_(*matches))
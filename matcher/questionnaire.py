@@ -1,6 +1,8 @@
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Tuple, Optional, Set
+from dataclasses import dataclass, fields
 from enum import Enum
+import hashlib
+import json
 
 class InterestCategory(Enum):
     TECHNICAL = "technical"
@@ -248,6 +250,30 @@ class ApprenticeshipQuestionnaire:
         
         return min(total_score / len(required_interests) / 5.0, 1.0)  # Normalize to 0-1
 
+def _canonical_value(value):
+    """Convert profile values into a JSON-stable form"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(_canonical_value(k)): _canonical_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        # Order of multiselect answers does not change the match
+        return sorted((_canonical_value(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    return value
+
+def profile_fingerprint(user_profile: UserProfile) -> str:
+    """Stable hash of a user profile, independent of dict and list order"""
+    canonical = {f.name: _canonical_value(getattr(user_profile, f.name)) for f in fields(user_profile)}
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def changed_profile_fields(old_profile: UserProfile, new_profile: UserProfile) -> Set[str]:
+    """Names of the profile fields that differ between two profiles"""
+    return {
+        f.name for f in fields(new_profile)
+        if _canonical_value(getattr(old_profile, f.name)) != _canonical_value(getattr(new_profile, f.name))
+    }
+
 def create_sample_profile() -> UserProfile:
     """Create a sample user profile for testing"""
     return UserProfile(
@@ -0,0 +1,68 @@
+"""
+Bounded LRU/TTL cache for matching results
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable
+
+class MatchResultCache:
+    """LRU cache with time-to-live, keyed by (profile hash, filters, data generation)"""
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable):
+        """Get cached result or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: Hashable, result):
+        """Store result, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def find(self, predicate):
+        """Most recently used valid result whose key matches predicate"""
+        with self._lock:
+            now = time.monotonic()
+            for key in reversed(self._entries):
+                stored_at, result = self._entries[key]
+                if now - stored_at <= self.ttl_seconds and predicate(key):
+                    return result
+        return None
+    
+    def invalidate(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -1,5 +1,6 @@
 import math
-from typing import Dict, List, Tuple, Optional
+import numpy as np
+from typing import Dict, List, Tuple, Optional, Set
 from dataclasses import dataclass
 from datetime import datetime
 import sys
@@ -9,8 +10,22 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from matcher.questionnaire import UserProfile, ApprenticeshipQuestionnaire, InterestCategory
+from matcher.distance_calculator import DistanceCalculator
+from matcher.interest_embeddings import InterestAffinities, SEMANTIC_INTEREST_WEIGHT
 from data.database import Apprenticeship, get_session
 
+# Keywords in profession or company name that identify a sector
+SECTOR_KEYWORDS = {
+    'gastronomy': ['koch', 'restaurant', 'hotel', 'gastronomie', 'service'],
+    'retail': ['detailhandel', 'verkauf', 'laden', 'shop'],
+    'construction': ['bau', 'maurer', 'zimmermann', 'installation'],
+    'finance': ['bank', 'versicherung', 'finanzen'],
+    'manufacturing': ['produktion', 'fertigung', 'fabrik'],
+    'healthcare': ['gesundheit', 'pflege', 'medizin', 'spital'],
+    'it': ['informatik', 'software', 'computer'],
+    'education': ['schule', 'bildung', 'ausbildung']
+}
+
 @dataclass
 class MatchScore:
     """Complete match score with breakdown"""
@@ -36,11 +51,141 @@ class RankedApprenticeship:
     match_score: MatchScore
     rank: int
 
+# Sub-score columns of CandidateScoreTable, in weight order
+SUB_SCORES = ['interest_score', 'location_score', 'skill_score', 'preference_score']
+
+# Keyword groups of the skill score: technical skill they call for, None = communication
+SKILL_KEYWORD_GROUPS = [
+    (['informatik', 'computer', 'digital', 'software'], 'computer_skills'),
+    (['mathematik', 'rechnen', 'kalkulation', 'technik'], 'math_skills'),
+    (['kund', 'beratung', 'verkauf', 'service', 'kommunikation'], None),
+    (['handwerk', 'montage', 'bau', 'reparatur', 'werkstatt'], 'manual_skills')
+]
+
+# Categories estimated by the preference score
+COMPANY_SIZES = ['small', 'medium', 'large']
+WORK_ENVIRONMENTS = ['office', 'field', 'workshop', 'mixed']
+TEAM_REQUIREMENTS = ['team', 'individual', 'mixed']
+
+# Profile fields that feed exactly one sub-score
+PROFILE_FIELD_SUB_SCORES = {
+    'interests': 'interest_score',
+    'max_commute_minutes': 'location_score',
+    'technical_skills': 'skill_score',
+    'soft_skills': 'skill_score',
+    'company_size_preference': 'preference_score',
+    'work_environment': 'preference_score',
+    'team_vs_individual': 'preference_score'
+}
+
+# Profile fields not used by the scores (only by AI texts)
+UNSCORED_PROFILE_FIELDS = {
+    'age', 'location', 'career_goals', 'salary_importance', 'growth_importance', 'required_benefits'
+}
+
+@dataclass
+class CandidateScoreTable:
+    """Sub-scores and commute minutes of all candidates of one matching run"""
+    candidates: List  # CandidateRow or Apprenticeship, aligned with the arrays
+    interest_score: np.ndarray
+    location_score: np.ndarray
+    skill_score: np.ndarray
+    preference_score: np.ndarray
+    total_score: np.ndarray  # NaN for candidates that could not be scored
+    commute_minutes: np.ndarray  # NaN = unknown
+    
+    @classmethod
+    def from_sub_scores(cls, candidates: List, sub_scores: np.ndarray,
+                        commute_minutes: np.ndarray, weights: Dict[str, float]) -> 'CandidateScoreTable':
+        """Build table from an (n, 4) sub-score matrix in SUB_SCORES order"""
+        interest, location, skill, preference = sub_scores.T
+        total = (
+            weights['interest'] * interest +
+            weights['location'] * location +
+            weights['skills'] * skill +
+            weights['preferences'] * preference
+        )
+        
+        return cls(
+            candidates=candidates,
+            interest_score=interest.copy(),
+            location_score=location.copy(),
+            skill_score=skill.copy(),
+            preference_score=preference.copy(),
+            total_score=np.clip(total, 0, 1),
+            commute_minutes=commute_minutes
+        )
+    
+    def __len__(self):
+        return len(self.candidates)
+    
+    def sub_score_matrix(self) -> np.ndarray:
+        """(n, 4) sub-score matrix in SUB_SCORES order"""
+        return np.column_stack([getattr(self, name) for name in SUB_SCORES])
+    
+    def subset(self, indices: np.ndarray) -> 'CandidateScoreTable':
+        """Table restricted to the given rows"""
+        return CandidateScoreTable(
+            candidates=[self.candidates[i] for i in indices],
+            interest_score=self.interest_score[indices],
+            location_score=self.location_score[indices],
+            skill_score=self.skill_score[indices],
+            preference_score=self.preference_score[indices],
+            total_score=self.total_score[indices],
+            commute_minutes=self.commute_minutes[indices]
+        )
+    
+    def select(self, min_score: float = 0.0, max_commute: Optional[float] = None,
+               sort_by: str = 'total_score', limit: Optional[int] = None,
+               rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Row indices passing the thresholds, sorted descending by a score column
+        
+        Candidates with unknown commute time are kept when cutting by max_commute.
+        
+        Args:
+            rows: Only consider these rows (ascending), e.g. a per-profile mask
+        """
+        mask = self.total_score >= min_score
+        if max_commute is not None:
+            mask &= ~(self.commute_minutes > max_commute)
+        
+        indices = np.flatnonzero(mask)
+        if rows is not None:
+            indices = np.intersect1d(indices, rows, assume_unique=True)
+        order = np.argsort(-getattr(self, sort_by)[indices], kind='stable')
+        
+        return indices[order][:limit]
+
+@dataclass
+class CandidateFeatures:
+    """Profile-independent scoring features of a candidate set, extracted once per batch"""
+    candidates: List
+    interest_counts: np.ndarray  # (n, categories) how often each interest is required
+    interest_lengths: np.ndarray  # (n,) number of required interests, 0 = unknown profession
+    interest_affinity: np.ndarray  # (n, categories) semantic category affinities, NaN rows = unknown
+    sector_matrix: np.ndarray  # (n, sectors) bool, SECTOR_KEYWORDS order
+    skill_flags: np.ndarray  # (n, groups) bool, SKILL_KEYWORD_GROUPS order
+    size_index: np.ndarray  # (n,) index into COMPANY_SIZES
+    environment_index: np.ndarray  # (n,) index into WORK_ENVIRONMENTS
+    team_index: np.ndarray  # (n,) index into TEAM_REQUIREMENTS
+    postal_codes: List[str]  # distinct postal codes, '' = missing
+    postal_index: np.ndarray  # (n,) index into postal_codes
+    
+    def __len__(self):
+        return len(self.candidates)
+
 class ScoringEngine:
     """Advanced scoring engine for apprenticeship matching"""
     
-    def __init__(self):
+    def __init__(self, distance_calculator: Optional[DistanceCalculator] = None,
+                 interest_affinity_dir: Optional[str] = None):
         self.questionnaire = ApprenticeshipQuestionnaire()
+        self.distance_calculator = distance_calculator or DistanceCalculator()
+        self.profession_mapping = self.questionnaire.get_profession_mapping()
+        
+        # Semantic interest affinities per listing (built nightly, see matcher/interest_embeddings.py)
+        self.interest_affinities = InterestAffinities(interest_affinity_dir)
         
         # Scoring weights - can be tuned
         self.weights = {
@@ -57,14 +202,25 @@ class ScoringEngine:
             'large': ['bank', 'versicherung', 'konzern', 'international', 'schweiz ag', 'suisse']
         }
     
-    def score_apprenticeship(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> MatchScore:
-        """Calculate complete match score for an apprenticeship"""
+    def score_apprenticeship(self, user_profile: UserProfile, apprenticeship: Apprenticeship,
+                           commute_minutes: Optional[float] = None) -> MatchScore:
+        """
+        Calculate complete match score for an apprenticeship
+        
+        Args:
+            user_profile: Complete user profile
+            apprenticeship: Apprenticeship to score
+            commute_minutes: Travel time from the filter stage (NaN = unknown);
+                calculated via the distance calculator if not given
+        """
+        
+        if commute_minutes is None:
+            commute_minutes = self._get_commute_minutes(user_profile, apprenticeship)
         
         # Calculate individual scores
-        interest_score = self._calculate_interest_score(user_profile, apprenticeship)
-        location_score = self._calculate_location_score(user_profile, apprenticeship)
-        skill_score = self._calculate_skill_score(user_profile, apprenticeship)
-        preference_score = self._calculate_preference_score(user_profile, apprenticeship)
+        interest_score, location_score, skill_score, preference_score = self._calculate_sub_scores(
+            user_profile, apprenticeship, commute_minutes
+        )
         
         # Calculate weighted total score
         total_score = (
@@ -89,13 +245,294 @@ class ScoringEngine:
             explanation=explanation
         )
     
-    def _calculate_interest_score(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> float:
-        """Calculate how well the apprenticeship matches user interests"""
+    def _calculate_sub_scores(self, user_profile: UserProfile, apprenticeship: Apprenticeship,
+                              commute_minutes: Optional[float],
+                              semantic_score: Optional[float] = None) -> Tuple[float, float, float, float]:
+        """Calculate interest, location, skill and preference scores"""
+        return (
+            self._calculate_interest_score(user_profile, apprenticeship, semantic_score),
+            self._calculate_location_score(user_profile, commute_minutes),
+            self._calculate_skill_score(user_profile, apprenticeship),
+            self._calculate_preference_score(user_profile, apprenticeship)
+        )
+    
+    def score_candidates(self, user_profile: UserProfile, candidates: List,
+                         commute_minutes: Optional[np.ndarray] = None) -> 'CandidateScoreTable':
+        """
+        Calculate sub-scores for all candidates without building MatchScore objects
+        
+        Args:
+            commute_minutes: Travel times aligned with candidates (NaN = unknown),
+                as produced by the distance filter stage
+        """
+        
+        if commute_minutes is None:
+            commute_minutes = np.array(
+                [self._get_commute_minutes(user_profile, candidate) for candidate in candidates],
+                dtype=float
+            )
+        
+        semantic_scores = self._semantic_interest_scores(user_profile, candidates)
+        sub_scores = np.full((len(candidates), 4), np.nan)
+        
+        for i, candidate in enumerate(candidates):
+            try:
+                sub_scores[i] = self._calculate_sub_scores(
+                    user_profile, candidate, commute_minutes[i], semantic_scores[i]
+                )
+            except Exception:
+                # Skip apprenticeships that cause errors (NaN never passes a threshold)
+                continue
+        
+        return CandidateScoreTable.from_sub_scores(
+            candidates, np.clip(sub_scores, 0, 1), np.asarray(commute_minutes, dtype=float), self.weights
+        )
+    
+    @staticmethod
+    def affected_sub_scores(changed_fields: Set[str]) -> Optional[Set[str]]:
+        """
+        Sub-scores that must be recomputed after the given profile fields changed
+        
+        Returns None if a field changes the candidate set or the commute times
+        (postal code, transport, avoided sectors), which needs a full matching run.
+        """
+        affected = set()
+        for field_name in changed_fields:
+            if field_name in PROFILE_FIELD_SUB_SCORES:
+                affected.add(PROFILE_FIELD_SUB_SCORES[field_name])
+            elif field_name not in UNSCORED_PROFILE_FIELDS:
+                return None
+        
+        return affected
+    
+    def rescore_candidates(self, user_profile: UserProfile, table: 'CandidateScoreTable',
+                           sub_scores: Set[str]) -> 'CandidateScoreTable':
+        """
+        Recompute only the given sub-scores of a previous run and re-combine the totals
+        
+        The previous table is left unchanged, it may be shared via the result cache.
+        """
+        
+        semantic_scores = self._semantic_interest_scores(user_profile, table.candidates)
+        scorers = {
+            'interest_score': lambda i, candidate, minutes: self._calculate_interest_score(
+                user_profile, candidate, semantic_scores[i]
+            ),
+            'location_score': lambda i, candidate, minutes: self._calculate_location_score(user_profile, minutes),
+            'skill_score': lambda i, candidate, minutes: self._calculate_skill_score(user_profile, candidate),
+            'preference_score': lambda i, candidate, minutes: self._calculate_preference_score(user_profile, candidate)
+        }
+        columns = [SUB_SCORES.index(name) for name in sub_scores]
+        
+        matrix = table.sub_score_matrix()
+        
+        for i, candidate in enumerate(table.candidates):
+            try:
+                if np.isnan(matrix[i]).any():
+                    # Row failed last time, the changed profile may score it now
+                    matrix[i] = self._calculate_sub_scores(
+                        user_profile, candidate, table.commute_minutes[i], semantic_scores[i]
+                    )
+                else:
+                    for column in columns:
+                        matrix[i, column] = scorers[SUB_SCORES[column]](i, candidate, table.commute_minutes[i])
+            except Exception:
+                matrix[i] = np.nan
+        
+        return CandidateScoreTable.from_sub_scores(
+            table.candidates, np.clip(matrix, 0, 1), table.commute_minutes, self.weights
+        )
+    
+    def build_ranked(self, user_profile: UserProfile, table: 'CandidateScoreTable',
+                     indices: np.ndarray, apprenticeships: Optional[Dict[int, Apprenticeship]] = None,
+                     start_rank: int = 1) -> List[RankedApprenticeship]:
+        """
+        Create ranked results (with explanation) for selected table rows
+        
+        Args:
+            indices: Table rows in ranking order
+            apprenticeships: Hydrated ORM objects by id, used instead of the candidate rows
+            start_rank: Rank of the first row (for paginated slices)
+        """
+        
+        ranked = []
+        for rank, i in enumerate(indices, start_rank):
+            candidate = table.candidates[i]
+            if apprenticeships:
+                candidate = apprenticeships.get(candidate.id, candidate)
+            
+            interest_score = float(table.interest_score[i])
+            location_score = float(table.location_score[i])
+            skill_score = float(table.skill_score[i])
+            preference_score = float(table.preference_score[i])
+            
+            ranked.append(RankedApprenticeship(
+                apprenticeship=candidate,
+                match_score=MatchScore(
+                    total_score=float(table.total_score[i]),
+                    interest_score=interest_score,
+                    location_score=location_score,
+                    skill_score=skill_score,
+                    preference_score=preference_score,
+                    explanation=self._generate_explanation(
+                        user_profile, candidate,
+                        interest_score, location_score, skill_score, preference_score
+                    )
+                ),
+                rank=rank
+            ))
+        
+        return ranked
+    
+    def extract_features(self, candidates: List) -> CandidateFeatures:
+        """Extract the profile-independent parts of all sub-scores"""
+        
+        profession_mapping = self.profession_mapping
+        categories = list(InterestCategory)
+        sectors = list(SECTOR_KEYWORDS)
+        
+        self.interest_affinities.refresh()
+        interest_affinity = self.interest_affinities.rows_for(
+            np.fromiter((candidate.id for candidate in candidates), dtype=np.int64, count=len(candidates))
+        )
+        
+        n = len(candidates)
+        interest_counts = np.zeros((n, len(categories)))
+        interest_lengths = np.zeros(n)
+        sector_matrix = np.zeros((n, len(sectors)), dtype=bool)
+        skill_flags = np.zeros((n, len(SKILL_KEYWORD_GROUPS)), dtype=bool)
+        size_index = np.zeros(n, dtype=int)
+        environment_index = np.zeros(n, dtype=int)
+        team_index = np.zeros(n, dtype=int)
+        postal_lookup = {}
+        postal_index = np.zeros(n, dtype=int)
+        
+        for i, candidate in enumerate(candidates):
+            profession = candidate.profession or candidate.title
+            
+            required_interests = profession_mapping.get(profession) or []
+            for interest in required_interests:
+                interest_counts[i, categories.index(interest)] += 1
+            interest_lengths[i] = len(required_interests)
+            
+            for j, sector in enumerate(sectors):
+                sector_matrix[i, j] = self._is_in_avoided_sector(candidate, [sector])
+            
+            combined_text = " ".join([
+                profession.lower(), (candidate.description or "").lower(), (candidate.requirements or "").lower()
+            ])
+            for j, (keywords, skill) in enumerate(SKILL_KEYWORD_GROUPS):
+                skill_flags[i, j] = any(word in combined_text for word in keywords)
+            
+            size_index[i] = COMPANY_SIZES.index(self._estimate_company_size(candidate.company_name or ""))
+            environment_index[i] = WORK_ENVIRONMENTS.index(
+                self._estimate_work_environment(candidate.profession or "", candidate.description or "")
+            )
+            team_index[i] = TEAM_REQUIREMENTS.index(
+                self._estimate_team_requirement(candidate.profession or "", candidate.description or "")
+            )
+            postal_index[i] = postal_lookup.setdefault(candidate.postal_code or "", len(postal_lookup))
+        
+        return CandidateFeatures(
+            candidates=candidates,
+            interest_counts=interest_counts,
+            interest_lengths=interest_lengths,
+            interest_affinity=interest_affinity,
+            sector_matrix=sector_matrix,
+            skill_flags=skill_flags,
+            size_index=size_index,
+            environment_index=environment_index,
+            team_index=team_index,
+            postal_codes=list(postal_lookup),
+            postal_index=postal_index
+        )
+    
+    def score_profiles(self, user_profiles: List[UserProfile], features: CandidateFeatures,
+                       commute_minutes: np.ndarray) -> np.ndarray:
+        """
+        Score several profiles against one candidate set at once
+        
+        Gives the same values as _calculate_sub_scores per pair.
+        
+        Args:
+            commute_minutes: (profiles, candidates) travel times (NaN = unknown)
+        
+        Returns:
+            (profiles, candidates, 4) sub-scores in SUB_SCORES order
+        """
+        
+        categories = list(InterestCategory)
+        sectors = list(SECTOR_KEYWORDS)
+        known = features.interest_lengths > 0
+        
+        # Interest score: profiles x candidates matrix product over interest categories
+        interest_vectors = np.array(
+            [[user_profile.interests.get(category, 0) for category in categories] for user_profile in user_profiles],
+            dtype=float
+        )
+        interest = interest_vectors @ features.interest_counts.T
+        interest = np.minimum(interest / np.where(known, features.interest_lengths, 1) / 5.0, 1.0)
+        interest = np.where(known, interest, 0.5)
+        
+        # Semantic part: profile ratings x listing affinity matrix, summed per category
+        # in the same order as _semantic_interest_score so both give identical values
+        affinity = features.interest_affinity.astype(float)
+        has_affinity = ~np.isnan(affinity[:, 0])
+        affinity = np.nan_to_num(affinity)
+        semantic = np.zeros_like(interest)
+        for j in range(len(categories)):
+            semantic += interest_vectors[:, j:j + 1] * affinity[:, j]
+        semantic = np.minimum(semantic / 5.0, 1.0)
+        weight = np.where(known, SEMANTIC_INTEREST_WEIGHT, 1.0)
+        interest = np.where(has_affinity, (1 - weight) * interest + weight * semantic, interest)
+        
+        interest = np.where(interest > 0.8, np.minimum(1.0, interest * 1.1), interest)
+        
+        sub_scores = np.empty((len(user_profiles), len(features), 4))
+        
+        for k, user_profile in enumerate(user_profiles):
+            # Penalty for avoided sectors
+            sector_columns = [sectors.index(sector) for sector in user_profile.avoid_sectors if sector in SECTOR_KEYWORDS]
+            avoided = features.sector_matrix[:, sector_columns].any(axis=1)
+            sub_scores[k, :, 0] = np.where(avoided, interest[k] * 0.3, interest[k])
+            
+            sub_scores[k, :, 1] = self._location_scores(user_profile, commute_minutes[k])
+            
+            # Same order of additions as the scalar scores
+            skill = np.full(len(features), 0.7)
+            for j, adjustment in enumerate(self._skill_adjustments(user_profile)):
+                skill += np.where(features.skill_flags[:, j], adjustment, 0.0)
+            sub_scores[k, :, 2] = np.clip(skill, 0, 1)
+            
+            size_points, environment_points, team_points = self._preference_points(user_profile)
+            preference = np.full(len(features), 0.5)
+            preference += np.array([size_points[size] for size in COMPANY_SIZES])[features.size_index]
+            preference += np.array([environment_points[env] for env in WORK_ENVIRONMENTS])[features.environment_index]
+            preference += np.array([team_points[team] for team in TEAM_REQUIREMENTS])[features.team_index]
+            sub_scores[k, :, 3] = np.clip(preference, 0, 1)
+        
+        return np.clip(sub_scores, 0, 1)
+    
+    def _calculate_interest_score(self, user_profile: UserProfile, apprenticeship: Apprenticeship,
+                                  semantic_score: Optional[float] = None) -> float:
+        """
+        Calculate how well the apprenticeship matches user interests
+        
+        Args:
+            semantic_score: Precomputed _semantic_interest_score (NaN = none), looked up if not given
+        """
         profession = apprenticeship.profession or apprenticeship.title
         
         # Use questionnaire mapping
         base_score = self.questionnaire.calculate_interest_match(user_profile.interests, profession)
         
+        # Blend in the semantic score (mapped professions) or replace the neutral score (others)
+        if semantic_score is None:
+            semantic_score = self._semantic_interest_score(user_profile, apprenticeship)
+        if not math.isnan(semantic_score):
+            weight = SEMANTIC_INTEREST_WEIGHT if self.profession_mapping.get(profession) else 1.0
+            base_score = (1 - weight) * base_score + weight * semantic_score
+        
         # Boost score for strong interests
         if base_score > 0.8:
             base_score = min(1.0, base_score * 1.1)
@@ -106,39 +543,75 @@ class ScoringEngine:
             
         return base_score
     
-    def _calculate_location_score(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> float:
-        """Calculate location compatibility score"""
-        
-        # Extract postal codes
-        user_postal = user_profile.postal_code
-        apprentice_postal = apprenticeship.postal_code
+    def _semantic_interest_score(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> float:
+        """Profile ratings weighted by the listing's category affinities, NaN without affinities"""
+        affinity = self.interest_affinities.lookup(getattr(apprenticeship, 'id', None))
+        if affinity is None:
+            return float('nan')
+        
+        semantic = 0.0
+        for j, category in enumerate(InterestCategory):
+            semantic += float(user_profile.interests.get(category, 0)) * float(affinity[j])
+        return min(semantic / 5.0, 1.0)
+    
+    def _semantic_interest_scores(self, user_profile: UserProfile, candidates: List) -> np.ndarray:
+        """_semantic_interest_score of all candidates with one pass per category"""
+        self.interest_affinities.refresh()
+        affinity = self.interest_affinities.rows_for(
+            np.fromiter((candidate.id for candidate in candidates), dtype=np.int64, count=len(candidates))
+        ).astype(float)
+        
+        # Summed in the same order as the per-listing score
+        semantic = np.zeros(len(candidates))
+        for j, category in enumerate(InterestCategory):
+            semantic += float(user_profile.interests.get(category, 0)) * affinity[:, j]
+        return np.minimum(semantic / 5.0, 1.0)
+    
+    def _get_commute_minutes(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> Optional[float]:
+        """Get travel time to the apprenticeship, None if unknown"""
         
-        if not apprentice_postal or not user_postal:
-            return 0.7  # Neutral score when postal code missing
+        if not apprenticeship.postal_code or not user_profile.postal_code:
+            return None
         
-        try:
-            user_code = int(user_postal)
-            app_code = int(apprentice_postal)
-            
-            # Simple distance estimation based on postal code difference
-            # In Switzerland, postal codes roughly correlate with geographic distance
-            postal_diff = abs(user_code - app_code)
-            
-            if postal_diff == 0:
-                return 1.0  # Same postal code
-            elif postal_diff < 100:
-                return 0.9  # Very close
-            elif postal_diff < 500:
-                return 0.8  # Close
-            elif postal_diff < 1000:
-                return 0.6  # Moderate distance
-            elif postal_diff < 2000:
-                return 0.4  # Far
-            else:
-                return 0.2  # Very far
-                
-        except (ValueError, TypeError):
-            return 0.7  # Default when postal codes are invalid
+        return self.distance_calculator.get_commute_minutes(
+            user_profile.postal_code,
+            apprenticeship.postal_code,
+            user_profile.preferred_transport
+        )
+    
+    def _calculate_location_score(self, user_profile: UserProfile, commute_minutes: Optional[float]) -> float:
+        """Calculate location compatibility score from the commute time"""
+        
+        if commute_minutes is None or math.isnan(commute_minutes):
+            return 0.7  # Neutral score when travel time is unknown
+        
+        # Rate relative to the commute the user accepts
+        max_minutes = user_profile.max_commute_minutes or 60
+        ratio = commute_minutes / max_minutes
+        
+        if ratio <= 0.25:
+            return 1.0  # Very close
+        elif ratio <= 0.5:
+            return 0.9  # Close
+        elif ratio <= 0.75:
+            return 0.8  # Well reachable
+        elif ratio <= 1.0:
+            return 0.6  # Within acceptable commute
+        elif ratio <= 1.5:
+            return 0.4  # Far
+        else:
+            return 0.2  # Very far
+    
+    def _location_scores(self, user_profile: UserProfile, commute_minutes: np.ndarray) -> np.ndarray:
+        """Vectorized _calculate_location_score"""
+        ratio = commute_minutes / (user_profile.max_commute_minutes or 60)
+        
+        scores = np.select(
+            [ratio <= 0.25, ratio <= 0.5, ratio <= 0.75, ratio <= 1.0, ratio <= 1.5],
+            [1.0, 0.9, 0.8, 0.6, 0.4],
+            0.2
+        )
+        return np.where(np.isnan(commute_minutes), 0.7, scores)
     
     def _calculate_skill_score(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> float:
         """Calculate skill requirements match"""
@@ -150,81 +623,88 @@ class ScoringEngine:
         
         score = 0.7  # Base score
         
-        # Technical skills assessment
-        if any(word in combined_text for word in ['informatik', 'computer', 'digital', 'software']):
-            if user_profile.technical_skills.get('computer_skills'):
-                skill_level = user_profile.technical_skills['computer_skills'].value
-                score += (skill_level - 2) * 0.1  # Boost for higher skill
-        
-        # Math skills for technical professions
-        if any(word in combined_text for word in ['mathematik', 'rechnen', 'kalkulation', 'technik']):
-            if user_profile.technical_skills.get('math_skills'):
-                skill_level = user_profile.technical_skills['math_skills'].value
-                score += (skill_level - 2) * 0.1
-        
-        # Language skills for customer-facing roles
-        if any(word in combined_text for word in ['kund', 'beratung', 'verkauf', 'service', 'kommunikation']):
-            communication_score = user_profile.soft_skills.get('communication', 3)
-            score += (communication_score - 3) * 0.05
-        
-        # Manual skills for hands-on professions
-        if any(word in combined_text for word in ['handwerk', 'montage', 'bau', 'reparatur', 'werkstatt']):
-            if user_profile.technical_skills.get('manual_skills'):
-                skill_level = user_profile.technical_skills['manual_skills'].value
-                score += (skill_level - 2) * 0.1
+        # Adjust for the skills each keyword group calls for
+        for (keywords, skill), adjustment in zip(SKILL_KEYWORD_GROUPS, self._skill_adjustments(user_profile)):
+            if any(word in combined_text for word in keywords):
+                score += adjustment
         
         return max(0, min(1, score))
     
+    def _skill_adjustments(self, user_profile: UserProfile) -> List[float]:
+        """Score adjustment per SKILL_KEYWORD_GROUPS entry"""
+        adjustments = []
+        
+        for keywords, skill in SKILL_KEYWORD_GROUPS:
+            if skill is None:
+                # Language skills for customer-facing roles
+                communication_score = user_profile.soft_skills.get('communication', 3)
+                adjustments.append((communication_score - 3) * 0.05)
+            else:
+                # Boost for higher skill (levels may be SkillLevel or plain ints)
+                skill_level = user_profile.technical_skills.get(skill)
+                adjustments.append((getattr(skill_level, 'value', skill_level) - 2) * 0.1 if skill_level else 0.0)
+        
+        return adjustments
+    
     def _calculate_preference_score(self, user_profile: UserProfile, apprenticeship: Apprenticeship) -> float:
         """Calculate work preference compatibility"""
+        size_points, environment_points, team_points = self._preference_points(user_profile)
+        
         score = 0.5  # Base score
         
         # Company size preference
-        estimated_size = self._estimate_company_size(apprenticeship.company_name or "")
-        if user_profile.company_size_preference == "any" or estimated_size == user_profile.company_size_preference:
-            score += 0.2
-        elif self._size_compatibility(user_profile.company_size_preference, estimated_size):
-            score += 0.1
+        score += size_points[self._estimate_company_size(apprenticeship.company_name or "")]
         
         # Work environment match
-        work_env = self._estimate_work_environment(apprenticeship.profession or "", apprenticeship.description or "")
-        if user_profile.work_environment == "any" or work_env == user_profile.work_environment:
-            score += 0.2
-        elif work_env == "mixed":  # Mixed is compatible with most preferences
-            score += 0.1
+        score += environment_points[
+            self._estimate_work_environment(apprenticeship.profession or "", apprenticeship.description or "")
+        ]
         
         # Team vs individual work
-        team_requirement = self._estimate_team_requirement(apprenticeship.profession or "", apprenticeship.description or "")
-        team_pref = user_profile.team_vs_individual
-        
-        if team_requirement == "team" and team_pref >= 4:
-            score += 0.1
-        elif team_requirement == "individual" and team_pref <= 2:
-            score += 0.1
-        elif team_requirement == "mixed":
-            score += 0.05
+        score += team_points[
+            self._estimate_team_requirement(apprenticeship.profession or "", apprenticeship.description or "")
+        ]
         
         return max(0, min(1, score))
     
+    def _preference_points(self, user_profile: UserProfile) -> Tuple[Dict[str, float], Dict[str, float], Dict[str, float]]:
+        """Points per estimated company size, work environment and team requirement"""
+        size_preference = user_profile.company_size_preference
+        size_points = {}
+        for size in COMPANY_SIZES:
+            if size_preference == "any" or size == size_preference:
+                size_points[size] = 0.2
+            elif self._size_compatibility(size_preference, size):
+                size_points[size] = 0.1
+            else:
+                size_points[size] = 0.0
+        
+        environment_points = {}
+        for environment in WORK_ENVIRONMENTS:
+            if user_profile.work_environment == "any" or environment == user_profile.work_environment:
+                environment_points[environment] = 0.2
+            elif environment == "mixed":  # Mixed is compatible with most preferences
+                environment_points[environment] = 0.1
+            else:
+                environment_points[environment] = 0.0
+        
+        team_pref = user_profile.team_vs_individual
+        team_points = {
+            "team": 0.1 if team_pref >= 4 else 0.0,
+            "individual": 0.1 if team_pref <= 2 else 0.0,
+            "mixed": 0.05
+        }
+        
+        return size_points, environment_points, team_points
+    
     def _is_in_avoided_sector(self, apprenticeship: Apprenticeship, avoid_sectors: List[str]) -> bool:
         """Check if apprenticeship is in an avoided sector"""
         profession = (apprenticeship.profession or apprenticeship.title).lower()
         company = (apprenticeship.company_name or "").lower()
         
-        sector_keywords = {
-            'gastronomy': ['koch', 'restaurant', 'hotel', 'gastronomie', 'service'],
-            'retail': ['detailhandel', 'verkauf', 'laden', 'shop'],
-            'construction': ['bau', 'maurer', 'zimmermann', 'installation'],
-            'finance': ['bank', 'versicherung', 'finanzen'],
-            'manufacturing': ['produktion', 'fertigung', 'fabrik'],
-            'healthcare': ['gesundheit', 'pflege', 'medizin', 'spital'],
-            'it': ['informatik', 'software', 'computer'],
-            'education': ['schule', 'bildung', 'ausbildung']
-        }
-        
         for sector in avoid_sectors:
-            if sector in sector_keywords:
-                keywords = sector_keywords[sector]
+            if sector in SECTOR_KEYWORDS:
+                keywords = SECTOR_KEYWORDS[sector]
                 if any(keyword in profession or keyword in company for keyword in keywords):
                     return True
         return False
@@ -312,32 +792,19 @@ class ScoringEngine:
     
     def rank_apprenticeships(self, user_profile: UserProfile, 
                            apprenticeships: List[Apprenticeship], 
-                           limit: int = 50) -> List[RankedApprenticeship]:
-        """Rank apprenticeships by match score"""
+                           limit: int = 50,
+                           commute_minutes: Optional[np.ndarray] = None) -> List[RankedApprenticeship]:
+        """
+        Rank apprenticeships by match score
         
-        scored_apprenticeships = []
-        
-        for apprenticeship in apprenticeships:
-            try:
-                match_score = self.score_apprenticeship(user_profile, apprenticeship)
-                scored_apprenticeships.append((apprenticeship, match_score))
-            except Exception as e:
-                # Skip apprenticeships that cause errors
-                continue
+        Args:
+            commute_minutes: Travel times aligned with apprenticeships (NaN = unknown),
+                as produced by the distance filter stage
+        """
         
-        # Sort by total score (descending)
-        scored_apprenticeships.sort(key=lambda x: x[1].total_score, reverse=True)
+        table = self.score_candidates(user_profile, apprenticeships, commute_minutes)
         
-        # Create ranked results
-        ranked = []
-        for rank, (apprenticeship, match_score) in enumerate(scored_apprenticeships[:limit], 1):
-            ranked.append(RankedApprenticeship(
-                apprenticeship=apprenticeship,
-                match_score=match_score,
-                rank=rank
-            ))
-        
-        return ranked
+        return self.build_ranked(user_profile, table, table.select(limit=limit))
 
 def test_scoring_engine():
     """Test the scoring engine with sample data"""
@@ -0,0 +1,120 @@
+"""
+Free-text search over active listings (SQLite FTS5 index, BM25 ranking)
+
+The index covers title, profession, company name, description and
+requirements and is kept in sync by triggers (see data/database.py). Queries
+are built from user input token by token, so special characters never reach
+the FTS5 query syntax; the last token is matched as a prefix (search as you type).
+
+BM25 has to score every match, which costs a few microseconds per row. Broad
+queries (a term found in most listings, like "EFZ") are therefore ranked
+within the RANK_WINDOW most recent matches, which keeps queries below 10 ms
+at 100k listings; the cut-off is found by rowid order, which FTS5 answers
+without scoring.
+"""
+import sys
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import select, text
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import SEARCH_TABLE, Apprenticeship
+from matcher.candidates import CANDIDATE_COLUMNS, CandidateRow
+
+# BM25 weights in SEARCH_COLUMNS order: title, profession, company_name, description, requirements
+BM25_WEIGHTS = (8.0, 6.0, 4.0, 1.0, 1.0)
+
+# Matches ranked by BM25 at most (the newest ones, by id)
+RANK_WINDOW = 1500
+
+# Shorter prefixes have no prefix index and would scan the whole vocabulary
+MIN_PREFIX_LENGTH = 2
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+@dataclass
+class SearchHit:
+    """Listing found by the full-text search"""
+    apprenticeship: CandidateRow
+    score: float  # BM25 relevance, higher is better
+
+def build_match_query(query: str, prefix: bool = True) -> Optional[str]:
+    """
+    FTS5 MATCH expression for user input (all terms must match)
+
+    Returns None if the input contains no searchable terms.
+    """
+    tokens = TOKEN_PATTERN.findall(query or "")
+    if not tokens:
+        return None
+
+    terms = [f'"{token}"' for token in tokens]
+    if prefix and len(tokens[-1]) >= MIN_PREFIX_LENGTH:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def search_apprenticeships(session, query: str, limit: int = 20, offset: int = 0,
+                           prefix: bool = True) -> List[SearchHit]:
+    """Active listings matching the query, most relevant first"""
+    match_query = build_match_query(query, prefix)
+    if match_query is None:
+        return []
+
+    # Oldest id inside the rank window (None = fewer matches, rank all)
+    cutoff = session.execute(text(f"""
+        SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query
+        ORDER BY rowid DESC LIMIT 1 OFFSET :window
+    """), {"query": match_query, "window": max(RANK_WINDOW, offset + limit) - 1}).scalar()
+
+    weights = ", ".join(map(str, BM25_WEIGHTS))
+    ranked = session.execute(text(f"""
+        SELECT rowid, -bm25({SEARCH_TABLE}, {weights}) AS score
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :query AND rowid >= :cutoff
+        ORDER BY bm25({SEARCH_TABLE}, {weights})
+        LIMIT :limit OFFSET :offset
+    """), {"query": match_query, "cutoff": cutoff or 0, "limit": limit, "offset": offset}).all()
+
+    if not ranked:
+        return []
+
+    # Listing rows for the returned page only
+    ids = [rowid for rowid, _ in ranked]
+    rows = {
+        row[0]: CandidateRow(*row)
+        for row in session.execute(select(*CANDIDATE_COLUMNS).where(Apprenticeship.id.in_(ids)))
+    }
+
+    return [
+        SearchHit(apprenticeship=rows[rowid], score=score)
+        for rowid, score in ranked
+        if rowid in rows
+    ]
+
+def search_ids(session, query: str, prefix: bool = True) -> List[int]:
+    """Ids of all active listings matching the query, ascending"""
+    match_query = build_match_query(query, prefix)
+    if match_query is None:
+        return []
+
+    return [row[0] for row in session.execute(
+        text(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :query ORDER BY rowid"),
+        {"query": match_query}
+    )]
+
+def search_clause(query: str, prefix: bool = True):
+    """WHERE clause restricting a listing query to full-text matches"""
+    match_query = build_match_query(query, prefix)
+    if match_query is None:
+        return None
+
+    return Apprenticeship.id.in_(
+        select(text("rowid")).select_from(text(SEARCH_TABLE)).where(
+            text(f"{SEARCH_TABLE} MATCH :search_query").bindparams(search_query=match_query)
+        )
+    )
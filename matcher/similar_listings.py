@@ -0,0 +1,160 @@
+"""
+Precomputed "similar listings" per active apprenticeship
+
+A nightly job turns title, profession, description and requirements of every
+active listing into a TF-IDF vector, reduces it to a dense LSA embedding and
+finds the top-k nearest neighbours by cosine similarity in blocked matrix
+multiplications. The neighbour lists are stored in the apprenticeship_neighbours
+table, so the detail page needs a single primary-key lookup.
+"""
+import sys
+import os
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import Apprenticeship, ApprenticeshipNeighbours, get_data_generation, get_session
+from matcher.candidates import CandidateRow, load_candidate_rows
+
+# Neighbours stored per listing (more than shown, so inactive ones can be skipped)
+DEFAULT_NEIGHBOURS = 20
+
+# Dimensions of the LSA embedding
+DEFAULT_DIMENSIONS = 128
+
+# Rows per similarity block: block_size x listings float32 scores in memory
+DEFAULT_BLOCK_SIZE = 256
+
+# Columns used to estimate the score threshold of the top k
+SAMPLE_COLUMNS = 2048
+
+# Neighbours below this cosine similarity are not stored
+MIN_SIMILARITY = 0.05
+
+def listing_text(candidate: CandidateRow) -> str:
+    # Profession twice: listings of the same profession should be close even with short descriptions
+    return " ".join(filter(None, [
+        candidate.title, candidate.profession, candidate.profession,
+        candidate.description, candidate.requirements
+    ]))
+
+def listing_vectors(texts: List[str], dimensions: int = DEFAULT_DIMENSIONS, seed: int = 42) -> np.ndarray:
+    """L2-normalised float32 vectors of the listing texts (TF-IDF, reduced by truncated SVD)"""
+    vectorizer = TfidfVectorizer(strip_accents="unicode", sublinear_tf=True,
+                                 min_df=2 if len(texts) > 100 else 1, dtype=np.float32)
+    tfidf = vectorizer.fit_transform(texts)
+
+    if tfidf.shape[1] > dimensions and tfidf.shape[0] > dimensions:
+        vectors = TruncatedSVD(n_components=dimensions, random_state=seed).fit_transform(tfidf)
+    else:
+        vectors = tfidf.toarray()
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+def nearest_neighbours(vectors: np.ndarray, k: int = DEFAULT_NEIGHBOURS,
+                       block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k most similar rows of every row (excluding itself)
+
+    Returns:
+        (indices, similarities), both of shape (rows, k), most similar first
+    """
+    count = len(vectors)
+    k = min(k, count - 1)
+    indices = np.zeros((count, max(k, 0)), dtype=np.int64)
+    similarities = np.zeros((count, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return indices, similarities
+
+    # A lower bound of each row's k-th best score, taken from the first columns,
+    # leaves only a few candidates to sort instead of a full-row partition
+    sample = min(count, max(SAMPLE_COLUMNS, k + 1))
+
+    for start in range(0, count, block_size):
+        stop = min(start + block_size, count)
+
+        scores = vectors[start:stop] @ vectors.T
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        thresholds = np.partition(scores[:, :sample], sample - k, axis=1)[:, sample - k]
+
+        for row, threshold in enumerate(thresholds):
+            row_scores = scores[row]
+            candidates = np.flatnonzero(row_scores >= threshold)
+            # Stable sort: equal scores keep id order
+            top = candidates[np.argsort(-row_scores[candidates], kind="stable")[:k]]
+            indices[start + row] = top
+            similarities[start + row] = row_scores[top]
+
+    return indices, similarities
+
+def build_neighbours(k: int = DEFAULT_NEIGHBOURS, dimensions: int = DEFAULT_DIMENSIONS,
+                     block_size: int = DEFAULT_BLOCK_SIZE, db_path: Optional[str] = None) -> Dict:
+    """
+    Recompute the neighbour lists of all active listings and replace the stored ones
+
+    Returns:
+        Build statistics
+    """
+    started = time.perf_counter()
+    session = get_session(db_path)
+    try:
+        generation = get_data_generation(session)
+        candidates = load_candidate_rows(session, [Apprenticeship.is_active == True])
+    finally:
+        session.close()
+
+    ids = np.array([candidate.id for candidate in candidates], dtype=np.int64)
+    if len(candidates) > 1:
+        vectors = listing_vectors([listing_text(candidate) for candidate in candidates], dimensions)
+        indices, similarities = nearest_neighbours(vectors, k, block_size)
+    else:
+        indices = np.zeros((len(candidates), 0), dtype=np.int64)
+        similarities = np.zeros((len(candidates), 0), dtype=np.float32)
+
+    computed_at = datetime.utcnow()
+    rows = []
+    stored = 0
+    for row, apprenticeship_id in enumerate(ids.tolist()):
+        keep = similarities[row] >= MIN_SIMILARITY
+        stored += int(keep.sum())
+        rows.append({
+            "apprenticeship_id": apprenticeship_id,
+            "neighbour_ids": json.dumps(ids[indices[row][keep]].tolist()),
+            "similarities": json.dumps([round(value, 4) for value in similarities[row][keep].tolist()]),
+            "generation": generation,
+            "computed_at": computed_at
+        })
+
+    # Replaced in one transaction, readers never see a partial table
+    session = get_session(db_path)
+    try:
+        session.query(ApprenticeshipNeighbours).delete()
+        for start in range(0, len(rows), 5000):
+            session.execute(ApprenticeshipNeighbours.__table__.insert(), rows[start:start + 5000])
+        session.commit()
+    finally:
+        session.close()
+
+    return {
+        "listings": len(rows),
+        "neighbours": stored,
+        "generation": generation,
+        "seconds": time.perf_counter() - started
+    }
+
+def load_neighbour_ids(session, apprenticeship_id: int) -> Optional[List[int]]:
+    """Stored neighbours of a listing, most similar first (None if not computed yet)"""
+    row = session.get(ApprenticeshipNeighbours, apprenticeship_id)
+    if row is None:
+        return None
+    return json.loads(row.neighbour_ids)
@@ -0,0 +1,225 @@
+"""
+Read-only data snapshots shared by all serving processes
+
+A snapshot is a directory of .npy files (candidate features, embedding cache)
+built once per data generation. Workers memory-map the files read-only, so the
+operating system keeps a single copy in the page cache no matter how many
+worker processes serve requests. A new snapshot is published by writing a
+complete directory and then atomically replacing the CURRENT pointer file.
+"""
+import sys
+import os
+import json
+import shutil
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.database import get_session, get_data_generation, Apprenticeship
+from matcher.candidates import load_candidate_rows
+from matcher.scoring_engine import CandidateFeatures
+from matcher.questionnaire import InterestCategory
+
+DEFAULT_SNAPSHOT_DIR = "data/snapshots"
+
+# CandidateFeatures arrays stored one file each
+FEATURE_ARRAYS = [
+    "interest_counts", "interest_lengths", "interest_affinity", "sector_matrix", "skill_flags",
+    "size_index", "environment_index", "team_index", "postal_index"
+]
+
+CURRENT_FILE = "CURRENT"
+
+class DataSnapshot:
+    """Memory-mapped artifacts of one data generation"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.generation = self.manifest["generation"]
+
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self.arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in FEATURE_ARRAYS
+            if name != "interest_affinity" or os.path.exists(os.path.join(path, f"{name}.npy"))
+        }
+        if "interest_affinity" not in self.arrays:
+            # Snapshot built before semantic interests: keyword scores only
+            self.arrays["interest_affinity"] = np.full((len(self.ids), len(InterestCategory)), np.nan, dtype=np.float32)
+        self.postal_codes: List[str] = self.manifest["postal_codes"]
+
+        self.embedding_index: Dict[str, int] = {}
+        self.embeddings = None
+        if self.manifest.get("embeddings"):
+            with open(os.path.join(path, "embedding_keys.json"), "r", encoding="utf-8") as f:
+                self.embedding_index = {key: i for i, key in enumerate(json.load(f))}
+            self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+
+    def features_for(self, candidates: List) -> Optional[CandidateFeatures]:
+        """
+        Features of the given candidate rows (ordered by id)
+
+        The full active set maps the files directly; filtered subsets copy
+        their rows. Returns None if a candidate is not in the snapshot.
+        """
+        candidate_ids = np.fromiter((candidate.id for candidate in candidates), dtype=np.int64, count=len(candidates))
+
+        if len(candidate_ids) == len(self.ids) and np.array_equal(candidate_ids, self.ids):
+            arrays = self.arrays
+        else:
+            rows = np.searchsorted(self.ids, candidate_ids)
+            if np.any(rows >= len(self.ids)) or not np.array_equal(self.ids[np.minimum(rows, len(self.ids) - 1)], candidate_ids):
+                return None
+            arrays = {name: array[rows] for name, array in self.arrays.items()}
+
+        return CandidateFeatures(candidates=candidates, postal_codes=self.postal_codes, **arrays)
+
+    def embedding(self, cache_key: str) -> Optional[np.ndarray]:
+        row = self.embedding_index.get(cache_key)
+        if row is None:
+            return None
+        return self.embeddings[row]
+
+    def stats(self) -> Dict:
+        return {
+            "generation": self.generation,
+            "candidates": len(self.ids),
+            "embeddings": len(self.embedding_index),
+            "created_at": self.manifest.get("created_at"),
+            "path": self.path
+        }
+
+class SnapshotStore:
+    """Follows the CURRENT pointer of a snapshot directory and swaps in new snapshots"""
+
+    def __init__(self, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR, poll_seconds: float = 5.0):
+        self.snapshot_dir = snapshot_dir
+        self.poll_seconds = poll_seconds
+        self._snapshot: Optional[DataSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[DataSnapshot]:
+        """
+        Latest published snapshot (None if none was built)
+
+        Callers keep the returned object for the whole request, so a swap
+        never mixes two generations within one request.
+        """
+        now = time.monotonic()
+        if now - self._checked_at >= self.poll_seconds:
+            with self._lock:
+                if now - self._checked_at >= self.poll_seconds:
+                    self._refresh()
+                    self._checked_at = now
+        return self._snapshot
+
+    def _refresh(self):
+        try:
+            with open(os.path.join(self.snapshot_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return
+
+        path = os.path.join(self.snapshot_dir, name)
+        if self._snapshot is not None and self._snapshot.path == path:
+            return
+
+        try:
+            # Single reference assignment; old maps stay valid for requests still using them
+            self._snapshot = DataSnapshot(path)
+        except Exception as e:
+            print(f"Could not load snapshot {path}: {e}")
+
+def build_snapshot(scoring_engine, text_matcher=None, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+                   keep: int = 2) -> Dict:
+    """
+    Build the snapshot of the current data generation and publish it
+
+    Args:
+        scoring_engine: ScoringEngine used for feature extraction
+        text_matcher: TextEmbeddingMatcher whose embedding cache is included
+        snapshot_dir: Directory holding the snapshots and the CURRENT pointer
+        keep: Number of snapshots kept on disk (older ones are removed)
+
+    Returns:
+        Snapshot statistics
+    """
+    session = get_session()
+    try:
+        generation = get_data_generation(session)
+        candidates = load_candidate_rows(session, [Apprenticeship.is_active == True])
+    finally:
+        session.close()
+
+    features = scoring_engine.extract_features(candidates)
+
+    name = f"gen-{generation:08d}"
+    staging_dir = os.path.join(snapshot_dir, f"{name}.staging")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    np.save(os.path.join(staging_dir, "ids.npy"), np.array([c.id for c in candidates], dtype=np.int64))
+    for array_name in FEATURE_ARRAYS:
+        np.save(os.path.join(staging_dir, f"{array_name}.npy"), getattr(features, array_name))
+
+    # Embedding cache entries of one dimension as a single matrix
+    embedding_keys = []
+    if text_matcher is not None and text_matcher.embedding_cache:
+        cache = dict(text_matcher.embedding_cache)
+        dimension = Counter(len(vector) for vector in cache.values()).most_common(1)[0][0]
+        embedding_keys = sorted(key for key, vector in cache.items() if len(vector) == dimension)
+
+        np.save(
+            os.path.join(staging_dir, "embeddings.npy"),
+            np.array([cache[key] for key in embedding_keys], dtype=float)
+        )
+        with open(os.path.join(staging_dir, "embedding_keys.json"), "w", encoding="utf-8") as f:
+            json.dump(embedding_keys, f, ensure_ascii=False)
+
+    manifest = {
+        "generation": generation,
+        "created_at": datetime.now().isoformat(),
+        "candidates": len(candidates),
+        "postal_codes": features.postal_codes,
+        "embeddings": len(embedding_keys)
+    }
+    with open(os.path.join(staging_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    # Complete directory first, then flip the pointer atomically
+    final_dir = os.path.join(snapshot_dir, name)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(staging_dir, final_dir)
+
+    pointer_tmp = os.path.join(snapshot_dir, f"{CURRENT_FILE}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(snapshot_dir, CURRENT_FILE))
+
+    # Unlinked files stay readable for workers that still map them
+    snapshots = sorted(entry for entry in os.listdir(snapshot_dir) if entry.startswith("gen-") and entry != f"{name}.staging")
+    for old in [entry for entry in snapshots if entry != name][:max(len(snapshots) - keep, 0)]:
+        shutil.rmtree(os.path.join(snapshot_dir, old), ignore_errors=True)
+
+    size_bytes = sum(
+        os.path.getsize(os.path.join(final_dir, entry)) for entry in os.listdir(final_dir)
+    )
+
+    return {
+        "generation": generation,
+        "candidates": len(candidates),
+        "embeddings": len(embedding_keys),
+        "path": final_dir,
+        "size_bytes": size_bytes
+    }
@@ -5,12 +5,16 @@ import json
 import os
 from dataclasses import dataclass
 import pickle
+import threading
 from sklearn.metrics.pairwise import cosine_similarity
 import sys
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from matcher.tracing import current_trace
+from matcher.outbound import get_provider
+
 @dataclass
 class EmbeddingMatch:
     """Result of text similarity matching"""
@@ -26,6 +30,10 @@ class TextEmbeddingMatcher:
         self.cache_enabled = cache_enabled
         self.embedding_cache = {}
         self.cache_file = "data/embeddings_cache.pkl"
+        self._cache_lock = threading.Lock()  # Engine is shared across sessions
+        self.snapshot = None  # Memory-mapped embeddings shared by all workers
+        self.request_timeout = float(os.getenv('OPENAI_TIMEOUT_SECONDS', 30))
+        self.outbound = get_provider("openai_embeddings")
         
         # Load cache from disk
         self._load_cache()
@@ -54,15 +62,28 @@ class TextEmbeddingMatcher:
         # Check cache first
         cache_key = f"{text}_{model}"
         if self.cache_enabled and cache_key in self.embedding_cache:
+            current_trace().count("embedding_cache.hit")
             return self.embedding_cache[cache_key]
         
+        if self.cache_enabled and self.snapshot is not None:
+            embedding = self.snapshot.embedding(cache_key)
+            if embedding is not None:
+                current_trace().count("embedding_cache.hit")
+                return embedding
+        
+        current_trace().count("embedding_cache.miss")
+        
         try:
             if self.api_key:
                 # Use OpenAI API
-                response = openai.Embedding.create(
-                    input=text,
-                    model=model
-                )
+                current_trace().count("openai.requests")
+                with current_trace().span("openai.embedding"), \
+                        self.outbound.slot(self.request_timeout) as call_timeout:
+                    response = openai.Embedding.create(
+                        input=text,
+                        model=model,
+                        request_timeout=call_timeout
+                    )
                 embedding = np.array(response['data'][0]['embedding'])
             else:
                 # Fallback to keyword-based embedding
@@ -80,7 +101,68 @@ class TextEmbeddingMatcher:
             # Return keyword-based fallback
             return self._create_keyword_embedding(text)
     
-    def _create_keyword_embedding(self, text: str) -> np.ndarray:
+    def get_embeddings(self, texts: List[str], model: str = "text-embedding-ada-002",
+                       cache: bool = True, batch_size: int = 256) -> np.ndarray:
+        """
+        Embedding matrix for many texts (one row per text)
+        
+        Missing embeddings are requested batch_size texts per API call. Without
+        API key, or if a batch fails, all rows use the keyword embedding (without
+        noise), so the rows always share one vector space.
+        
+        Args:
+            cache: Store new embeddings in the embedding cache (off for bulk jobs)
+        """
+        
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing = []
+        
+        for i, text in enumerate(texts):
+            cache_key = f"{text}_{model}"
+            if self.cache_enabled:
+                embeddings[i] = self.embedding_cache.get(cache_key)
+                if embeddings[i] is None and self.snapshot is not None:
+                    embeddings[i] = self.snapshot.embedding(cache_key)
+            if embeddings[i] is None:
+                missing.append(i)
+        
+        current_trace().count("embedding_cache.hit", len(texts) - len(missing))
+        current_trace().count("embedding_cache.miss", len(missing))
+        
+        try:
+            if missing and not self.api_key:
+                raise RuntimeError("no API key")
+            
+            client = openai.OpenAI(api_key=self.api_key) if missing else None
+            for start in range(0, len(missing), batch_size):
+                chunk = missing[start:start + batch_size]
+                current_trace().count("openai.requests")
+                with current_trace().span("openai.embedding", texts=len(chunk)), \
+                        self.outbound.slot(self.request_timeout) as call_timeout:
+                    response = client.embeddings.create(
+                        input=[texts[i] for i in chunk],
+                        model=model,
+                        timeout=call_timeout
+                    )
+                for i, item in zip(chunk, response.data):
+                    embeddings[i] = np.array(item.embedding)
+            
+            if len({len(embedding) for embedding in embeddings}) > 1:
+                raise RuntimeError("cached embeddings of different dimensions")
+            
+        except Exception as e:
+            if missing and self.api_key:
+                print(f"Error getting embeddings: {e}")
+            return np.array([self._create_keyword_embedding(text, noise=False) for text in texts])
+        
+        if cache and self.cache_enabled and missing:
+            for i in missing:
+                self.embedding_cache[f"{texts[i]}_{model}"] = embeddings[i]
+            self._save_cache()
+        
+        return np.array(embeddings) if embeddings else np.zeros((0, len(self.profession_keywords)))
+    
+    def _create_keyword_embedding(self, text: str, noise: bool = True) -> np.ndarray:
         """Create simple keyword-based embedding as fallback"""
         
         text_lower = text.lower()
@@ -95,8 +177,8 @@ class TextEmbeddingMatcher:
             embedding[i] = matches / len(keywords)
         
         # Add some noise to avoid identical embeddings
-        noise = np.random.normal(0, 0.01, len(embedding))
-        embedding += noise
+        if noise:
+            embedding += np.random.normal(0, 0.01, len(embedding))
         
         # Normalize
         norm = np.linalg.norm(embedding)
@@ -210,6 +292,15 @@ class TextEmbeddingMatcher:
         
         return similarity_matrix
     
+    def use_snapshot(self, snapshot):
+        """Serve cached embeddings from a snapshot and drop the private copies it covers"""
+        with self._cache_lock:
+            self.snapshot = snapshot
+            self.embedding_cache = {
+                key: embedding for key, embedding in self.embedding_cache.items()
+                if key not in snapshot.embedding_index
+            }
+    
     def _load_cache(self):
         """Load embedding cache from disk"""
         try:
@@ -224,8 +315,14 @@ class TextEmbeddingMatcher:
         """Save embedding cache to disk"""
         try:
             os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(self.embedding_cache, f)
+            with self._cache_lock:
+                cache = dict(self.embedding_cache)
+                if self.snapshot is not None:
+                    # Entries moved to the snapshot must stay in the persisted cache
+                    for key, row in self.snapshot.embedding_index.items():
+                        cache.setdefault(key, np.array(self.snapshot.embeddings[row]))
+                with open(self.cache_file, 'wb') as f:
+                    pickle.dump(cache, f)
         except Exception as e:
             print(f"Could not save embedding cache: {e}")
     
@@ -233,6 +330,7 @@ class TextEmbeddingMatcher:
         """Get cache statistics"""
         return {
             "cache_size": len(self.embedding_cache),
+            "snapshot_size": len(self.snapshot.embedding_index) if self.snapshot is not None else 0,
             "cache_enabled": self.cache_enabled,
             "api_key_available": bool(self.api_key)
         }
@@ -0,0 +1,139 @@
+"""
+Lightweight per-request tracing: nested timing spans and counters
+
+Components record into the trace of the current request via current_trace();
+outside a traced request this is a shared no-op trace, so instrumentation
+costs one context variable lookup when tracing is disabled.
+"""
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+@dataclass
+class Span:
+    """Timed section of a request"""
+    name: str
+    start: float
+    duration: Optional[float] = None
+    attributes: Dict = field(default_factory=dict)
+    children: List['Span'] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children]
+        }
+
+class Trace:
+    """Spans and counters collected for one request"""
+
+    enabled = True
+
+    def __init__(self, name: str):
+        self.root = Span(name=name, start=time.perf_counter())
+        self.counters: Dict[str, float] = {}
+        self._stack = [self.root]
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a nested section"""
+        span = Span(name=name, start=time.perf_counter(), attributes=attributes)
+        self._stack[-1].children.append(span)
+        self._stack.append(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            self._stack.pop()
+
+    def count(self, name: str, value: float = 1):
+        """Increment a counter"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def annotate(self, **attributes):
+        """Add attributes to the innermost open span"""
+        self._stack[-1].attributes.update(attributes)
+
+    def finish(self) -> 'Trace':
+        self.root.duration = time.perf_counter() - self.root.start
+        return self
+
+    def to_dict(self) -> Dict:
+        return {
+            "spans": self.root.to_dict(),
+            "counters": dict(self.counters)
+        }
+
+    def to_json(self) -> str:
+        """Structured JSON for logging"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+class _NullSpan:
+    """Reusable no-op context manager"""
+
+    @property
+    def attributes(self) -> Dict:
+        # Fresh dict per access: the span is shared by all requests and threads
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class NullTrace:
+    """Trace used when tracing is disabled"""
+
+    enabled = False
+    _span = _NullSpan()
+
+    def span(self, name: str, **attributes):
+        return self._span
+
+    def count(self, name: str, value: float = 1):
+        pass
+
+    def annotate(self, **attributes):
+        pass
+
+NULL_TRACE = NullTrace()
+
+_current_trace: ContextVar = ContextVar("current_trace", default=NULL_TRACE)
+
+def current_trace():
+    """Trace of the request being processed (NULL_TRACE if none)"""
+    return _current_trace.get()
+
+@contextmanager
+def start_trace(name: str, enabled: bool = True):
+    """
+    Collect a trace for the enclosed request
+
+    Yields the Trace (or NULL_TRACE if disabled); nested calls reuse the outer trace.
+    """
+    outer = _current_trace.get()
+    if not enabled or outer.enabled:
+        with outer.span(name):
+            yield outer
+        return
+
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        _current_trace.reset(token)
+
+def flatten_spans(span: Dict, depth: int = 0) -> List[Dict]:
+    """Span tree as a flat list with depth, e.g. for tables"""
+    rows = [{"name": span["name"], "depth": depth, "duration_ms": span["duration_ms"], **span["attributes"]}]
+    for child in span["children"]:
+        rows.extend(flatten_spans(child, depth + 1))
+    return rows
@@ -9,7 +9,15 @@ import os
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from data.database import get_session, Apprenticeship, Company, ScrapingLog
+from data.database import get_session, bump_data_generation, Apprenticeship, Company, ScrapingLog
+from matcher.distance_calculator import DistanceCalculator
+from matcher.commute_matrix import build_commute_matrix
+from matcher.scoring_engine import ScoringEngine
+from matcher.text_embeddings import TextEmbeddingMatcher
+from matcher.snapshot import build_snapshot
+from matcher.similar_listings import build_neighbours
+from matcher.interest_embeddings import build_interest_affinities
+from matcher.candidates import load_candidate_rows
 
 class ApprenticeshipScheduler:
     def __init__(self):
@@ -85,6 +93,9 @@ class ApprenticeshipScheduler:
             # Commit changes
             session.commit()
             
+            # Invalidate cached matching results in all processes
+            bump_data_generation(session)
+            
             # Log scraping results
             finished_at = datetime.now()
             duration = (finished_at - started_at).total_seconds()
@@ -141,6 +152,9 @@ class ApprenticeshipScheduler:
                 entry.is_active = False
             
             session.commit()
+            
+            if old_entries:
+                bump_data_generation(session)
             self.logger.info(f"Marked {len(old_entries)} old apprenticeships as inactive")
             
         except Exception as e:
@@ -148,6 +162,102 @@ class ApprenticeshipScheduler:
         finally:
             session.close()
     
+    def precompute_commute_matrix(self, use_api=False, modes=None):
+        """Precompute commute times from user-relevant PLZs to every PLZ with active listings"""
+        session = get_session()
+        try:
+            started_at = datetime.now()
+            
+            destinations = [
+                postal_code for (postal_code,) in session.query(Apprenticeship.postal_code).filter(
+                    Apprenticeship.is_active == True,
+                    Apprenticeship.postal_code != None,
+                    Apprenticeship.postal_code != ''
+                ).distinct()
+            ]
+            
+            if not destinations:
+                self.logger.info("No active apprenticeships with postal code - skipping commute matrix")
+                return None
+            
+            calculator = DistanceCalculator()
+            
+            # Users search from listing locations or the known city centres
+            origins = set(destinations) | set(calculator.swiss_cities.keys())
+            
+            stats = build_commute_matrix(
+                calculator, list(origins), destinations,
+                modes=modes, use_api=use_api
+            )
+            
+            duration = (datetime.now() - started_at).total_seconds()
+            self.logger.info(
+                f"Commute matrix built: {stats['origins']}x{stats['destinations']} PLZs, "
+                f"{len(stats['modes'])} modes ({stats['source']}) in {duration:.1f}s"
+            )
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Error building commute matrix: {e}")
+            return None
+        finally:
+            session.close()
+    
+    def publish_snapshot(self):
+        """Build the shared read-only data snapshot that serving workers memory-map"""
+        try:
+            started_at = datetime.now()
+            
+            stats = build_snapshot(ScoringEngine(), TextEmbeddingMatcher())
+            
+            duration = (datetime.now() - started_at).total_seconds()
+            self.logger.info(
+                f"Snapshot published: generation {stats['generation']}, {stats['candidates']} listings, "
+                f"{stats['embeddings']} embeddings, {stats['size_bytes'] / 1e6:.1f} MB in {duration:.1f}s"
+            )
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Error building snapshot: {e}")
+            return None
+    
+    def compute_interest_affinities(self):
+        """Embed the active listings and store their interest category affinities"""
+        session = get_session()
+        try:
+            started_at = datetime.now()
+            
+            candidates = load_candidate_rows(session, [Apprenticeship.is_active == True])
+            stats = build_interest_affinities(TextEmbeddingMatcher(), candidates)
+            
+            duration = (datetime.now() - started_at).total_seconds()
+            self.logger.info(
+                f"Interest affinities built: {stats['related']}/{stats['listings']} listings "
+                f"({stats['source']} embeddings) in {duration:.1f}s"
+            )
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Error building interest affinities: {e}")
+            return None
+        finally:
+            session.close()
+    
+    def compute_similar_listings(self):
+        """Recompute the nearest-neighbour lists behind "similar listings" on the detail page"""
+        try:
+            stats = build_neighbours()
+            
+            self.logger.info(
+                f"Similar listings computed: {stats['neighbours']} neighbours for "
+                f"{stats['listings']} listings (generation {stats['generation']}) in {stats['seconds']:.1f}s"
+            )
+            return stats
+            
+        except Exception as e:
+            self.logger.error(f"Error computing similar listings: {e}")
+            return None
+    
     def get_stats(self):
         """Get current database statistics"""
         session = get_session()
@@ -169,8 +279,21 @@ class ApprenticeshipScheduler:
         # Daily scraping at 6 AM
         schedule.every().day.at("06:00").do(self.scrape_yousty, limit=2000)
         
+        # Commute matrix after the daily scrape
+        schedule.every().day.at("07:00").do(self.precompute_commute_matrix)
+        
+        # Interest affinities go into the snapshot's features
+        schedule.every().day.at("07:15").do(self.compute_interest_affinities)
+        
+        # Workers swap to the new snapshot once it is published
+        schedule.every().day.at("07:30").do(self.publish_snapshot)
+        
+        # Nightly neighbour lists; listings scraped since then use the profession fallback
+        schedule.every().day.at("03:00").do(self.compute_similar_listings)
+        
         # Weekly cleanup on Sunday at 2 AM
         schedule.every().sunday.at("02:00").do(self.cleanup_old_entries)
+        schedule.every().sunday.at("02:30").do(self.publish_snapshot)
         
         # Stats every 6 hours
         schedule.every(6).hours.do(self.get_stats)
@@ -191,10 +314,12 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Apprenticeship Scraper Scheduler')
-    parser.add_argument('--job', choices=['scrape', 'cleanup', 'stats', 'run'], 
+    parser.add_argument('--job', choices=['scrape', 'cleanup', 'stats', 'commute-matrix', 'snapshot', 'similar', 'interests', 'run'], 
                        default='run', help='Job to run')
     parser.add_argument('--limit', type=int, default=100, 
                        help='Limit for scraping jobs')
+    parser.add_argument('--use-api', action='store_true',
+                       help='Use Google Maps instead of the fallback model for the commute matrix')
     
     args = parser.parse_args()
     
@@ -206,6 +331,14 @@ def main():
         scheduler.cleanup_old_entries()
     elif args.job == 'stats':
         scheduler.get_stats()
+    elif args.job == 'commute-matrix':
+        scheduler.precompute_commute_matrix(use_api=args.use_api)
+    elif args.job == 'snapshot':
+        scheduler.publish_snapshot()
+    elif args.job == 'similar':
+        scheduler.compute_similar_listings()
+    elif args.job == 'interests':
+        scheduler.compute_interest_affinities()
     elif args.job == 'run':
         scheduler.run_forever()
 
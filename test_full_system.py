@@ -204,7 +204,7 @@ def test_complete_matching():
         print(f"Confidence: {ai_rec.confidence:.1%}")
         
         # AI Summary
-        print(f"\nAI Summary: {result.ai_summary}")
+        print(f"\nAI Summary: {result.resolve_summary(timeout=engine.ai_integration.summary_timeout)}")
         
     else:
         print("No matches found above threshold")
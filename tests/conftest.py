@@ -0,0 +1,80 @@
+"""
+Shared test fixtures: an isolated data directory and a stubbed OpenAI client
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from data.database import create_database
+from data.generator import load_synthetic_corpus
+from matcher.ai_cache import AIResponseCache
+from matcher.ai_integration import AIIntegration
+from matcher.candidates import CandidateRow
+from matcher.scoring_engine import MatchScore
+
+RESPONSE = json.dumps({
+    "match_reason": "Du arbeitest gerne mit Computern.",
+    "growth_potential": "Viele Weiterbildungen.",
+    "considerations": "Viel Bildschirmarbeit.",
+    "next_steps": ["Schnuppern", "Bewerben"]
+}, ensure_ascii=False)
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; answers every call with the same content"""
+
+    def __init__(self, content=RESPONSE, chunk_size=5):
+        self.content = content
+        self.chunk_size = chunk_size
+        self.calls = []
+
+    def create(self, messages, stream=False, timeout=None, **params):
+        self.calls.append(dict(params, messages=messages, stream=stream))
+        if stream:
+            return (
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.content[i:i + self.chunk_size]))])
+                for i in range(0, len(self.content), self.chunk_size)
+            )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.content))])
+
+@pytest.fixture
+def data_env(tmp_path, monkeypatch):
+    """Empty database with snapshots, affinities and templates under tmp_path; no API keys"""
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setenv("INTEREST_AFFINITY_DIR", str(tmp_path / "affinity"))
+    monkeypatch.setenv("EXPLANATION_TEMPLATES_PATH", str(tmp_path / "templates.json"))
+    monkeypatch.setenv("GOOGLE_MAPS_API_KEY", "")
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    monkeypatch.setattr("matcher.matching_engine._shared_engine", None)
+    create_database()
+    return tmp_path
+
+@pytest.fixture
+def load_corpus(data_env):
+    """Loads a synthetic corpus into the test database"""
+    def load(listings=40, seed=3, **kwargs):
+        return load_synthetic_corpus(listings=listings, seed=seed, **kwargs)
+    return load
+
+@pytest.fixture
+def make_ai(tmp_path):
+    """AI integration on a stubbed client; instances of one test share the response cache"""
+    def make(completions=None, response=RESPONSE, **kwargs):
+        ai = AIIntegration(api_key="test", response_cache=AIResponseCache(str(tmp_path / "ai.db")), **kwargs)
+        ai.client = SimpleNamespace(chat=SimpleNamespace(completions=completions or FakeCompletions(response)))
+        return ai
+    return make
+
+@pytest.fixture
+def make_score():
+    def make(total, **sub_scores):
+        scores = dict(interest_score=total, location_score=total, skill_score=total, preference_score=total)
+        scores.update(sub_scores)
+        return MatchScore(total_score=total, explanation="", **scores)
+    return make
+
+@pytest.fixture
+def listing():
+    return CandidateRow(1, "Informatiker/in EFZ", "Informatiker/in EFZ", "Software", "", "Zürich", "8001", "Muster AG", "")
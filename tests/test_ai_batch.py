@@ -0,0 +1,70 @@
+"""
+Tests for concurrent explanation generation
+"""
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from matcher.candidates import CandidateRow
+from matcher.questionnaire import create_sample_profile
+
+def response(title):
+    return json.dumps({"match_reason": f"Passt gut zu {title}.", "next_steps": ["Bewerben"]}, ensure_ascii=False)
+
+
+class SlowCompletions:
+    """Answers after a per-title delay; 'Fehler' raises"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def create(self, messages, timeout=None, **params):
+        title = next(title for title in self.delays if title in messages[1]["content"])
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delays[title])
+            if title == "Fehler":
+                raise RuntimeError("API error")
+            content = response(title)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        finally:
+            with self._lock:
+                self.running -= 1
+
+def make_items(titles, score):
+    return [
+        (CandidateRow(i, title, title, "", "", "Zürich", "8001", "Muster AG", ""), score)
+        for i, title in enumerate(titles)
+    ]
+
+def test_explanations_run_concurrently_with_fallbacks(make_ai, make_score):
+    delays = {"Alpha": 0.2, "Beta": 0.2, "Gamma": 0.2, "Fehler": 0.0, "Langsam": 1.0}
+    ai = make_ai(SlowCompletions(delays))
+    profile = create_sample_profile()
+    fallback = ai._generate_fallback_explanation_from_score(0.75)
+
+    started = time.perf_counter()
+    recommendations = ai.generate_match_explanations(profile, make_items(list(delays), make_score(0.75)),
+                                                     max_concurrency=5, timeout=0.5)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    assert [rec.match_reason for rec in recommendations[:3]] == [f"Passt gut zu {t}." for t in ["Alpha", "Beta", "Gamma"]]
+    assert recommendations[3] == fallback
+    assert recommendations[4] == fallback
+
+def test_concurrency_is_capped(make_ai, make_score):
+    delays = {title: 0.05 for title in ["Alpha", "Beta", "Gamma", "Delta", "Epsilon"]}
+    ai = make_ai(SlowCompletions(delays))
+
+    recommendations = ai.generate_match_explanations(create_sample_profile(), make_items(list(delays), make_score(0.75)),
+                                                     max_concurrency=2)
+
+    assert len(recommendations) == 5
+    assert ai.client.chat.completions.max_running == 2
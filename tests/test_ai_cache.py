@@ -0,0 +1,57 @@
+"""
+Tests for the persistent AI response cache
+"""
+import time
+
+from matcher.ai_cache import AIResponseCache
+from matcher.candidates import CandidateRow
+from matcher.questionnaire import create_sample_profile
+
+def test_explanation_is_served_from_cache(make_ai, make_score, listing):
+    profile = create_sample_profile()
+
+    first = make_ai().generate_match_explanation(profile, listing, make_score(0.8))
+
+    # New instance: the cache persists across processes
+    ai = make_ai()
+    second = ai.generate_match_explanation(profile, listing, make_score(0.8))
+
+    assert ai.client.chat.completions.calls == []
+    assert second == first
+    assert second.next_steps == ["Schnuppern", "Bewerben"]
+
+    ai.generate_match_explanation(profile, listing, make_score(0.5))
+    assert len(ai.client.chat.completions.calls) == 1
+
+def test_deterministic_mode_uses_separate_entries(make_ai, make_score):
+    apprenticeship = CandidateRow(1, "Koch/Köchin EFZ", None, "", "", "Bern", "3001", "Hotel", "")
+    profile = create_sample_profile()
+    make_ai().generate_match_explanation(profile, apprenticeship, make_score(0.7))
+
+    ai = make_ai(deterministic=True)
+    ai.generate_match_explanation(profile, apprenticeship, make_score(0.7))
+
+    assert ai.client.chat.completions.calls[0]["temperature"] == 0
+
+def test_cache_expires_and_evicts(tmp_path):
+    cache = AIResponseCache(str(tmp_path / "ai.db"), max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.stats()["entries"] == 2
+
+    cache.ttl_seconds = 0.01
+    time.sleep(0.02)
+    assert cache.get("c") is None
+
+def test_unparseable_answer_is_not_cached(make_ai, make_score, listing):
+    ai = make_ai(response="Dazu kann ich leider nichts sagen.")
+
+    recommendation = ai.generate_match_explanation(create_sample_profile(), listing, make_score(0.8))
+
+    assert recommendation == ai._generate_fallback_explanation_from_score(0.8)
+    assert ai.response_cache.stats()["entries"] == 0
@@ -0,0 +1,49 @@
+"""
+Corpus test of the structured AI output parser with recorded responses
+"""
+import json
+import os
+
+import pytest
+
+from matcher.ai_integration import AIIntegration, RecommendationStream
+
+with open(os.path.join(os.path.dirname(__file__), "fixtures", "ai_responses.json"), encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+def parsed_method(response):
+    return AIIntegration(api_key="")._parse_ai_response(response, 0.7)[1]
+
+@pytest.mark.parametrize("entry", CORPUS, ids=[entry["name"] for entry in CORPUS])
+def test_recorded_response(entry):
+    ai = AIIntegration(api_key="")
+    recommendation, _ = ai._parse_ai_response(entry["response"], 0.7)
+
+    assert parsed_method(entry["response"]) == entry["method"]
+    if entry["expected"] is None:
+        assert recommendation == ai._generate_fallback_explanation_from_score(0.7)
+    else:
+        expected = dict(entry["expected"])
+        expected["next_steps"] = expected["next_steps"] or ai.fallback_templates["next_steps"]
+        assert {field: getattr(recommendation, field) for field in expected} == expected
+
+def test_corpus_wastes_only_unusable_responses():
+    failed = [entry["name"] for entry in CORPUS if parsed_method(entry["response"]) == "failed"]
+    assert failed == ["sectioned_text", "refusal", "empty_object"]
+
+@pytest.mark.parametrize("entry", [entry for entry in CORPUS if entry["method"] in ("json", "repaired")],
+                         ids=lambda entry: entry["name"])
+def test_streamed_partials_grow_into_final(entry):
+    ai = AIIntegration(api_key="")
+    response = entry["response"]
+    stream = RecommendationStream()
+
+    previous = ""
+    for i in range(0, len(response), 7):
+        stream.feed(response[i:i + 7])
+        match_reason = stream.partial()["match_reason"]
+        assert match_reason.startswith(previous)
+        previous = match_reason
+
+    assert ai._parse_ai_response(stream.text, 0.7) == ai._parse_ai_response(response, 0.7)
+    assert previous == ai._parse_ai_response(response, 0.7)[0].match_reason
@@ -0,0 +1,66 @@
+"""
+Tests for streamed AI recommendations
+"""
+import json
+import time
+
+from matcher.ai_integration import AIIntegration, RecommendationStream
+from matcher.outbound import ProviderGuard
+from matcher.questionnaire import create_sample_profile
+
+RESPONSE = json.dumps({
+    "match_reason": "Du arbeitest gerne mit Computern und löst gerne Probleme.",
+    "growth_potential": "Viele Weiterbildungen.",
+    "considerations": "Viel Bildschirmarbeit.",
+    "next_steps": ["Schnuppern", "Bewerben"]
+}, ensure_ascii=False, indent=2)
+
+def test_partials_end_in_the_full_parse_for_any_chunking():
+    ai = AIIntegration(api_key="")
+    expected, method = ai._parse_ai_response(RESPONSE, 0.8)
+    assert method == "json"
+
+    for size in [1, 3, 17, len(RESPONSE)]:
+        stream = RecommendationStream()
+        for i in range(0, len(RESPONSE), size):
+            stream.feed(RESPONSE[i:i + size])
+        assert ai._recommendation_from_sections(stream.partial(), 0.8) == expected
+
+def test_stream_yields_growing_partials_then_final(make_ai, make_score, listing):
+    ai = make_ai(response=RESPONSE)
+    score = make_score(0.8)
+    profile = create_sample_profile()
+
+    items = list(ai.stream_match_explanation(profile, listing, score))
+
+    first_content = next(item for item in items if item.match_reason)
+    assert first_content.growth_potential == ""
+    assert items[-1] == ai._parse_ai_response(RESPONSE, 0.8)[0]
+    assert items[-1].next_steps == ["Schnuppern", "Bewerben"]
+
+    # Completed stream is cached; reopening yields the final recommendation at once
+    assert list(ai.stream_match_explanation(profile, listing, score)) == [items[-1]]
+    assert [call["stream"] for call in ai.client.chat.completions.calls] == [True]
+
+def test_slow_reader_neither_holds_the_slot_nor_counts_as_slow_call(make_ai, make_score, listing):
+    guard = ProviderGuard("test", rate=100.0, burst=100, concurrency=1, max_queue_seconds=0.05,
+                          failure_threshold=1, reset_seconds=30.0, slow_call_seconds=0.05)
+    ai = make_ai(response=RESPONSE, outbound=guard)
+
+    stream = ai.stream_match_explanation(create_sample_profile(), listing, make_score(0.8))
+    next(stream)
+
+    # The provider stream is exhausted while the reader still holds the first partial
+    for _ in range(100):
+        if guard.stats()["successes"]:
+            break
+        time.sleep(0.01)
+    stats = guard.stats()
+    assert stats["successes"] == 1 and stats["in_flight"] == 0
+    with guard.slot(1.0):
+        pass
+
+    time.sleep(0.1)
+    items = list(stream)
+    assert items[-1].next_steps == ["Schnuppern", "Bewerben"]
+    assert guard.stats()["slow_calls"] == 0 and guard.stats()["state"] == "closed"
@@ -0,0 +1,105 @@
+"""
+Tests for the HTTP API
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from starlette.requests import Request
+
+from api.main import app, json_response
+from api.schemas import MatchRequest
+from matcher.matching_engine import get_shared_engine
+from matcher.questionnaire import InterestCategory, SkillLevel
+
+PROFILE = {"postal_code": "8001", "interests": {"technical": 5, "creative": 2}, "max_commute_minutes": 90}
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_etag_is_stable_and_honours_if_none_match():
+    first = json_response(make_request(), {"b": 1, "a": "Zürich"})
+    second = json_response(make_request(), {"a": "Zürich", "b": 1})
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.status_code == 200
+
+    cached = json_response(make_request(first.headers["etag"]), {"a": "Zürich", "b": 1})
+    assert cached.status_code == 304
+    assert cached.body == b""
+
+    changed = json_response(make_request(first.headers["etag"]), {"a": "Bern", "b": 1})
+    assert changed.status_code == 200
+
+def test_match_request_converts_to_user_profile():
+    match_request = MatchRequest.model_validate({
+        "profile": {"postal_code": "8001", "interests": {"technical": 5},
+                    "technical_skills": {"computer_skills": 4}},
+        "page": 2
+    })
+    profile = match_request.profile.to_user_profile()
+
+    assert match_request.page_size == 20
+    assert profile.interests == {InterestCategory.TECHNICAL: 5}
+    assert profile.technical_skills == {"computer_skills": SkillLevel.EXPERT}
+
+class APIClient:
+    """Requests against the ASGI app in-process"""
+
+    def request(self, method, url, **kwargs):
+        async def send():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+        return asyncio.run(send())
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+@pytest.fixture
+def client(load_corpus):
+    load_corpus(listings=80, seed=6)
+    return APIClient()
+
+def test_profile_values_are_validated(client):
+    for profile in [{"postal_code": "abcd"}, {"postal_code": "80011"}, {"preferred_transport": "rocket"}]:
+        assert client.post("/match", json={"profile": profile}).status_code == 422
+
+def test_match_pages_and_etag_round_trip(client):
+    request = {"profile": PROFILE, "min_score": 0.0, "page_size": 5}
+    first = client.post("/match", json=request)
+    second = client.post("/match", json=dict(request, page=2))
+
+    assert first.status_code == second.status_code == 200
+    page_one, page_two = first.json(), second.json()
+    assert page_one["total_matches"] == page_two["total_matches"] > 10
+    assert page_one["pages"] == -(-page_one["total_matches"] // 5)
+    assert [r["rank"] for r in page_one["results"] + page_two["results"]] == list(range(1, 11))
+    assert not {r["apprenticeship"]["id"] for r in page_one["results"]} & {r["apprenticeship"]["id"] for r in page_two["results"]}
+
+    unchanged = client.post("/match", json=request, headers={"If-None-Match": first.headers["etag"]})
+    assert unchanged.status_code == 304 and unchanged.content == b""
+
+def test_unknown_listing_is_404(client):
+    assert client.get("/apprenticeships/999999").status_code == 404
+    assert client.post("/apprenticeships/999999/explanation/stream", json=PROFILE).status_code == 404
+
+def test_explanation_stream_sends_score_partials_then_final(client, make_ai):
+    get_shared_engine().ai_integration = make_ai()
+
+    response = client.post("/apprenticeships/1/explanation/stream", json=PROFILE)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    events = [
+        (block.split("\n")[0].removeprefix("event: "), json.loads(block.split("\n")[1].removeprefix("data: ")))
+        for block in response.text.strip().split("\n\n")
+    ]
+    names = [name for name, _ in events]
+    assert names[0] == "score" and names[-1] == "final"
+    assert set(names[1:-1]) == {"partial"} and len(names) > 3
+    assert events[-1][1]["next_steps"] == ["Schnuppern", "Bewerben"]
@@ -0,0 +1,48 @@
+"""
+Tests for scoring many profiles at once
+"""
+import copy
+
+import numpy as np
+
+from matcher.candidates import CandidateRow
+from matcher.questionnaire import InterestCategory, create_sample_profile
+from matcher.scoring_engine import ScoringEngine
+
+def make_candidates():
+    return [
+        CandidateRow(1, "Informatiker/in EFZ", "Informatiker/in EFZ", "Software im Team entwickeln", "Mathematik",
+                     "Zürich", "8001", "Muster AG", ""),
+        CandidateRow(2, "Gärtner/in EFZ", None, "Garten draussen pflegen, selbständig", "",
+                     "Winterthur", "8400", "Grün GmbH", ""),
+        CandidateRow(3, "Kaufmann/-frau EFZ", "Kaufmann/-frau EFZ", "Verwaltung im Büro, Kundenberatung", "",
+                     "Bern", "", "Bank Schweiz AG", ""),
+        CandidateRow(4, "Koch/Köchin EFZ", "Koch/Köchin EFZ", "Küche im Restaurant", "Handwerk",
+                     "Basel", "4051", "Hotel Rhein", "")
+    ]
+
+def make_profiles():
+    profile = create_sample_profile()
+
+    other = copy.deepcopy(profile)
+    other.interests[InterestCategory.NATURE] = 5
+    other.avoid_sectors = ['gastronomy']
+    other.team_vs_individual = 1
+    other.work_environment = "any"
+    other.company_size_preference = "large"
+    other.technical_skills = {'computer_skills': 4, 'manual_skills': 1}
+    other.max_commute_minutes = 20
+
+    return [profile, other]
+
+def test_batch_scores_match_single_scores(tmp_path):
+    engine = ScoringEngine(interest_affinity_dir=str(tmp_path / "affinity"))
+    candidates = make_candidates()
+    profiles = make_profiles()
+    commute = np.array([[10.0, 40.0, np.nan, 90.0], [5.0, 25.0, np.nan, 31.0]])
+
+    batch = engine.score_profiles(profiles, engine.extract_features(candidates), commute)
+
+    for k, profile in enumerate(profiles):
+        for i, candidate in enumerate(candidates):
+            assert tuple(batch[k, i]) == engine._calculate_sub_scores(profile, candidate, commute[k, i])
@@ -0,0 +1,26 @@
+"""
+Tests for the benchmark harness
+"""
+import json
+
+from matcher.benchmark import STAGES, benchmark_scale, compare_reports, latency_summary
+
+def test_latency_summary_in_milliseconds():
+    summary = latency_summary([0.001 * i for i in range(1, 101)])
+
+    assert summary == {"p50_ms": 50.5, "p95_ms": 95.05, "p99_ms": 99.01, "mean_ms": 50.5}
+    assert latency_summary([]) == {}
+
+def test_scale_report_covers_every_stage_and_compares(data_env, tmp_path):
+    result = benchmark_scale(60, runs=2, benchmark_dir=str(tmp_path / "benchmark"))
+
+    assert result["listings"] == 60 and result["runs"] == 2
+    assert set(result["stages"]) == set(STAGES)
+    assert all(set(summary) == {"p50_ms", "p95_ms", "p99_ms", "mean_ms"} for summary in result["stages"].values())
+    assert 0 < result["avg_candidates"] <= 60
+
+    report = json.loads(json.dumps({"scales": {"60": result}}))
+    ratios = compare_reports(report, report)["60"]
+    assert ratios["total"] == 1.0
+    assert all(ratio == 1.0 for ratio in ratios.values())
+    assert compare_reports({"scales": {}}, report) == {}
@@ -0,0 +1,30 @@
+"""
+Tests for the lightweight candidate rows
+"""
+from data.database import Apprenticeship, get_session
+from matcher.candidates import CANDIDATE_COLUMNS, CandidateRow, hydrate_apprenticeships, load_candidate_rows
+
+def test_rows_carry_the_scoring_columns_in_id_order(load_corpus):
+    load_corpus(seed=2)
+
+    session = get_session()
+    try:
+        # Deactivated listings are not candidates
+        session.query(Apprenticeship).filter(Apprenticeship.id % 5 == 0).update({"is_active": False})
+        session.commit()
+
+        rows = load_candidate_rows(session, [Apprenticeship.is_active == True])
+        active_ids = [app.id for app in session.query(Apprenticeship.id).filter_by(is_active=True)]
+        orm = hydrate_apprenticeships(session, [row.id for row in rows])
+
+        assert [column.key for column in CANDIDATE_COLUMNS] == list(CandidateRow.__slots__)
+        assert [row.id for row in rows] == sorted(active_ids) == sorted(orm)
+        assert not any(row.id % 5 == 0 for row in rows)
+        for row in rows:
+            assert all(getattr(row, name) == getattr(orm[row.id], name) for name in CandidateRow.__slots__)
+            assert not hasattr(row, "__dict__")
+
+        assert [row.id for row in load_candidate_rows(session, [Apprenticeship.is_active == True], limit=3)] == \
+            [row.id for row in rows[:3]]
+    finally:
+        session.close()
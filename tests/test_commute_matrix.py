@@ -0,0 +1,75 @@
+"""
+Tests for the precomputed commute matrix
+"""
+import numpy as np
+
+from matcher.commute_matrix import CURRENT_FILE, UNREACHABLE, CommuteMatrix, build_commute_matrix
+from matcher.distance_calculator import DistanceCalculator, DistanceResult
+
+class FixedCalculator:
+    """Stands in for DistanceCalculator: the same travel time for every pair"""
+    api_key = None
+
+    def __init__(self, minutes):
+        self.minutes = minutes
+
+    def estimate_duration_matrix(self, origins, destinations, transport_mode):
+        return np.full((len(origins), len(destinations)), self.minutes, dtype=np.int32)
+
+class RoutingCalculator:
+    """Stands in for the Google Maps path: fixed minutes per destination, errors for the rest"""
+    api_key = "test"
+
+    def __init__(self, minutes):
+        self.minutes = minutes
+
+    def batch_calculate_distances(self, origin, destinations, transport_mode, delay=0.0):
+        return {
+            destination: DistanceResult(0.0, self.minutes[destination], transport_mode, True)
+            if destination in self.minutes else
+            DistanceResult(0.0, 0, transport_mode, False, "no route")
+            for destination in destinations
+        }
+
+def test_lookup_covers_pairs_modes_and_unreachable_routes(tmp_path):
+    matrix_dir = str(tmp_path / "matrix")
+    build_commute_matrix(RoutingCalculator({"3001": 35}), ["8001"], ["3001", "9999"], modes=["public"],
+                         use_api=True, request_delay=0, matrix_dir=matrix_dir)
+
+    matrix = CommuteMatrix(matrix_dir)
+    assert matrix.lookup("8001", "3001", "public") == 35
+    assert matrix.lookup("8001", "3001", "transit") == 35
+    assert matrix.lookup("8001", "9999", "public") == UNREACHABLE
+    assert matrix.lookup("8001", "3001", "car") is None
+    assert matrix.lookup("4001", "3001", "public") is None
+
+    calculator = DistanceCalculator(api_key="", commute_matrix_dir=matrix_dir)
+    assert calculator.get_commute_minutes("8001", "3001", "public") == 35
+    assert calculator.get_commute_minutes("8001", "9999", "public") is None
+    isochrone = calculator.get_isochrone("8001", ["3001", "9999"], "public")
+    assert isochrone.postal_codes == ["3001"] and isochrone.covered == {"3001", "9999"}
+    # Pairs outside the matrix fall back to the estimate
+    assert calculator.get_commute_minutes("8001", "3001", "car") is not None
+
+def test_running_calculator_picks_up_a_rebuilt_matrix(tmp_path):
+    matrix_dir = str(tmp_path / "matrix")
+    build_commute_matrix(FixedCalculator(20), ["8001"], ["3001", "8400"], modes=["public"], matrix_dir=matrix_dir)
+
+    calculator = DistanceCalculator(api_key="", commute_matrix_dir=matrix_dir)
+    assert calculator.get_commute_minutes("8001", "3001", "public") == 20
+    assert calculator.get_isochrone("8001", ["3001", "8400"], "public").within(20) == ["3001", "8400"]
+
+    build_commute_matrix(FixedCalculator(45), ["8001"], ["3001", "8400"], modes=["public"], matrix_dir=matrix_dir)
+    build_commute_matrix(FixedCalculator(50), ["8001"], ["3001", "8400"], modes=["public"], matrix_dir=matrix_dir)
+
+    # The pointer is not checked on every lookup
+    assert calculator.get_commute_minutes("8001", "3001", "transit") == 20
+
+    calculator.matrix_poll_seconds = 0
+    assert calculator.get_commute_minutes("8001", "3001", "transit") == 50
+    assert calculator.get_isochrone("8001", ["3001", "8400"], "public").within(20) == []
+
+    # The pointer names the newest build; one older build is kept for readers still mapping it
+    entries = sorted(path.name for path in (tmp_path / "matrix").iterdir())
+    assert len(entries) == 3 and entries[0] == CURRENT_FILE
+    assert (tmp_path / "matrix" / CURRENT_FILE).read_text() == entries[-1]
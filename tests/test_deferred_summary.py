@@ -0,0 +1,57 @@
+"""
+Tests for the deferred AI summary
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from matcher.ai_integration import AIIntegration
+from matcher.matching_engine import MatchingResult
+from matcher.questionnaire import create_sample_profile
+from matcher.scoring_engine import RankedApprenticeship
+
+class GatedCompletions:
+    """Answers once the test releases the gate"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def create(self, messages, timeout=None, **params):
+        self.gate.wait(5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="KI-Zusammenfassung"))])
+
+@pytest.fixture
+def ranked(make_score, listing):
+    return [RankedApprenticeship(apprenticeship=listing, match_score=make_score(0.8), rank=1)]
+
+def test_summary_resolves_in_background(make_ai, ranked):
+    completions = GatedCompletions()
+    ai = make_ai(completions)
+
+    started = time.perf_counter()
+    summary, future = ai.summarize_deferred(ranked)
+    assert time.perf_counter() - started < 1.0
+    assert summary == ai._generate_fallback_summary(ranked)
+
+    result = MatchingResult(ranked_apprenticeships=ranked, user_profile=create_sample_profile(), total_found=1,
+                            processing_time=0.0, ai_summary=summary, filters_applied={}, ai_summary_future=future)
+    assert result.summary_pending()
+    assert result.resolve_summary() == summary
+
+    completions.gate.set()
+    assert result.resolve_summary(timeout=5) == "KI-Zusammenfassung"
+    assert not result.summary_pending()
+
+    # Cached summaries are final right away
+    assert ai.summarize_deferred(ranked) == ("KI-Zusammenfassung", None)
+
+def test_summary_without_ai_is_final(ranked):
+    ai = AIIntegration(api_key="")
+    ai.api_key = None
+    ai.client = None
+
+    summary, future = ai.summarize_deferred(ranked)
+    assert future is None
+    assert "Informatiker/in EFZ" in summary
@@ -0,0 +1,55 @@
+"""
+Tests for precomputed archetype explanations
+"""
+import json
+import copy
+
+from matcher.candidates import CandidateRow
+from matcher.explanation_templates import ExplanationTemplates, build_explanation_templates, profile_archetype
+from matcher.questionnaire import InterestCategory, create_sample_profile
+
+RESPONSE = json.dumps({
+    "match_reason": "Bei {firma} in {ort} kannst du deine Stärken einsetzen.",
+    "growth_potential": "Viele Weiterbildungen.",
+    "next_steps": ["Schnuppern bei {firma}"]
+}, ensure_ascii=False)
+
+
+def test_archetype_uses_top_interests_and_preferences():
+    profile = create_sample_profile()
+    profile.interests = {InterestCategory.NATURE: 5, InterestCategory.SOCIAL: 4, InterestCategory.TECHNICAL: 3}
+    profile.company_size_preference = "small"
+    profile.work_environment = "field"
+
+    assert profile_archetype(profile) == "nature+social|small|field"
+
+    other = copy.deepcopy(profile)
+    other.age = 19
+    other.postal_code = "3001"
+    assert profile_archetype(other) == profile_archetype(profile)
+
+def test_template_is_served_without_llm_call(tmp_path, make_ai, make_score):
+    def templated_ai():
+        ai = make_ai(response=RESPONSE)
+        ai.templates = ExplanationTemplates(str(tmp_path / "templates.json.gz"))
+        return ai
+
+    profile = create_sample_profile()
+    stats = build_explanation_templates(templated_ai(), [profile], ["Informatiker/in EFZ"],
+                                        path=str(tmp_path / "templates.json.gz"))
+    assert stats["templates"] == 1
+
+    ai = templated_ai()
+    listing = CandidateRow(7, "Informatiker/in EFZ", "Informatiker/in EFZ", "", "", "Bern", "3001", "Muster AG", "")
+    recommendation = ai.generate_match_explanation(profile, listing, make_score(0.8))
+
+    assert ai.client.chat.completions.calls == []
+    assert recommendation.match_reason == "Bei Muster AG in Bern kannst du deine Stärken einsetzen."
+    assert recommendation.next_steps == ["Schnuppern bei Muster AG"]
+    assert recommendation.confidence == 0.8
+
+    # Weak matches and professions without template go to the LLM
+    ai.generate_match_explanation(profile, listing, make_score(0.3))
+    other = CandidateRow(8, "Koch/Köchin EFZ", "Koch/Köchin EFZ", "", "", "Bern", "3001", "Hotel", "")
+    ai.generate_match_explanation(profile, other, make_score(0.8))
+    assert len(ai.client.chat.completions.calls) == 2
@@ -0,0 +1,42 @@
+"""
+Tests for the synthetic corpus generator
+"""
+from datetime import datetime
+
+from data.database import Apprenticeship, create_database, get_session
+from data.generator import generate_corpus, load_synthetic_corpus
+
+REFERENCE_DATE = datetime(2024, 3, 1)
+
+def test_same_seed_gives_the_same_corpus():
+    first = generate_corpus(200, seed=7, reference_date=REFERENCE_DATE)
+    second = generate_corpus(200, seed=7, reference_date=REFERENCE_DATE)
+    other = generate_corpus(200, seed=8, reference_date=REFERENCE_DATE)
+
+    assert first == second
+    assert first[1] != other[1]
+    companies, apprenticeships = first
+    assert len(companies) == 40 and len(apprenticeships) == 200
+    assert len({row["source_url"] for row in apprenticeships}) == 200
+
+def test_loaded_corpus_is_reproducible(tmp_path, monkeypatch):
+    def load(name):
+        db_path = str(tmp_path / name)
+        monkeypatch.setenv("DATABASE_PATH", db_path)
+        create_database()
+        stats = load_synthetic_corpus(listings=50, seed=3, reference_date=REFERENCE_DATE)
+
+        session = get_session()
+        try:
+            rows = session.query(Apprenticeship.id, Apprenticeship.title, Apprenticeship.postal_code,
+                                 Apprenticeship.company_name, Apprenticeship.is_active,
+                                 Apprenticeship.application_deadline).order_by(Apprenticeship.id).all()
+        finally:
+            session.close()
+        return stats, rows
+
+    first_stats, first = load("first.db")
+    second_stats, second = load("second.db")
+
+    assert first == second and len(first) == 50
+    assert first_stats["active"] == second_stats["active"] == sum(1 for row in first if row.is_active)
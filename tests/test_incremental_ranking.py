@@ -0,0 +1,54 @@
+"""
+Tests for re-ranking after single profile changes
+"""
+import copy
+
+import numpy as np
+
+from matcher.candidates import CandidateRow
+from matcher.questionnaire import InterestCategory, changed_profile_fields, create_sample_profile
+from matcher.scoring_engine import ScoringEngine
+
+def make_candidates():
+    return [
+        CandidateRow(1, "Informatiker/in EFZ", "Informatiker/in", "Software im Team entwickeln", "",
+                     "Zürich", "8001", "Muster AG", ""),
+        CandidateRow(2, "Gärtner/in EFZ", "Gärtner/in", "Garten draussen pflegen", "",
+                     "Winterthur", "8400", "Grün GmbH", ""),
+        CandidateRow(3, "Kaufmann/-frau EFZ", "Kaufmann/-frau", "Verwaltung im Büro, Kundenberatung", "",
+                     "Bern", "3001", "Bank Schweiz AG", "")
+    ]
+
+def test_changed_fields_map_to_sub_scores():
+    profile = create_sample_profile()
+    changed = copy.deepcopy(profile)
+    changed.interests[InterestCategory.NATURE] = 5
+    changed.team_vs_individual = 1
+
+    fields = changed_profile_fields(profile, changed)
+
+    assert fields == {'interests', 'team_vs_individual'}
+    assert ScoringEngine.affected_sub_scores(fields) == {'interest_score', 'preference_score'}
+    assert ScoringEngine.affected_sub_scores({'postal_code'}) is None
+    assert ScoringEngine.affected_sub_scores({'age'}) == set()
+
+def test_rescore_matches_full_scoring(tmp_path):
+    engine = ScoringEngine(interest_affinity_dir=str(tmp_path / "affinity"))
+    profile = create_sample_profile()
+    candidates = make_candidates()
+    commute = np.array([10.0, 40.0, np.nan])
+
+    table = engine.score_candidates(profile, candidates, commute)
+    previous_scores = table.sub_score_matrix()
+
+    changed = copy.deepcopy(profile)
+    changed.interests[InterestCategory.NATURE] = 5
+    changed.max_commute_minutes = 20
+
+    rescored = engine.rescore_candidates(changed, table, {'interest_score', 'location_score'})
+    full = engine.score_candidates(changed, candidates, commute)
+
+    np.testing.assert_allclose(rescored.sub_score_matrix(), full.sub_score_matrix())
+    np.testing.assert_allclose(rescored.total_score, full.total_score)
+    # The previous table may be shared through the result cache
+    np.testing.assert_allclose(table.sub_score_matrix(), previous_scores)
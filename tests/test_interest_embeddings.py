@@ -0,0 +1,135 @@
+"""
+Tests for the semantic interest affinities
+"""
+import shutil
+
+import numpy as np
+
+from data.database import Apprenticeship, get_session
+from matcher.candidates import load_candidate_rows
+from matcher.interest_embeddings import CURRENT_FILE, InterestAffinities, build_interest_affinities, interest_affinity
+from matcher.matching_engine import ApprenticeshipMatchingEngine
+from matcher.questionnaire import InterestCategory, create_sample_profile
+from matcher.scoring_engine import ScoringEngine
+from matcher.snapshot import build_snapshot
+from matcher.text_embeddings import TextEmbeddingMatcher
+from matcher.tracing import flatten_spans
+
+def test_affinity_rows_are_distributions():
+    listings = np.array([[1.0, 0.0, 0.0], [1.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    categories = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]])
+
+    affinity = interest_affinity(listings, categories)
+
+    np.testing.assert_allclose(affinity[:2], [[1.0, 0.0], [0.5, 0.5]])
+    assert np.isnan(affinity[2]).all()
+
+def test_semantic_score_blends_into_scalar_and_batch_scoring(load_corpus, tmp_path):
+    load_corpus(listings=60, seed=4)
+
+    session = get_session()
+    try:
+        # Profession missing from the questionnaire's profession mapping
+        session.add(Apprenticeship(
+            company_id=1, title="ICT-Fachmann/-frau EFZ", profession="ICT-Fachmann/-frau EFZ",
+            description="Programmieren von Software, Computer und digitale Systeme", location="Bern",
+            source_url="https://example.ch/ict", source_platform="test", company_name="Test AG"
+        ))
+        session.commit()
+        rows = load_candidate_rows(session, [Apprenticeship.is_active == True])
+    finally:
+        session.close()
+
+    # The first listing was added after the nightly run
+    stats = build_interest_affinities(TextEmbeddingMatcher(cache_enabled=False), rows[1:],
+                                      affinity_dir=str(tmp_path / "affinity"))
+    assert stats["source"] == "keywords" and stats["listings"] == len(rows) - 1
+
+    engine = ScoringEngine(interest_affinity_dir=str(tmp_path / "affinity"))
+    keyword_only = ScoringEngine(interest_affinity_dir=str(tmp_path / "missing"))
+
+    profile = create_sample_profile()
+    profile.interests = {category: 1 for category in InterestCategory}
+    profile.interests[InterestCategory.TECHNICAL] = 5
+    profile.avoid_sectors = []
+
+    ict = rows[-1]
+    assert keyword_only._calculate_interest_score(profile, ict) == 0.5
+    assert engine._calculate_interest_score(profile, ict) > 0.8
+    assert engine._calculate_interest_score(profile, rows[0]) == keyword_only._calculate_interest_score(profile, rows[0])
+
+    # Batch scoring gives exactly the per-listing values
+    features = engine.extract_features(rows)
+    batch = engine.score_profiles([profile], features, np.full((1, len(rows)), np.nan))[0]
+    scalar = np.clip([engine._calculate_sub_scores(profile, row, float("nan")) for row in rows], 0, 1)
+    np.testing.assert_array_equal(batch, scalar)
+
+def test_rebuild_invalidates_cached_results_and_snapshot(load_corpus, tmp_path):
+    load_corpus(listings=30)
+
+    engine = ApprenticeshipMatchingEngine()
+    engine.snapshots.poll_seconds = 0
+    engine.generation_poll_seconds = 0
+    profile = create_sample_profile()
+    profile.avoid_sectors = []
+
+    def match():
+        result = engine.find_matches(profile, min_score=0.0, trace=True)
+        spans = flatten_spans(result.trace["spans"]) if result.trace else []
+        source = next((span["source"] for span in spans if span["name"] == "features"), "cache")
+        return source, result.data_generation, {ranked.apprenticeship.id: ranked.match_score.interest_score
+                                                for ranked in result.ranked_apprenticeships}
+
+    build_snapshot(engine.scoring_engine, snapshot_dir=str(tmp_path / "snapshots"))
+    before_source, before_generation, before = match()
+    assert before_source == "snapshot" and match()[0] == "cache"
+
+    session = get_session()
+    try:
+        rows = load_candidate_rows(session, [Apprenticeship.is_active == True])
+    finally:
+        session.close()
+    stats = build_interest_affinities(TextEmbeddingMatcher(cache_enabled=False), rows)
+    assert stats["generation"] == before_generation + 1
+
+    # Neither the cached result nor the snapshot carries the old affinities on
+    after_source, after_generation, after = match()
+    assert after_source == "extracted" and after_generation == stats["generation"]
+    assert after != before
+
+def test_rebuild_is_published_behind_the_pointer(load_corpus, tmp_path):
+    load_corpus(seed=4)
+
+    session = get_session()
+    try:
+        rows = load_candidate_rows(session, [Apprenticeship.is_active == True])
+    finally:
+        session.close()
+    assert len(rows) >= 15
+
+    affinity_dir = tmp_path / "affinity"
+    text_matcher = TextEmbeddingMatcher(cache_enabled=False)
+    build_interest_affinities(text_matcher, rows[:5], affinity_dir=str(affinity_dir))
+    affinities = InterestAffinities(str(affinity_dir))
+    assert affinities.ids.tolist() == [row.id for row in rows[:5]]
+
+    for count in (10, 15):
+        build_interest_affinities(text_matcher, rows[:count], affinity_dir=str(affinity_dir))
+    affinities.refresh()
+    assert len(affinities.ids) == 15
+
+    # The pointer names the newest build; one older build is kept for readers still mapping it
+    builds = sorted(path.name for path in affinity_dir.iterdir() if path.name != CURRENT_FILE)
+    assert len(builds) == 2 and (affinity_dir / CURRENT_FILE).read_text() == builds[-1]
+
+    # A broken build keeps the loaded affinities and is retried until it loads
+    (affinity_dir / "gen-broken").mkdir()
+    shutil.copy(affinity_dir / builds[-1] / "index.json", affinity_dir / "gen-broken")
+    (affinity_dir / CURRENT_FILE).write_text("gen-broken")
+    affinities.refresh()
+    assert len(affinities.ids) == 15
+
+    shutil.copy(affinity_dir / builds[0] / "ids.npy", affinity_dir / "gen-broken")
+    shutil.copy(affinity_dir / builds[0] / "affinity.npy", affinity_dir / "gen-broken")
+    affinities.refresh()
+    assert len(affinities.ids) == 10
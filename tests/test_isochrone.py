@@ -0,0 +1,48 @@
+"""
+Tests for the isochrone-based commute filter
+"""
+import copy
+
+from matcher.distance_calculator import DistanceCalculator
+from matcher.matching_engine import ApprenticeshipMatchingEngine
+from matcher.questionnaire import create_sample_profile
+
+def test_isochrone_is_sorted_and_cut_by_minutes(tmp_path):
+    calculator = DistanceCalculator(api_key="", commute_matrix_dir=str(tmp_path / "no_matrix"))
+
+    isochrone = calculator.get_isochrone("8001", ["3001", "8002", "1201"], "public")
+
+    assert isochrone.postal_codes == ["8002", "3001", "1201"]
+    assert isochrone.minutes == sorted(isochrone.minutes)
+    assert isochrone.within(isochrone.minutes[1]) == ["8002", "3001"]
+
+def test_profile_without_postal_code_is_not_commute_filtered(load_corpus):
+    load_corpus(listings=30)
+
+    engine = ApprenticeshipMatchingEngine()
+    profile = create_sample_profile()
+    profile.avoid_sectors = []
+    profile.max_commute_minutes = 30
+    without_postal = copy.deepcopy(profile)
+    without_postal.postal_code = None
+
+    result = engine.find_matches(without_postal, min_score=0.0)
+    unfiltered = engine.find_matches(profile, min_score=0.0, apply_distance_filter=False)
+
+    assert result.total_found == unfiltered.total_found > 0
+    assert all(ranked.match_score.location_score == 0.7 for ranked in result.ranked_apprenticeships)
+    assert engine.find_matches_batch([without_postal], min_score=0.0)[0].total_found == result.total_found
+    assert DistanceCalculator(api_key="").calculate_distance(None, "8001").route_found is False
+
+def test_isochrone_cache_is_bounded_and_extended_incrementally(tmp_path):
+    calculator = DistanceCalculator(api_key="", commute_matrix_dir=str(tmp_path / "no_matrix"))
+    calculator.isochrone_cache.max_entries = 2
+
+    for origin in ["8001", "3001", "4001"]:
+        calculator.get_isochrone(origin, ["8002", "6003"], "public")
+    assert calculator.isochrone_cache.stats()["entries"] == 2
+
+    # A new listing PLZ only adds that destination to the cached isochrone
+    isochrone = calculator.get_isochrone("4001", ["8002", "6003", "9000"], "public")
+    assert isochrone.covered == {"8002", "6003", "9000"}
+    assert calculator.isochrone_cache.get(("8001", "public")) is None
@@ -0,0 +1,60 @@
+"""
+Tests for the commute-based location score
+"""
+import numpy as np
+
+from matcher.candidates import CandidateRow
+from matcher.questionnaire import create_sample_profile
+from matcher.scoring_engine import ScoringEngine
+
+class FixedCommute:
+    """Stands in for DistanceCalculator: known travel times per destination"""
+
+    def __init__(self, minutes):
+        self.minutes = minutes
+        self.calls = []
+
+    def get_commute_minutes(self, origin_postal, destination_postal, transport_mode="transit"):
+        self.calls.append((origin_postal, destination_postal, transport_mode))
+        return self.minutes.get(destination_postal)
+
+def make_engine(tmp_path, minutes):
+    return ScoringEngine(distance_calculator=FixedCommute(minutes),
+                         interest_affinity_dir=str(tmp_path / "affinity"))
+
+def test_location_score_is_rated_against_the_accepted_commute(tmp_path):
+    engine = make_engine(tmp_path, {})
+    profile = create_sample_profile()
+    profile.max_commute_minutes = 40
+
+    minutes = [0, 10, 20, 30, 40, 60, 90, None, float("nan")]
+    scores = [engine._calculate_location_score(profile, m) for m in minutes]
+    assert scores == [1.0, 1.0, 0.9, 0.8, 0.6, 0.4, 0.2, 0.7, 0.7]
+
+    # Same travel time, more generous limit
+    profile.max_commute_minutes = 120
+    assert engine._calculate_location_score(profile, 60) == 0.9
+
+    vector = engine._location_scores(profile, np.array(minutes[:-2] + [np.nan], dtype=float))
+    np.testing.assert_array_equal(vector, [engine._calculate_location_score(profile, m)
+                                           for m in minutes[:-2] + [float("nan")]])
+
+def test_score_apprenticeship_looks_up_the_commute_once(tmp_path):
+    engine = make_engine(tmp_path, {"8400": 15, "3001": 75})
+    profile = create_sample_profile()
+    profile.max_commute_minutes = 60
+    near = CandidateRow(1, "Gärtner/in EFZ", None, "", "", "Winterthur", "8400", "Grün GmbH", "")
+    far = CandidateRow(2, "Gärtner/in EFZ", None, "", "", "Bern", "3001", "Grün GmbH", "")
+    unknown = CandidateRow(3, "Gärtner/in EFZ", None, "", "", "Bern", "", "Grün GmbH", "")
+
+    assert engine.score_apprenticeship(profile, near).location_score == 1.0
+    assert engine.score_apprenticeship(profile, far).location_score == 0.4
+    assert engine.score_apprenticeship(profile, unknown).location_score == 0.7
+    assert engine.distance_calculator.calls == [
+        (profile.postal_code, "8400", profile.preferred_transport),
+        (profile.postal_code, "3001", profile.preferred_transport)
+    ]
+
+    # Minutes from the filter stage are used as given
+    assert engine.score_apprenticeship(profile, far, commute_minutes=10).location_score == 1.0
+    assert len(engine.distance_calculator.calls) == 2
@@ -0,0 +1,100 @@
+"""
+Tests for the outbound call guard (rate limit, circuit breaker, deadlines)
+"""
+import time
+
+import pytest
+
+from matcher.distance_calculator import DistanceCalculator, DistanceResult
+from matcher.outbound import OutboundUnavailable, ProviderGuard, deadline
+from matcher.questionnaire import create_sample_profile
+
+def make_guard(**overrides):
+    settings = dict(rate=100.0, burst=100, concurrency=2, max_queue_seconds=0.05,
+                    failure_threshold=2, reset_seconds=0.1)
+    settings.update(overrides)
+    return ProviderGuard("test", **settings)
+
+def fail(guard):
+    with pytest.raises(RuntimeError):
+        with guard.slot(1.0):
+            raise RuntimeError("provider down")
+
+def test_breaker_opens_rejects_and_recovers():
+    guard = make_guard()
+    fail(guard)
+    fail(guard)
+    assert guard.breaker.state == "open" and not guard.available()
+
+    started = time.perf_counter()
+    with pytest.raises(OutboundUnavailable):
+        with guard.slot(1.0):
+            pass
+    assert time.perf_counter() - started < 0.01
+
+    # Half-open after the reset time: one successful trial closes the breaker
+    time.sleep(0.12)
+    with guard.slot(1.0):
+        pass
+    assert guard.breaker.state == "closed"
+
+    stats = guard.stats()
+    assert (stats["calls"], stats["failures"], stats["successes"], stats["rejected_open"]) == (3, 2, 1, 1)
+
+def test_rate_limit_and_concurrency_cap():
+    guard = make_guard(rate=1.0, burst=1)
+    with guard.slot(1.0):
+        pass
+    with pytest.raises(OutboundUnavailable):
+        with guard.slot(1.0):
+            pass
+    assert guard.stats()["rejected_rate"] == 1
+
+    guard = make_guard(concurrency=1)
+    with guard.slot(1.0):
+        with pytest.raises(OutboundUnavailable):
+            with guard.slot(1.0):
+                pass
+    assert guard.stats()["rejected_concurrency"] == 1
+    assert guard.breaker.state == "closed"
+
+def test_deadline_caps_timeout():
+    guard = make_guard()
+    with deadline(0.5):
+        with guard.slot(30.0) as call_timeout:
+            assert 0 < call_timeout <= 0.5
+
+    with deadline(0.0):
+        with pytest.raises(OutboundUnavailable):
+            with guard.slot(30.0):
+                pass
+    assert guard.stats()["rejected_deadline"] == 1
+
+def test_open_breaker_uses_fallback_without_calling_api(make_ai, make_score, listing):
+    guard = make_guard()
+    ai = make_ai(outbound=guard)
+    fail(guard)
+    fail(guard)
+
+    recommendation = ai.generate_match_explanation(create_sample_profile(), listing, make_score(0.3))
+
+    assert ai.client.chat.completions.calls == []
+    assert recommendation.match_reason == ai._generate_fallback_explanation_from_score(0.3).match_reason
+
+def test_isochrone_keeps_estimates_from_open_breaker_out_of_cache(tmp_path):
+    calculator = DistanceCalculator(api_key="test", commute_matrix_dir=str(tmp_path / "no_matrix"))
+    calculator.outbound = make_guard()
+    calculator._calculate_with_google_maps = lambda origin, destination, mode: DistanceResult(
+        distance_km=12.0, duration_minutes=33, transport_mode=mode, route_found=True
+    )
+    fail(calculator.outbound)
+    fail(calculator.outbound)
+
+    degraded = calculator.get_isochrone("8001", ["3001", "8002"], "public")
+    assert sorted(degraded.postal_codes) == ["3001", "8002"]
+    assert calculator.isochrone_cache.get(("8001", "public")).covered == set()
+
+    # Provider recovered: the estimated destinations are asked again
+    calculator.outbound = make_guard()
+    recovered = calculator.get_isochrone("8001", ["3001", "8002"], "public")
+    assert recovered.minutes == [33, 33] and recovered.covered == {"3001", "8002"}
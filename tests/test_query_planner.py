@@ -0,0 +1,88 @@
+"""
+Tests for the SQL pushdown of profile filters
+"""
+from itertools import combinations
+
+import pytest
+
+from data.database import Apprenticeship, get_session
+from matcher.query_planner import MatchQueryPlanner
+from matcher.scoring_engine import SECTOR_KEYWORDS, ScoringEngine
+
+def add_listing(session, title, profession, company_name, postal_code="8001"):
+    session.add(Apprenticeship(
+        company_id=1, title=title, profession=profession, description="", location="Zürich",
+        postal_code=postal_code, source_url=f"https://example.ch/{len(session.new)}-{title}",
+        source_platform="test", company_name=company_name
+    ))
+
+@pytest.fixture
+def fixture_db(load_corpus):
+    load_corpus(listings=120, seed=5)
+
+    session = get_session()
+    try:
+        # Edge cases of the Python filter: title fallback, case, company-only matches
+        add_listing(session, "Koch/Köchin EFZ", "", "Muster AG")
+        add_listing(session, "Logistiker/in EFZ", "LOGISTIKER/IN EFZ", "Hotel Bellevue")
+        add_listing(session, "Polymechaniker/in EFZ", "Polymechaniker/in EFZ", None, postal_code="")
+        add_listing(session, "Fachmann/-frau Betreuung EFZ", "Fachmann/-frau Betreuung EFZ", "Schulheim Sonnenberg",
+                    postal_code=None)
+        session.commit()
+    finally:
+        session.close()
+
+def test_sector_clause_matches_python_filter(fixture_db):
+    planner = MatchQueryPlanner()
+    engine = ScoringEngine()
+
+    session = get_session()
+    try:
+        active = session.query(Apprenticeship).filter_by(is_active=True).all()
+        sector_sets = [[sector] for sector in SECTOR_KEYWORDS] + list(combinations(["gastronomy", "education", "it"], 2))
+
+        for avoid_sectors in sector_sets + [["unknown"]]:
+            pushed_down = session.query(Apprenticeship.id).filter(
+                *planner.build_clauses(avoid_sectors=list(avoid_sectors))
+            )
+            expected = {app.id for app in active if not engine._is_in_avoided_sector(app, list(avoid_sectors))}
+            assert {row.id for row in pushed_down} == expected, avoid_sectors
+    finally:
+        session.close()
+
+def test_sector_keywords_with_umlauts_fold_like_python(fixture_db, monkeypatch):
+    monkeypatch.setitem(SECTOR_KEYWORDS, "healthcare", SECTOR_KEYWORDS["healthcare"] + ["ärzt"])
+    planner = MatchQueryPlanner()
+    engine = ScoringEngine()
+
+    session = get_session()
+    try:
+        # SQLite's lower() and LIKE leave "Ä" as it is
+        add_listing(session, "Kaufmann/-frau EFZ", "Kaufmann/-frau EFZ", "ÄRZTEZENTRUM Oerlikon")
+        session.commit()
+        listing_id = session.query(Apprenticeship.id).filter_by(company_name="ÄRZTEZENTRUM Oerlikon").scalar()
+
+        pushed_down = {row.id for row in session.query(Apprenticeship.id).filter(
+            *planner.build_clauses(avoid_sectors=["healthcare"])
+        )}
+        expected = {app.id for app in session.query(Apprenticeship).filter_by(is_active=True)
+                    if not engine._is_in_avoided_sector(app, ["healthcare"])}
+        assert listing_id not in pushed_down
+        assert pushed_down == expected
+    finally:
+        session.close()
+
+def test_reachability_and_custom_filter_clauses(fixture_db):
+    planner = MatchQueryPlanner()
+
+    session = get_session()
+    try:
+        clauses = planner.build_clauses(reachable_postal_codes=["8001"],
+                                        custom_filters={"location": "Zürich", "no_such_column": 1})
+        rows = session.query(Apprenticeship.postal_code, Apprenticeship.location).filter(*clauses).all()
+
+        # Listings without postal code can't be measured and are kept
+        assert {postal_code for postal_code, _ in rows} == {"8001", "", None}
+        assert {location for _, location in rows} == {"Zürich"}
+    finally:
+        session.close()
@@ -0,0 +1,41 @@
+"""
+Tests for profile fingerprints and the matching result cache
+"""
+import copy
+import time
+
+from matcher.questionnaire import InterestCategory, create_sample_profile, profile_fingerprint
+from matcher.result_cache import MatchResultCache
+
+def test_fingerprint_ignores_order():
+    profile = create_sample_profile()
+    reordered = copy.deepcopy(profile)
+    reordered.avoid_sectors = list(reversed(profile.avoid_sectors))
+    reordered.interests = dict(reversed(list(profile.interests.items())))
+    
+    assert profile_fingerprint(profile) == profile_fingerprint(reordered)
+
+def test_fingerprint_changes_with_answers():
+    profile = create_sample_profile()
+    changed = copy.deepcopy(profile)
+    changed.interests[InterestCategory.NATURE] = 5
+    
+    assert profile_fingerprint(profile) != profile_fingerprint(changed)
+
+def test_cache_evicts_least_recently_used():
+    cache = MatchResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_cache_expires_entries():
+    cache = MatchResultCache(ttl_seconds=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    
+    assert cache.get("a") is None
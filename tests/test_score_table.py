@@ -0,0 +1,43 @@
+"""
+Tests for re-filtering and re-sorting stored candidate scores
+"""
+import numpy as np
+
+from matcher.scoring_engine import CandidateScoreTable
+
+WEIGHTS = {'interest': 0.4, 'location': 0.2, 'skills': 0.2, 'preferences': 0.2}
+
+def make_table():
+    sub_scores = np.array([
+        [0.9, 0.2, 0.7, 0.7],
+        [0.5, 1.0, 0.7, 0.7],
+        [0.2, 0.6, 0.3, 0.4],
+        [0.8, 0.9, 0.9, 0.8],
+        [0.5, 0.7, 0.7, 0.7],
+    ])
+    commute_minutes = np.array([80.0, 10.0, np.nan, 45.0, np.nan])
+    return CandidateScoreTable.from_sub_scores(list("abcde"), sub_scores, commute_minutes, WEIGHTS)
+
+def test_select_thresholds_and_sorts():
+    table = make_table()
+    np.testing.assert_allclose(table.total_score, [0.68, 0.68, 0.34, 0.84, 0.62])
+
+    assert table.select().tolist() == [3, 0, 1, 4, 2]
+    assert table.select(min_score=0.6).tolist() == [3, 0, 1, 4]
+    assert table.select(min_score=0.6, limit=2).tolist() == [3, 0]
+    assert table.select(min_score=0.9).tolist() == []
+
+    # Any sub-score can be the sort key; ties keep the candidate order
+    assert table.select(sort_by='location_score').tolist() == [1, 3, 4, 2, 0]
+    assert table.select(sort_by='skill_score').tolist() == [3, 0, 1, 4, 2]
+
+def test_select_cuts_commute_and_keeps_unknown_times():
+    table = make_table()
+
+    assert table.select(max_commute=45).tolist() == [3, 1, 4, 2]
+    assert table.select(max_commute=30, min_score=0.6).tolist() == [1, 4]
+    assert table.select(max_commute=45, rows=np.array([0, 2, 3])).tolist() == [3, 2]
+
+    top = table.subset(table.select(max_commute=45, limit=2))
+    assert top.candidates == ["d", "b"]
+    np.testing.assert_array_equal(top.commute_minutes, [45.0, 10.0])
@@ -0,0 +1,70 @@
+"""
+Tests for the full-text search
+"""
+from data.database import Apprenticeship, get_session
+from matcher.query_planner import MatchQueryPlanner
+from matcher.search import build_match_query, search_apprenticeships, search_ids
+
+def add_listing(session, title, profession="Kaufmann/-frau EFZ", description="", company_name="Test AG"):
+    listing = Apprenticeship(
+        company_id=1, title=title, profession=profession, description=description,
+        location="Zürich", source_url=f"https://example.ch/{title}", source_platform="test",
+        company_name=company_name
+    )
+    session.add(listing)
+    session.commit()
+    return listing
+
+def test_index_follows_inserts_updates_and_deactivation(load_corpus):
+    load_corpus(listings=30)
+
+    session = get_session()
+    try:
+        listing = add_listing(session, "Zweiradmechaniker Velowerkstatt")
+        assert search_ids(session, "velowerkstatt") == [listing.id]
+
+        listing.title = "Zweiradmechaniker Bikeshop"
+        session.commit()
+        assert search_ids(session, "velowerkstatt") == []
+        assert search_ids(session, "bikeshop") == [listing.id]
+
+        listing.is_active = False
+        session.commit()
+        assert search_ids(session, "bikeshop") == []
+
+        listing.is_active = True
+        session.commit()
+        assert search_ids(session, "bikeshop") == [listing.id]
+    finally:
+        session.close()
+
+def test_title_matches_rank_first_and_prefix_matches(data_env):
+    session = get_session()
+    try:
+        in_description = add_listing(session, "Lehrstelle Büro", description="Arbeit mit Solaranlagen im Team")
+        in_title = add_listing(session, "Solaranlagen Monteur", profession="Solarinstallateur/in EFZ")
+
+        hits = search_apprenticeships(session, "solaranlagen")
+        assert [hit.apprenticeship.id for hit in hits] == [in_title.id, in_description.id]
+        assert hits[0].score > hits[1].score
+
+        # Search as you type: the last term matches as a prefix, diacritics are ignored
+        assert [hit.apprenticeship.id for hit in search_apprenticeships(session, "monteur sola")] == [in_title.id]
+        assert search_ids(session, "buro") == [in_description.id]
+    finally:
+        session.close()
+
+def test_query_syntax_is_not_passed_through(data_env):
+    assert build_match_query('"Informatik" OR NEAR(a*') == '"Informatik" "OR" "NEAR" "a"'
+    assert build_match_query("  -*()  ") is None
+
+    session = get_session()
+    try:
+        listing = add_listing(session, "Informatiker/in EFZ", description="Software und Netzwerke")
+        assert search_ids(session, 'informatiker") UND (') == [listing.id]
+        assert search_apprenticeships(session, "***") == []
+
+        clauses = MatchQueryPlanner().build_clauses(custom_filters={"search": "informatik"})
+        assert [row.id for row in session.query(Apprenticeship).filter(*clauses)] == [listing.id]
+    finally:
+        session.close()
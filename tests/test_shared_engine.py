@@ -0,0 +1,33 @@
+"""
+Tests for the per-process shared matching engine
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import matcher.matching_engine as matching_engine
+from matcher.matching_engine import ApprenticeshipMatchingEngine, get_shared_engine
+
+def test_shared_engine_is_created_once(data_env):
+    engine = get_shared_engine()
+    assert isinstance(engine, ApprenticeshipMatchingEngine)
+    assert get_shared_engine() is engine
+
+def test_concurrent_first_calls_share_one_engine(monkeypatch):
+    created = []
+    lock = threading.Lock()
+
+    class SlowEngine:
+        def __init__(self):
+            time.sleep(0.05)  # Widen the window between the check and the assignment
+            with lock:
+                created.append(self)
+
+    monkeypatch.setattr(matching_engine, "_shared_engine", None)
+    monkeypatch.setattr(matching_engine, "ApprenticeshipMatchingEngine", SlowEngine)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        engines = list(pool.map(lambda _: get_shared_engine(), range(8)))
+
+    assert len(created) == 1
+    assert all(engine is created[0] for engine in engines)
@@ -0,0 +1,66 @@
+"""
+Tests for the precomputed similar listings
+"""
+import numpy as np
+
+from data.database import Apprenticeship, get_session
+from matcher.matching_engine import ApprenticeshipMatchingEngine
+from matcher.similar_listings import build_neighbours, load_neighbour_ids, nearest_neighbours
+
+def add_listing(session, title, profession, description):
+    listing = Apprenticeship(
+        company_id=1, title=title, profession=profession, description=description,
+        location="Bern", postal_code="3011", source_url=f"https://example.ch/{title}",
+        source_platform="test", company_name="Test AG"
+    )
+    session.add(listing)
+    session.commit()
+    return listing.id
+
+def test_blocked_search_matches_brute_force():
+    rng = np.random.default_rng(7)
+    vectors = rng.random((300, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    indices, similarities = nearest_neighbours(vectors, k=5, block_size=64)
+
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    np.testing.assert_allclose(similarities, -np.sort(-scores, axis=1)[:, :5], rtol=1e-5)
+    assert not (indices == np.arange(300)[:, None]).any()
+
+def test_detail_page_uses_stored_neighbours(load_corpus):
+    load_corpus(seed=5)
+
+    session = get_session()
+    try:
+        velo = add_listing(session, "Fahrradmechaniker/in EFZ", "Fahrradmechaniker/in EFZ",
+                           "Reparatur von Velos, E-Bikes und Rennvelos in unserer Velowerkstatt")
+        bike = add_listing(session, "Zweiradmechaniker/in EFZ", "Fahrradmechaniker/in EFZ",
+                           "Service und Reparatur von E-Bikes und Velos in der Werkstatt")
+    finally:
+        session.close()
+
+    stats = build_neighbours(k=5)
+    assert stats["neighbours"] <= 5 * stats["listings"]
+
+    engine = ApprenticeshipMatchingEngine()
+    assert [candidate.id for candidate in engine.find_similar_apprenticeships(velo, limit=3)][0] == bike
+
+    session = get_session()
+    try:
+        assert load_neighbour_ids(session, bike)[0] == velo
+
+        # Deactivated neighbours are skipped without recomputing
+        session.get(Apprenticeship, bike).is_active = False
+        session.commit()
+        similar = engine.find_similar_apprenticeships(velo, limit=3)
+        assert bike not in [candidate.id for candidate in similar] and similar
+
+        # Listings added after the nightly job fall back to the same profession
+        later = add_listing(session, "Fahrradmechaniker/in EFZ Sommer", "Fahrradmechaniker/in EFZ", "")
+        assert load_neighbour_ids(session, later) is None
+    finally:
+        session.close()
+
+    assert [candidate.id for candidate in engine.find_similar_apprenticeships(later)] == [velo]
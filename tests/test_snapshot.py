@@ -0,0 +1,92 @@
+"""
+Tests for shared data snapshots
+"""
+import numpy as np
+
+from data.database import Apprenticeship, bump_data_generation, get_session
+from matcher.candidates import load_candidate_rows
+from matcher.matching_engine import ApprenticeshipMatchingEngine
+from matcher.questionnaire import create_sample_profile
+from matcher.scoring_engine import ScoringEngine
+from matcher.snapshot import FEATURE_ARRAYS, SnapshotStore, build_snapshot
+from matcher.tracing import flatten_spans
+
+class FakeTextMatcher:
+    embedding_cache = {"a_model": np.array([1.0, 0.0]), "b_model": np.array([0.0, 1.0])}
+
+def load_rows():
+    session = get_session()
+    try:
+        return load_candidate_rows(session, [Apprenticeship.is_active == True])
+    finally:
+        session.close()
+
+def test_snapshot_features_match_extraction(load_corpus, tmp_path):
+    load_corpus()
+
+    engine = ScoringEngine()
+    build_snapshot(engine, FakeTextMatcher(), snapshot_dir=str(tmp_path / "snapshots"))
+    snapshot = SnapshotStore(str(tmp_path / "snapshots")).current()
+
+    rows = load_rows()
+    for candidates in [rows, rows[::3]]:
+        expected = engine.extract_features(candidates)
+        features = snapshot.features_for(candidates)
+        for name in FEATURE_ARRAYS[:-1]:
+            np.testing.assert_array_equal(getattr(features, name), getattr(expected, name))
+        # Postal index refers to the snapshot's postal code list
+        assert [features.postal_codes[i] for i in features.postal_index] == [c.postal_code or "" for c in candidates]
+
+    np.testing.assert_array_equal(snapshot.embedding("b_model"), [0.0, 1.0])
+    assert snapshot.embedding("c_model") is None
+
+def test_store_swaps_to_new_snapshot(load_corpus, tmp_path):
+    load_corpus(listings=10)
+    snapshot_dir = str(tmp_path / "snapshots")
+
+    store = SnapshotStore(snapshot_dir, poll_seconds=0)
+    assert store.current() is None
+
+    build_snapshot(ScoringEngine(), snapshot_dir=snapshot_dir, keep=1)
+    first = store.current()
+
+    session = get_session()
+    try:
+        bump_data_generation(session)
+    finally:
+        session.close()
+    build_snapshot(ScoringEngine(), snapshot_dir=snapshot_dir, keep=1)
+    second = store.current()
+
+    assert second.generation == first.generation + 1
+    assert sorted(p.name for p in (tmp_path / "snapshots").iterdir()) == ["CURRENT", f"gen-{second.generation:08d}"]
+    # The replaced snapshot stays readable for requests still holding it
+    assert len(first.arrays["interest_counts"]) == len(first.ids)
+
+def test_find_matches_scores_from_the_published_snapshot(load_corpus, tmp_path):
+    load_corpus(listings=30)
+
+    engine = ApprenticeshipMatchingEngine()
+    engine.snapshots.poll_seconds = 0
+    engine.generation_poll_seconds = 0
+    profile = create_sample_profile()
+
+    def features_source():
+        engine.result_cache.invalidate()
+        result = engine.find_matches(profile, min_score=0.0, trace=True)
+        return next(span["source"] for span in flatten_spans(result.trace["spans"]) if span["name"] == "features")
+
+    assert features_source() == "extracted"
+
+    build_snapshot(engine.scoring_engine, snapshot_dir=str(tmp_path / "snapshots"))
+    session = get_session()
+    try:
+        bump_data_generation(session)
+    finally:
+        session.close()
+    # Published after startup, but for an older generation
+    assert features_source() == "extracted"
+
+    second = build_snapshot(engine.scoring_engine, snapshot_dir=str(tmp_path / "snapshots"))
+    assert features_source() == "snapshot"
+    assert engine.get_statistics()["snapshot"]["generation"] == second["generation"]
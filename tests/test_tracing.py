@@ -0,0 +1,44 @@
+"""
+Tests for request tracing
+"""
+from matcher.tracing import NULL_TRACE, current_trace, flatten_spans, start_trace
+
+def test_trace_collects_nested_spans_and_counters():
+    with start_trace("request") as trace:
+        with current_trace().span("outer", step=1):
+            with current_trace().span("inner"):
+                current_trace().count("cache.hit")
+                current_trace().count("cache.hit")
+
+    result = trace.to_dict()
+    rows = flatten_spans(result["spans"])
+
+    assert [(row["name"], row["depth"]) for row in rows] == [("request", 0), ("outer", 1), ("inner", 2)]
+    assert rows[1]["step"] == 1
+    assert result["counters"] == {"cache.hit": 2}
+    assert current_trace() is NULL_TRACE
+
+def test_disabled_trace_is_noop():
+    with start_trace("request", enabled=False) as trace:
+        with current_trace().span("stage"):
+            current_trace().count("cache.hit")
+
+    assert trace is NULL_TRACE
+    assert not trace.enabled
+
+def test_disabled_span_keeps_no_attributes():
+    with start_trace("request", enabled=False):
+        with current_trace().span("stage") as span:
+            span.attributes["candidates"] = 10
+            current_trace().annotate(results=3)
+
+    with current_trace().span("stage") as span:
+        assert span.attributes == {}
+
+def test_nested_request_reuses_outer_trace():
+    with start_trace("outer") as outer:
+        with start_trace("inner") as inner:
+            current_trace().count("calls")
+
+    assert inner is outer
+    assert flatten_spans(outer.to_dict()["spans"])[1]["name"] == "inner"
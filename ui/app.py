@@ -16,7 +16,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import our modules
 from matcher.questionnaire import UserProfile, InterestCategory, ApprenticeshipQuestionnaire
-from matcher.matching_engine import ApprenticeshipMatchingEngine
+from matcher.matching_engine import get_shared_engine
 from data.database import get_session, Apprenticeship
 
 # Page configuration
@@ -975,7 +975,7 @@ def show_demo_page():
                 st.session_state.user_profile = demo_profile
                 
                 # Run matching
-                engine = ApprenticeshipMatchingEngine()
+                engine = get_shared_engine()
                 results = engine.find_matches(demo_profile, limit=10, min_score=0.3)
                 st.session_state.matching_results = results
                 
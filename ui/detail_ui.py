@@ -12,7 +12,7 @@ import plotly.graph_objects as go
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from matcher.matching_engine import ApprenticeshipMatchingEngine
+from matcher.matching_engine import get_shared_engine
 from data.database import get_session, Apprenticeship
 
 def create_apprenticeship_overview_chart(apprenticeship: Apprenticeship):
@@ -154,74 +154,77 @@ def show_match_analysis(apprenticeship: Apprenticeship):
     
     st.markdown("### 🎯 Deine Match-Analyse")
     
-    with st.spinner("Analysiere Match mit deinem Profil..."):
-        try:
-            engine = ApprenticeshipMatchingEngine()
-            match_score, ai_rec = engine.get_detailed_recommendation(
+    try:
+        with st.spinner("Analysiere Match mit deinem Profil..."):
+            engine = get_shared_engine()
+            match_score, recommendation_stream = engine.stream_detailed_recommendation(
                 st.session_state.user_profile,
                 apprenticeship
             )
+        
+        # Match score display
+        col1, col2, col3, col4, col5 = st.columns(5)
+        
+        with col1:
+            st.metric("🎯 Gesamt", f"{match_score.total_score:.0%}")
+        with col2:
+            st.metric("💡 Interesse", f"{match_score.interest_score:.0%}")
+        with col3:
+            st.metric("📍 Standort", f"{match_score.location_score:.0%}")
+        with col4:
+            st.metric("💪 Skills", f"{match_score.skill_score:.0%}")
+        with col5:
+            st.metric("⚙️ Präferenzen", f"{match_score.preference_score:.0%}")
+        
+        # AI Recommendation, rendered section by section while it streams in
+        recommendation_placeholder = st.empty()
+        recommendation_placeholder.info("🤖 KI-Empfehlung wird erstellt...")
+        
+        for ai_rec in recommendation_stream:
+            recommendation_placeholder.markdown(ai_recommendation_html(ai_rec), unsafe_allow_html=True)
+        
+    except Exception as e:
+        st.error(f"Fehler bei der Match-Analyse: {str(e)}")
+
+def ai_recommendation_html(ai_rec) -> str:
+    """AI recommendation box (also used for partial recommendations while streaming)"""
+    next_steps = "".join(f"<li>{step}</li>" for step in ai_rec.next_steps)
+    
+    return f"""
+        <div style="
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 2rem;
+            border-radius: 15px;
+            margin: 2rem 0;
+        ">
+            <h4>🤖 KI-Empfehlung</h4>
             
-            # Match score display
-            col1, col2, col3, col4, col5 = st.columns(5)
-            
-            with col1:
-                st.metric("🎯 Gesamt", f"{match_score.total_score:.0%}")
-            with col2:
-                st.metric("💡 Interesse", f"{match_score.interest_score:.0%}")
-            with col3:
-                st.metric("📍 Standort", f"{match_score.location_score:.0%}")
-            with col4:
-                st.metric("💪 Skills", f"{match_score.skill_score:.0%}")
-            with col5:
-                st.metric("⚙️ Präferenzen", f"{match_score.preference_score:.0%}")
+            <div style="margin: 1rem 0;">
+                <h5>🎯 Warum es passt:</h5>
+                <p>{ai_rec.match_reason}</p>
+            </div>
             
-            # AI Recommendation
-            st.markdown(f"""
-                <div style="
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 2rem;
-                    border-radius: 15px;
-                    margin: 2rem 0;
-                ">
-                    <h4>🤖 KI-Empfehlung</h4>
-                    
-                    <div style="margin: 1rem 0;">
-                        <h5>🎯 Warum es passt:</h5>
-                        <p>{ai_rec.match_reason}</p>
-                    </div>
-                    
-                    <div style="margin: 1rem 0;">
-                        <h5>🚀 Wachstumspotential:</h5>
-                        <p>{ai_rec.growth_potential}</p>
-                    </div>
-                    
-                    <div style="margin: 1rem 0;">
-                        <h5>🤔 Überlegungen:</h5>
-                        <p>{ai_rec.considerations}</p>
-                    </div>
-                    
-                    <div style="margin: 1rem 0;">
-                        <h5>📋 Nächste Schritte:</h5>
-                        <ul>
-            """, unsafe_allow_html=True)
+            <div style="margin: 1rem 0;">
+                <h5>🚀 Wachstumspotential:</h5>
+                <p>{ai_rec.growth_potential}</p>
+            </div>
             
-            for step in ai_rec.next_steps:
-                st.markdown(f"<li>{step}</li>", unsafe_allow_html=True)
+            <div style="margin: 1rem 0;">
+                <h5>🤔 Überlegungen:</h5>
+                <p>{ai_rec.considerations}</p>
+            </div>
             
-            st.markdown(f"""
-                        </ul>
-                    </div>
-                    
-                    <div style="text-align: right; margin-top: 1.5rem;">
-                        <strong>🎯 Vertrauen: {ai_rec.confidence:.0%}</strong>
-                    </div>
-                </div>
-            """, unsafe_allow_html=True)
+            <div style="margin: 1rem 0;">
+                <h5>📋 Nächste Schritte:</h5>
+                <ul>{next_steps}</ul>
+            </div>
             
-        except Exception as e:
-            st.error(f"Fehler bei der Match-Analyse: {str(e)}")
+            <div style="text-align: right; margin-top: 1.5rem;">
+                <strong>🎯 Vertrauen: {ai_rec.confidence:.0%}</strong>
+            </div>
+        </div>
+    """
 
 def show_contact_and_actions(apprenticeship: Apprenticeship):
     """Show contact information and action buttons"""
@@ -273,45 +276,35 @@ def show_similar_apprenticeships(apprenticeship: Apprenticeship):
     """Show similar apprenticeships"""
     st.markdown("### 🔍 Ähnliche Lehrstellen")
     
-    session = get_session()
-    try:
-        # Find similar apprenticeships (same profession or company)
-        similar = session.query(Apprenticeship).filter(
-            Apprenticeship.is_active == True,
-            Apprenticeship.id != apprenticeship.id,
-            (Apprenticeship.profession == apprenticeship.profession) | 
-            (Apprenticeship.company_name == apprenticeship.company_name)
-        ).limit(3).all()
-        
-        if similar:
-            for app in similar:
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    st.markdown(f"""
-                        <div style="
-                            background: white;
-                            padding: 1rem;
-                            border-radius: 8px;
-                            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                            border-left: 3px solid #667eea;
-                            margin-bottom: 1rem;
-                        ">
-                            <h5>{app.title}</h5>
-                            <p><strong>🏢 {app.company_name}</strong></p>
-                            <p>📍 {app.location}</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-                
-                with col2:
-                    if st.button(f"Details", key=f"similar_{app.id}"):
-                        st.session_state.selected_apprenticeship_id = app.id
-                        st.rerun()
-        else:
-            st.info("Keine ähnlichen Lehrstellen gefunden.")
+    # Nightly neighbour lists: one primary-key lookup instead of an OR scan
+    similar = get_shared_engine().find_similar_apprenticeships(apprenticeship.id, limit=3)
+    
+    if similar:
+        for app in similar:
+            col1, col2 = st.columns([3, 1])
             
-    finally:
-        session.close()
+            with col1:
+                st.markdown(f"""
+                    <div style="
+                        background: white;
+                        padding: 1rem;
+                        border-radius: 8px;
+                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                        border-left: 3px solid #667eea;
+                        margin-bottom: 1rem;
+                    ">
+                        <h5>{app.title}</h5>
+                        <p><strong>🏢 {app.company_name}</strong></p>
+                        <p>📍 {app.location}</p>
+                    </div>
+                """, unsafe_allow_html=True)
+            
+            with col2:
+                if st.button(f"Details", key=f"similar_{app.id}"):
+                    st.session_state.selected_apprenticeship_id = app.id
+                    st.rerun()
+    else:
+        st.info("Keine ähnlichen Lehrstellen gefunden.")
 
 def show_detail_page():
     """Main detail page display"""
@@ -11,7 +11,7 @@ from typing import Dict, Any
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from matcher.questionnaire import UserProfile, InterestCategory, ApprenticeshipQuestionnaire
-from matcher.matching_engine import ApprenticeshipMatchingEngine
+from matcher.matching_engine import get_shared_engine
 
 def show_progress_indicator(current_step: int, total_steps: int):
     """Show progress indicator"""
@@ -352,7 +352,7 @@ def show_questionnaire_page():
                             st.session_state.user_profile = user_profile
                             
                             # Run matching
-                            engine = ApprenticeshipMatchingEngine()
+                            engine = get_shared_engine()
                             results = engine.find_matches(user_profile, limit=20, min_score=0.3)
                             st.session_state.matching_results = results
                             
@@ -5,7 +5,9 @@ Beautiful presentation of matching results with scores and AI recommendations
 import streamlit as st
 import sys
 import os
+import copy
 from typing import List
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
@@ -13,7 +15,9 @@ import pandas as pd
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from matcher.matching_engine import RankedApprenticeship, ApprenticeshipMatchingEngine
+from matcher.matching_engine import RankedApprenticeship, get_shared_engine
+from matcher.questionnaire import InterestCategory, profile_fingerprint
+from matcher.tracing import flatten_spans
 from data.database import Apprenticeship
 
 def create_score_chart(match_score):
@@ -175,7 +179,7 @@ def show_apprenticeship_card(ranked_app: RankedApprenticeship):
                 st.rerun()
         
         with col2:
-            if st.button(f"🤖 KI-Empfehlung", key=f"ai_{ranked_app.rank}"):
+            if st.button(f"🤖 KI-Empfehlung", key=f"ai_{ranked_app.rank}") or get_prefetched_recommendation(app.id):
                 show_ai_recommendation_modal(ranked_app)
         
         with col3:
@@ -189,50 +193,114 @@ def show_ai_recommendation_modal(ranked_app: RankedApprenticeship):
     
     if st.session_state[f"show_ai_{ranked_app.rank}"]:
         with st.expander(f"🤖 KI-Empfehlung für {ranked_app.apprenticeship.title}", expanded=True):
-            # Get AI recommendation
+            # Get AI recommendation (prefetched for the whole page if available, else streamed)
             if st.session_state.user_profile:
-                engine = ApprenticeshipMatchingEngine()
-                match_score, ai_rec = engine.get_detailed_recommendation(
-                    st.session_state.user_profile,
-                    ranked_app.apprenticeship
-                )
-                
-                st.markdown(f"""
-                    <div style="
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        color: white;
-                        padding: 1.5rem;
-                        border-radius: 10px;
-                        margin: 1rem 0;
-                    ">
-                        <h4>🎯 Warum diese Stelle zu dir passt:</h4>
-                        <p>{ai_rec.match_reason}</p>
-                        
-                        <h4>🚀 Wachstumspotential:</h4>
-                        <p>{ai_rec.growth_potential}</p>
-                        
-                        <h4>🤔 Überlegungen:</h4>
-                        <p>{ai_rec.considerations}</p>
-                        
-                        <h4>📋 Nächste Schritte:</h4>
-                        <ul>
-                """, unsafe_allow_html=True)
+                prefetched = get_prefetched_recommendation(ranked_app.apprenticeship.id)
+                if prefetched:
+                    recommendations = [prefetched[1]]
+                else:
+                    engine = get_shared_engine()
+                    _, recommendations = engine.stream_detailed_recommendation(
+                        st.session_state.user_profile,
+                        ranked_app.apprenticeship
+                    )
                 
-                for step in ai_rec.next_steps:
-                    st.markdown(f"<li>{step}</li>", unsafe_allow_html=True)
-                
-                st.markdown(f"""
-                        </ul>
-                        <div style="text-align: right; margin-top: 1rem;">
-                            <strong>🎯 Vertrauen: {ai_rec.confidence:.0%}</strong>
-                        </div>
-                    </div>
-                """, unsafe_allow_html=True)
+                placeholder = st.empty()
+                for ai_rec in recommendations:
+                    placeholder.markdown(ai_recommendation_modal_html(ai_rec), unsafe_allow_html=True)
+
+def ai_recommendation_modal_html(ai_rec) -> str:
+    """Recommendation box of the results page (also used while streaming)"""
+    next_steps = "".join(f"<li>{step}</li>" for step in ai_rec.next_steps)
+    
+    return f"""
+        <div style="
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 1.5rem;
+            border-radius: 10px;
+            margin: 1rem 0;
+        ">
+            <h4>🎯 Warum diese Stelle zu dir passt:</h4>
+            <p>{ai_rec.match_reason}</p>
+            
+            <h4>🚀 Wachstumspotential:</h4>
+            <p>{ai_rec.growth_potential}</p>
+            
+            <h4>🤔 Überlegungen:</h4>
+            <p>{ai_rec.considerations}</p>
+            
+            <h4>📋 Nächste Schritte:</h4>
+            <ul>{next_steps}</ul>
+            <div style="text-align: right; margin-top: 1rem;">
+                <strong>🎯 Vertrauen: {ai_rec.confidence:.0%}</strong>
+            </div>
+        </div>
+    """
+
+def get_prefetched_recommendation(apprenticeship_id: int):
+    """(match score, AI recommendation) loaded by load_page_recommendations for the current profile"""
+    if not st.session_state.get('user_profile'):
+        return None
+    return st.session_state.get('ai_recommendations', {}).get(
+        (profile_fingerprint(st.session_state.user_profile), apprenticeship_id)
+    )
+
+def load_page_recommendations(ranked_apps: List[RankedApprenticeship]):
+    """Fetch the AI recommendations of all cards on the page concurrently"""
+    user_profile = st.session_state.user_profile
+    if not user_profile:
+        return
+    
+    fingerprint = profile_fingerprint(user_profile)
+    recommendations = st.session_state.setdefault('ai_recommendations', {})
+    missing = [ranked_app for ranked_app in ranked_apps if (fingerprint, ranked_app.apprenticeship.id) not in recommendations]
+    
+    with st.spinner("KI-Empfehlungen werden erstellt..."):
+        results = get_shared_engine().get_detailed_recommendations(
+            user_profile, [ranked_app.apprenticeship for ranked_app in missing]
+        )
+    
+    for ranked_app, result in zip(missing, results):
+        recommendations[(fingerprint, ranked_app.apprenticeship.id)] = result
+
+def show_ai_summary(placeholder, results, pending: bool = False):
+    """Render the AI summary into its placeholder"""
+    if not results.ai_summary:
+        return
+    
+    pending_note = "<p><em>⏳ Persönliche KI-Zusammenfassung wird erstellt...</em></p>" if pending else ""
+    placeholder.markdown(f"""
+        <div style="
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 1.5rem;
+            border-radius: 10px;
+            margin: 1.5rem 0;
+        ">
+            <h4>🤖 KI-Zusammenfassung:</h4>
+            <p>{results.ai_summary}</p>
+            {pending_note}
+        </div>
+    """, unsafe_allow_html=True)
+
+def finish_ai_summary(placeholder, results):
+    """Wait for a pending AI summary after the page is rendered, then replace the fallback"""
+    if results.summary_pending():
+        results.resolve_summary(timeout=get_shared_engine().ai_integration.summary_timeout)
+        show_ai_summary(placeholder, results, pending=False)
 
 def show_filters_sidebar():
     """Show filtering options in sidebar"""
     st.sidebar.markdown("### 🔍 Filter & Sortierung")
     
+    # Full-text search within the matches
+    search = st.sidebar.text_input(
+        "Stichwortsuche:",
+        placeholder="z.B. Informatik, Pflege, Muster AG",
+        help="Durchsucht Titel, Beruf, Firma, Beschreibung und Anforderungen"
+    )
+    
     # Score filter
     min_score = st.sidebar.slider(
         "Minimaler Match Score:",
@@ -248,25 +316,109 @@ def show_filters_sidebar():
             min_value=15, max_value=120, 
             value=user_profile.max_commute_minutes, step=15
         )
+        if max_commute > user_profile.max_commute_minutes:
+            st.sidebar.caption("Für eine längere Pendelzeit bitte eine neue Suche starten.")
     else:
         max_commute = 60
     
     # Sort options
     sort_by = st.sidebar.selectbox(
         "Sortieren nach:",
-        options=['total_score', 'interest_score', 'location_score'],
+        options=['total_score', 'interest_score', 'location_score', 'skill_score', 'preference_score'],
         format_func=lambda x: {
             'total_score': 'Gesamt-Score',
             'interest_score': 'Interessen-Match',
-            'location_score': 'Standort-Score'
+            'location_score': 'Standort-Score',
+            'skill_score': 'Fähigkeiten',
+            'preference_score': 'Präferenzen'
         }[x]
     )
     
     return {
         'min_score': min_score,
         'max_commute': max_commute,
-        'sort_by': sort_by
+        'sort_by': sort_by,
+        'search': search.strip()
+    }
+
+def show_interest_tweaks_sidebar():
+    """Let the user adjust interests and re-rank without a new search"""
+    results = st.session_state.matching_results
+    user_profile = st.session_state.user_profile
+    if not user_profile:
+        return
+    
+    interest_labels = {
+        InterestCategory.TECHNICAL: "Technik & Informatik",
+        InterestCategory.CREATIVE: "Kreativität & Design",
+        InterestCategory.SOCIAL: "Menschen & Beziehungen",
+        InterestCategory.BUSINESS: "Wirtschaft & Verwaltung",
+        InterestCategory.NATURE: "Natur & Umwelt",
+        InterestCategory.HEALTH: "Gesundheit & Medizin",
+        InterestCategory.SPORTS: "Sport & Bewegung",
+        InterestCategory.LANGUAGES: "Sprachen & Kommunikation"
     }
+    
+    with st.sidebar.expander("🎚️ Interessen anpassen"):
+        interests = {
+            category: st.slider(label, min_value=1, max_value=5,
+                                value=user_profile.interests.get(category, 3),
+                                key=f"tweak_interest_{category.value}")
+            for category, label in interest_labels.items()
+        }
+        
+        if st.button("Neu bewerten", key="tweak_interests_apply") and interests != user_profile.interests:
+            updated_profile = copy.deepcopy(user_profile)
+            updated_profile.interests = interests
+            
+            # Only the interest scores of the current candidates are recomputed
+            st.session_state.matching_results = get_shared_engine().update_matches(
+                results, updated_profile, limit=20, min_score=0.3
+            )
+            st.session_state.user_profile = updated_profile
+            st.rerun()
+
+def select_filtered_results(results, filters) -> np.ndarray:
+    """Candidate indices passing the sidebar filters, sorted (no DB access, no rescoring)"""
+    if results.candidate_scores is None:
+        return np.array([], dtype=int)
+    
+    rows = None
+    if filters.get('search'):
+        rows = get_shared_engine().search_rows(results.candidate_scores, filters['search'])
+    
+    return results.candidate_scores.select(
+        min_score=filters['min_score'],
+        max_commute=filters['max_commute'],
+        sort_by=filters['sort_by'],
+        rows=rows
+    )
+
+def build_ranked_results(results, indices: np.ndarray, start_rank: int = 1) -> List[RankedApprenticeship]:
+    """Ranked results for selected candidates, reusing the hydrated top matches"""
+    hydrated = {ranked.apprenticeship.id: ranked.apprenticeship for ranked in results.ranked_apprenticeships}
+    
+    return get_shared_engine().scoring_engine.build_ranked(
+        results.user_profile, results.candidate_scores, indices, hydrated, start_rank
+    )
+
+def show_trace_panel(trace):
+    """Debug panel with the spans and counters of the matching request"""
+    with st.expander("🛠️ Debug: Request-Trace"):
+        rows = flatten_spans(trace['spans'])
+        spans_df = pd.DataFrame([
+            {
+                "Schritt": "\u00a0\u00a0\u00a0\u00a0" * row['depth'] + row['name'],
+                "Dauer (ms)": row['duration_ms'],
+                "Details": ", ".join(f"{k}={v}" for k, v in row.items() if k not in ('name', 'depth', 'duration_ms'))
+            }
+            for row in rows
+        ])
+        st.dataframe(spans_df, use_container_width=True, hide_index=True)
+        
+        if trace['counters']:
+            st.markdown("**Zähler**")
+            st.json(trace['counters'])
 
 def show_results_page():
     """Main results page"""
@@ -282,12 +434,11 @@ def show_results_page():
     
     # Show filters
     filters = show_filters_sidebar()
+    show_interest_tweaks_sidebar()
     
-    # Filter results based on sidebar filters
-    filtered_results = [
-        app for app in results.ranked_apprenticeships 
-        if app.match_score.total_score >= filters['min_score']
-    ]
+    # Filter and sort all candidates based on sidebar filters
+    filtered_indices = select_filtered_results(results, filters)
+    top_results = build_ranked_results(results, filtered_indices[:5])
     
     # Header
     st.markdown("### 🎯 Deine Lehrstellen-Matches")
@@ -298,64 +449,58 @@ def show_results_page():
     with col1:
         st.metric("📊 Gesamt gefunden", results.total_found)
     with col2:
-        st.metric("✅ Über Schwelle", len(filtered_results))
+        st.metric("✅ Über Schwelle", len(filtered_indices))
     with col3:
         st.metric("⚡ Verarbeitungszeit", f"{results.processing_time:.1f}s")
     with col4:
-        if filtered_results:
-            st.metric("🏆 Bester Match", f"{filtered_results[0].match_score.total_score:.0%}")
+        if top_results:
+            st.metric("🏆 Bester Match", f"{top_results[0].match_score.total_score:.0%}")
     
-    # AI Summary
-    if results.ai_summary:
-        st.markdown(f"""
-            <div style="
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 1.5rem;
-                border-radius: 10px;
-                margin: 1.5rem 0;
-            ">
-                <h4>🤖 KI-Zusammenfassung:</h4>
-                <p>{results.ai_summary}</p>
-            </div>
-        """, unsafe_allow_html=True)
+    # AI Summary (may still be generated; filled in once the rest of the page is shown)
+    summary_placeholder = st.empty()
+    show_ai_summary(summary_placeholder, results, pending=results.summary_pending())
+    
+    if results.trace:
+        show_trace_panel(results.trace)
     
     # Charts
-    if filtered_results:
+    if top_results:
         st.markdown("### 📊 Visualisierung")
         
         tab1, tab2 = st.tabs(["📊 Top Matches Vergleich", "🎯 Detail-Analyse"])
         
         with tab1:
-            chart = create_score_bar_chart(filtered_results)
+            chart = create_score_bar_chart(top_results)
             if chart:
                 st.plotly_chart(chart, use_container_width=True)
         
         with tab2:
-            if filtered_results:
+            if top_results:
                 selected_for_analysis = st.selectbox(
                     "Stelle für Detail-Analyse wählen:",
-                    options=range(min(5, len(filtered_results))),
-                    format_func=lambda x: f"{filtered_results[x].apprenticeship.title} bei {filtered_results[x].apprenticeship.company_name}"
+                    options=range(len(top_results)),
+                    format_func=lambda x: f"{top_results[x].apprenticeship.title} bei {top_results[x].apprenticeship.company_name}"
                 )
                 
                 if selected_for_analysis is not None:
-                    radar_chart = create_score_chart(filtered_results[selected_for_analysis].match_score)
+                    radar_chart = create_score_chart(top_results[selected_for_analysis].match_score)
                     st.plotly_chart(radar_chart, use_container_width=True)
     
     # Results list
     st.markdown("### 📋 Detaillierte Ergebnisse")
     
-    if not filtered_results:
+    if not len(filtered_indices):
         st.info("Keine Ergebnisse mit den aktuellen Filtern. Versuche die Filter zu lockern.")
+        finish_ai_summary(summary_placeholder, results)
         return
     
     # Pagination
     results_per_page = 5
-    total_pages = (len(filtered_results) + results_per_page - 1) // results_per_page
+    total_pages = (len(filtered_indices) + results_per_page - 1) // results_per_page
     
     if 'current_results_page' not in st.session_state:
         st.session_state.current_results_page = 1
+    st.session_state.current_results_page = min(st.session_state.current_results_page, total_pages)
     
     # Page selector
     if total_pages > 1:
@@ -371,7 +516,12 @@ def show_results_page():
     # Show results for current page
     start_idx = (st.session_state.current_results_page - 1) * results_per_page
     end_idx = start_idx + results_per_page
-    current_page_results = filtered_results[start_idx:end_idx]
+    current_page_results = build_ranked_results(
+        results, filtered_indices[start_idx:end_idx], start_rank=start_idx + 1
+    )
+    
+    if st.button("🤖 KI-Empfehlungen für diese Seite laden"):
+        load_page_recommendations(current_page_results)
     
     for ranked_app in current_page_results:
         show_apprenticeship_card(ranked_app)
@@ -408,4 +558,6 @@ def show_results_page():
     
     with col3:
         if st.button("💾 Favoriten speichern", use_container_width=True):
-            st.info("Favoriten Feature - Coming in Phase 5!")
\ No newline at end of file
+            st.info("Favoriten Feature - Coming in Phase 5!")
+    
+    finish_ai_summary(summary_placeholder, results)
\ No newline at end of file